@@ -3,7 +3,7 @@
 block_cipher = None
 
 
-a = Analysis(['FlatCAM.py'],
+a = Analysis(['flatcam'],
              pathex=['/home/jpcaram/flatcam'],
              binaries=None,
              datas=[('share/*', 'share')],
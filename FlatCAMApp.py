@@ -354,7 +354,27 @@ class App(QtCore.QObject):
             "zdownrate": None,
             "excellon_zeros": "L",
             "gerber_use_buffer_for_union": True,
-            "cncjob_coordinate_format": "X%.4fY%.4f"
+            "gerber_use_tiled_union": False,
+            "gerber_union_tiles": 4,
+            "gerber_union_processes": 0,       # 0 for as many as CPUs.
+            "gerber_isolation_processes": 1,   # 0 for as many as CPUs.
+            "gerber_use_streaming_union": False,
+            "gerber_stream_max_primitives": 2000,
+            "gerber_stream_max_vertices": 200000,
+            "parse_cache_size_mb": 200,         # 0 disables the parse cache.
+            "geometry_arc_tolerance": 0.0002,   # Max. chord error of arcs in inches.
+            "geometry_paint_processes": 1,      # 0 for as many as CPUs.
+            "geometry_paint_tolerance": 0.0,    # Fraction of the tool diameter. 0 to not simplify.
+            "geometry_empty_area_tiles": 1,     # 1 to not split in tiles.
+            "geometry_empty_area_processes": 1, # 0 for as many as CPUs.
+            "cncjob_coordinate_format": "X%.4fY%.4f",
+            "cncjob_drill_order": True,         # Reorder holes to shorten travel.
+            "cncjob_drill_order_time": None,    # Seconds spent ordering holes. None for no limit.
+            "cncjob_drill_order_moves": 20000,  # Max. improving moves per tool.
+            "cncjob_drill_order_tools": True,   # Start each tool near where the last ended.
+            "cncjob_path_order": False,         # Improve the order of paths in G-code.
+            "cncjob_path_order_moves": 20000,   # Max. improving moves.
+            "cncjob_path_order_seed": 0
         })
 
         ###############################
@@ -370,6 +390,11 @@ class App(QtCore.QObject):
         self.propagate_defaults()
         self.restore_main_win_geom()
 
+        # Parsed Gerber and Excellon files. See open_gerber().
+        self.parse_cache = ParseCache(self.data_path + '/parse_cache',
+                                      max_size=int(self.defaults["parse_cache_size_mb"] * 1024 * 1024),
+                                      version=self.version)
+
         def auto_save_defaults():
             try:
                 self.save_defaults(silent=True)
@@ -2023,7 +2048,9 @@ class App(QtCore.QObject):
             # Opening the file happens here
             self.progress.emit(30)
             try:
-                gerber_obj.parse_file(filename, follow=follow)
+                if not self.parse_cache.load(gerber_obj, filename, follow=follow):
+                    gerber_obj.parse_file(filename, follow=follow)
+                    self.parse_cache.store(gerber_obj, filename, follow=follow)
 
             except IOError:
                 app_obj.inform.emit("[error] Failed to open file: " + filename)
@@ -2092,7 +2119,9 @@ class App(QtCore.QObject):
             #self.progress.emit(20)
 
             try:
-                excellon_obj.parse_file(filename)
+                cached = self.parse_cache.load(excellon_obj, filename)
+                if not cached:
+                    excellon_obj.parse_file(filename)
 
             except IOError:
                 app_obj.inform.emit("[error] Cannot open file: " + filename)
@@ -2105,14 +2134,17 @@ class App(QtCore.QObject):
                 app_obj.inform.emit(msg)
                 raise
 
-            try:
-                excellon_obj.create_geometry()
+            if not cached:
+                try:
+                    excellon_obj.create_geometry()
 
-            except:
-                msg = "[error] An internal error has ocurred. See shell.\n"
-                msg += traceback.format_exc()
-                app_obj.inform.emit(msg)
-                raise
+                except:
+                    msg = "[error] An internal error has ocurred. See shell.\n"
+                    msg += traceback.format_exc()
+                    app_obj.inform.emit(msg)
+                    raise
+
+                self.parse_cache.store(excellon_obj, filename)
 
             if excellon_obj.is_empty():
                 app_obj.inform.emit("[error] No geometry found in file: " + filename)
@@ -2272,9 +2304,28 @@ class App(QtCore.QObject):
         # Which objects to update the given parameters.
         routes = {
             "zdownrate": CNCjob,
+            "geometry_arc_tolerance": Geometry,
+            "geometry_paint_processes": Geometry,
+            "geometry_paint_tolerance": Geometry,
+            "geometry_empty_area_tiles": Geometry,
+            "geometry_empty_area_processes": Geometry,
             "excellon_zeros": Excellon,
             "gerber_use_buffer_for_union": Gerber,
-            "cncjob_coordinate_format": CNCjob
+            "gerber_use_tiled_union": Gerber,
+            "gerber_union_tiles": Gerber,
+            "gerber_union_processes": Gerber,
+            "gerber_isolation_processes": Gerber,
+            "gerber_use_streaming_union": Gerber,
+            "gerber_stream_max_primitives": Gerber,
+            "gerber_stream_max_vertices": Gerber,
+            "cncjob_coordinate_format": CNCjob,
+            "cncjob_drill_order": CNCjob,
+            "cncjob_drill_order_time": CNCjob,
+            "cncjob_drill_order_moves": CNCjob,
+            "cncjob_drill_order_tools": CNCjob,
+            "cncjob_path_order": CNCjob,
+            "cncjob_path_order_moves": CNCjob,
+            "cncjob_path_order_seed": CNCjob
             # "spindlespeed": CNCjob
         }
 
@@ -316,8 +316,12 @@ class FCArc(FCShapeTool):
         # 132 = p1, p3, p2
         self.mode = "c12"  # Center, p1, p2
 
+        # Used if there is no tolerance. See arc().
         self.steps_per_circ = 55
 
+        # Max. distance between the arc and its segments.
+        self.tolerance = get_arc_tolerance(self.draw_app.app.options["units"])
+
     def click(self, point):
         self.points.append(point)
 
@@ -366,7 +370,7 @@ class FCArc(FCShapeTool):
                 stopangle = arctan2(p2[1] - center[1], p2[0] - center[0])
 
                 return DrawToolUtilityShape([LineString(arc(center, radius, startangle, stopangle,
-                                       self.direction, self.steps_per_circ)),
+                                       self.direction, self.steps_per_circ, self.tolerance)),
                         Point(center)])
 
             elif self.mode == '132':
@@ -381,7 +385,7 @@ class FCArc(FCShapeTool):
                 stopangle = arctan2(p3[1] - center[1], p3[0] - center[0])
 
                 return DrawToolUtilityShape([LineString(arc(center, radius, startangle, stopangle,
-                                   direction, self.steps_per_circ)),
+                                   direction, self.steps_per_circ, self.tolerance)),
                         Point(center), Point(p1), Point(p3)])
 
             else:  # '12c'
@@ -414,7 +418,7 @@ class FCArc(FCShapeTool):
                 stopangle = arctan2(p2[1] - center[1], p2[0] - center[0])
 
                 return DrawToolUtilityShape([LineString(arc(center, radius, startangle, stopangle,
-                                       self.direction, self.steps_per_circ)),
+                                       self.direction, self.steps_per_circ, self.tolerance)),
                         Point(center)])
 
         return None
@@ -430,7 +434,7 @@ class FCArc(FCShapeTool):
             startangle = arctan2(p1[1] - center[1], p1[0] - center[0])
             stopangle = arctan2(p2[1] - center[1], p2[0] - center[0])
             self.geometry = DrawToolShape(LineString(arc(center, radius, startangle, stopangle,
-                                          self.direction, self.steps_per_circ)))
+                                          self.direction, self.steps_per_circ, self.tolerance)))
 
         elif self.mode == '132':
             p1 = array(self.points[0])
@@ -444,7 +448,7 @@ class FCArc(FCShapeTool):
             stopangle = arctan2(p3[1] - center[1], p3[0] - center[0])
 
             self.geometry = DrawToolShape(LineString(arc(center, radius, startangle, stopangle,
-                                          direction, self.steps_per_circ)))
+                                          direction, self.steps_per_circ, self.tolerance)))
 
         else:  # self.mode == '12c'
             p1 = array(self.points[0])
@@ -477,7 +481,7 @@ class FCArc(FCShapeTool):
             stopangle = arctan2(p2[1] - center[1], p2[0] - center[0])
 
             self.geometry = DrawToolShape(LineString(arc(center, radius, startangle, stopangle,
-                                           self.direction, self.steps_per_circ)))
+                                           self.direction, self.steps_per_circ, self.tolerance)))
         self.complete = True
 
 
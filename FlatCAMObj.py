@@ -13,6 +13,7 @@ from ObjectUI import *
 import FlatCAMApp
 import inspect  # TODO: For debugging only.
 from camlib import *
+from matplotlib.collections import EllipseCollection
 from FlatCAMCommon import LoudDict
 from FlatCAMDraw import FlatCAMDraw
 
@@ -385,15 +386,40 @@ class FlatCAMGerber(FlatCAMObj, Gerber):
 
         def geo_init(geo_obj, app_obj):
             assert isinstance(geo_obj, FlatCAMGeometry)
-            bounding_box = self.solid_geometry.envelope.buffer(self.options["noncoppermargin"])
-            if not self.options["noncopperrounded"]:
-                bounding_box = bounding_box.envelope
-            non_copper = bounding_box.difference(self.solid_geometry)
-            geo_obj.solid_geometry = non_copper
+
+            def report(done, total):
+                app_obj.progress.emit(int(100.0 * done / total))
+
+            geo_obj.solid_geometry = self.noncopper(callback=report)
+            app_obj.progress.emit(0)
 
         # TODO: Check for None
         self.app.new_object("geometry", name, geo_init)
 
+    def noncopper(self, margin=None, rounded=None, callback=None):
+        """
+        Area without copper within the bounding box of the object.
+
+        :param margin: Distance of the box to the copper. Defaults
+            to ``options["noncoppermargin"]``.
+        :param rounded: Round the corners of the box. Defaults
+            to ``options["noncopperrounded"]``.
+        :param callback: See tiled_difference().
+        :return: Polygon or MultiPolygon
+        """
+
+        if margin is None:
+            margin = self.options["noncoppermargin"]
+        if rounded is None:
+            rounded = self.options["noncopperrounded"]
+
+        bounding_box = self.solid_geometry.envelope.buffer(margin)
+        if not rounded:
+            bounding_box = bounding_box.envelope
+
+        # In tiles, in parallel if so configured. See tiled_difference().
+        return self.get_empty_area(bounding_box, callback=callback)
+
     def on_generatebb_button_click(self, *args):
         self.app.report_usage("gerber_on_generatebb_button")
         self.read_form()
@@ -469,7 +495,7 @@ class FlatCAMGerber(FlatCAMObj, Gerber):
         def follow_init(follow_obj, app_obj):
             # Propagate options
             follow_obj.options["cnctooldia"] = self.options["isotooldia"]
-            follow_obj.solid_geometry = self.solid_geometry
+            follow_obj.solid_geometry = self.get_follow_geometry()
             app_obj.info("Follow geometry created: %s" % follow_obj.options["name"])
 
         # TODO: Do something if this is None. Offer changing name?
@@ -499,14 +525,18 @@ class FlatCAMGerber(FlatCAMObj, Gerber):
         base_name = self.options["name"] + "_iso"
         base_name = outname or base_name
 
-        def generate_envelope(offset, invert):
+        # All passes at once. See Geometry.isolation_passes().
+        offsets = [(2 * i + 1) / 2.0 * dia - i * overlap * dia for i in range(passes)]
+        envelopes = self.isolation_passes(offsets, processes=self.isolation_processes or None)
+
+        def generate_envelope(i, invert):
             # isolation_geometry produces an envelope that is going on the left of the geometry
             # (the copper features). To leave the least amount of burrs on the features
             # the tool needs to travel on the right side of the features (this is called conventional milling)
             # the first pass is the one cutting all of the features, so it needs to be reversed
             # the other passes overlap preceding ones and cut the left over copper. It is better for them
             # to cut on the right side of the left over copper i.e on the left side of the features. 
-            geom = self.isolation_geometry(offset)
+            geom = envelopes[i]
             if invert:
                 if type(geom) is MultiPolygon:
                     pl = []
@@ -528,8 +558,7 @@ class FlatCAMGerber(FlatCAMObj, Gerber):
                 geo_obj.options["cnctooldia"] = self.options["isotooldia"]
                 geo_obj.solid_geometry = []
                 for i in range(passes):
-                    offset = (2 * i + 1) / 2.0 * dia - i * overlap * dia
-                    geom = generate_envelope (offset, i == 0)
+                    geom = generate_envelope(i, i == 0)
                     geo_obj.solid_geometry.append(geom)
                 app_obj.info("Isolation geometry created: %s" % geo_obj.options["name"])
 
@@ -539,7 +568,6 @@ class FlatCAMGerber(FlatCAMObj, Gerber):
         else:
             for i in range(passes):
 
-                offset = (2 * i + 1) / 2.0 * dia - i * overlap  * dia
                 if passes > 1:
                     iso_name = base_name + str(i + 1)
                 else:
@@ -549,7 +577,7 @@ class FlatCAMGerber(FlatCAMObj, Gerber):
                 def iso_init(geo_obj, app_obj):
                     # Propagate options
                     geo_obj.options["cnctooldia"] = self.options["isotooldia"]
-                    geo_obj.solid_geometry = generate_envelope (offset, i == 0)
+                    geo_obj.solid_geometry = generate_envelope(i, i == 0)
                     app_obj.info("Isolation geometry created: %s" % geo_obj.options["name"])
 
                 # TODO: Do something if this is None. Offer changing name?
@@ -719,10 +747,8 @@ class FlatCAMExcellon(FlatCAMObj, Excellon):
                         except:
                             exc.app.log.warning("Failed to copy option.",option)
 
-                #deep copy of all drills,to avoid any references
-                for drill in exc.drills:
-                    point = Point(drill['point'].x,drill['point'].y)
-                    exc_final.drills.append({"point": point, "tool": drill['tool']})
+                #copy of all drills,to avoid any references
+                exc_final.drills = ExcellonDrills.concatenate([exc_final.drills, exc.drills])
                 toolsrework=dict()
                 max_numeric_tool=0
                 for toolname in exc.tools.iterkeys():
@@ -863,14 +889,9 @@ class FlatCAMExcellon(FlatCAMObj, Excellon):
                 "Initializer expected a FlatCAMGeometry, got %s" % type(geo_obj)
             app_obj.progress.emit(20)
 
-            geo_obj.solid_geometry = []
-
-            for hole in self.drills:
-                if hole['tool'] in tools:
-                    geo_obj.solid_geometry.append(
-                        Point(hole['point']).buffer(self.tools[hole['tool']]["C"] / 2 -
-                                                    tooldia / 2).exterior
-                    )
+            selected = self.drills.tool_mask(tools)
+            radii = self.get_drill_radii()[selected] - tooldia / 2
+            geo_obj.solid_geometry = make_circles(self.drills.xy[selected], radii, exterior=True)
 
         def geo_thread(app_obj):
             app_obj.new_object("geometry", outname, geo_init)
@@ -968,27 +989,23 @@ class FlatCAMExcellon(FlatCAMObj, Excellon):
         if not FlatCAMObj.plot(self):
             return
 
-        try:
-            _ = iter(self.solid_geometry)
-        except TypeError:
-            self.solid_geometry = [self.solid_geometry]
-
-        # Plot excellon (All polygons?)
+        # Plot the holes straight from the drills.
+        diameters = 2 * self.get_drill_radii()
         if self.options["solid"]:
-            for geo in self.solid_geometry:
-                patch = PolygonPatch(geo,
-                                     facecolor="#C40000",
-                                     edgecolor="#750000",
-                                     alpha=0.75,
-                                     zorder=3)
-                self.axes.add_patch(patch)
+            holes = EllipseCollection(diameters, diameters, 0, units='xy',
+                                      offsets=self.drills.xy,
+                                      transOffset=self.axes.transData,
+                                      facecolors="#C40000",
+                                      edgecolors="#750000",
+                                      alpha=0.75,
+                                      zorder=3)
         else:
-            for geo in self.solid_geometry:
-                x, y = geo.exterior.coords.xy
-                self.axes.plot(x, y, 'r-')
-                for ints in geo.interiors:
-                    x, y = ints.coords.xy
-                    self.axes.plot(x, y, 'g-')
+            holes = EllipseCollection(diameters, diameters, 0, units='xy',
+                                      offsets=self.drills.xy,
+                                      transOffset=self.axes.transData,
+                                      facecolors="none",
+                                      edgecolors="r")
+        self.axes.add_collection(holes)
 
         self.app.plotcanvas.auto_adjust_axes()
 
@@ -1406,30 +1423,18 @@ class FlatCAMGeometry(FlatCAMObj, Geometry):
             assert isinstance(geo_obj, FlatCAMGeometry), \
                 "Initializer expected a FlatCAMGeometry, got %s" % type(geo_obj)
 
-            geo_obj.solid_geometry = []
-
-            for poly in recurse(self.solid_geometry):
-
-                if self.options["paintmethod"] == "seed":
-                    # Type(cp) == FlatCAMRTreeStorage | None
-                    cp = self.clear_polygon2(poly.buffer(-self.options["paintmargin"]),
-                                             tooldia, overlap=overlap, contour=contour,
-                                             connect=connect)
-
-                elif self.options["paintmethod"] == "lines":
-                    # Type(cp) == FlatCAMRTreeStorage | None
-                    cp = self.clear_polygon3(poly.buffer(-self.options["paintmargin"]),
-                                             tooldia, overlap=overlap, contour=contour,
-                                             connect=connect)
-
-                else:
-                    # Type(cp) == FlatCAMRTreeStorage | None
-                    cp = self.clear_polygon(poly.buffer(-self.options["paintmargin"]),
-                                            tooldia, overlap=overlap, contour=contour,
-                                            connect=connect)
-
-                if cp is not None:
-                    geo_obj.solid_geometry += list(cp.get_objects())
+            def report(done, total):
+                app_obj.progress.emit(int(100.0 * done / total))
+
+            # In parallel if so configured. See paint_polygons().
+            geo_obj.solid_geometry = paint_polygons(list(recurse(self.solid_geometry)),
+                                                    tooldia, overlap,
+                                                    method=self.options["paintmethod"],
+                                                    margin=self.options["paintmargin"],
+                                                    contour=contour, connect=connect,
+                                                    processes=Geometry.defaults["paint_processes"] or None,
+                                                    callback=report)
+            app_obj.progress.emit(0)
 
             geo_obj.options["cnctooldia"] = tooldia
 
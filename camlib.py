@@ -16,7 +16,13 @@ from numpy.linalg import solve, norm
 from matplotlib.figure import Figure
 import re
 import sys
+import os
+import mmap
+import hashlib
+import cPickle
+import multiprocessing
 import traceback
+import time
 from decimal import Decimal
 
 import collections
@@ -24,6 +30,7 @@ import numpy as np
 import matplotlib
 #import matplotlib.pyplot as plt
 #from scipy.spatial import Delaunay, KDTree
+from scipy.spatial import cKDTree
 
 from rtree import index as rtindex
 
@@ -35,7 +42,11 @@ from shapely.ops import cascaded_union, unary_union
 import shapely.affinity as affinity
 from shapely.wkt import loads as sloads
 from shapely.wkt import dumps as sdumps
+from shapely.wkb import loads as wkb_loads
 from shapely.geometry.base import BaseGeometry
+from shapely.prepared import prep
+from shapely.topology import TopologicalError
+from shapely.strtree import STRtree
 
 # Used for solid polygons in Matplotlib
 from descartes.patch import PolygonPatch
@@ -76,7 +87,27 @@ class Geometry(object):
     """
 
     defaults = {
-        "init_units": 'in'
+        "init_units": 'in',
+
+        # Max. distance between arcs and the segments that represent
+        # them, in inches. 0 or None to use a number of steps per circle
+        # instead. See get_arc_tolerance().
+        "arc_tolerance": 0.0002,
+
+        # Worker processes for painting many polygons. 1 paints
+        # them one after the other, 0 uses as many as CPUs.
+        # See paint_polygons().
+        "paint_processes": 1,
+
+        # Max. distance of the paths of Geometry.clear_polygon()
+        # to the exact offsets, as a fraction of the tool diameter.
+        # 0 offsets without simplifying, as before.
+        "paint_tolerance": 0.0,
+
+        # Grid of tiles x tiles and worker processes for
+        # get_empty_area(). See tiled_difference().
+        "empty_area_tiles": 1,
+        "empty_area_processes": 1
     }
 
     def __init__(self):
@@ -181,25 +212,50 @@ class Geometry(object):
     def subtract_polygon(self, points):
         """
         Subtract polygon from the given object. This only operates on the paths in the original geometry, i.e. it converts polygons into paths.
+        See subtract_polygons().
 
         :param points: The vertices of the polygon.
         :return: none
         """
+        self.subtract_polygons([Polygon(points)])
+
+    def subtract_polygons(self, polygons):
+        """
+        Subtract polygons from the given object. This only operates on the paths in the original geometry,
+        i.e. it converts polygons into paths. Paths that no polygon touches are kept as they are.
+
+        :param polygons: List of Shapely polygons.
+        :type polygons: list
+        :return: none
+        """
         if self.solid_geometry is None:
             self.solid_geometry = []
 
         #pathonly should be allways True, otherwise polygons are not subtracted
         flat_geometry = self.flatten(pathonly=True)
         log.debug("%d paths" % len(flat_geometry))
-        polygon=Polygon(points)
-        toolgeo=cascaded_union(polygon)
-        diffs=[]
+
+        # Only paths within the bounds of a polygon are subtracted from.
+        index = STRtree(polygons)
+        paths = []
+        changed = 0
         for target in flat_geometry:
             if type(target) == LineString or type(target) == LinearRing:
-                diffs.append(target.difference(toolgeo))
+                tools = [poly for poly in index.query(target) if poly.intersects(target)]
+                if len(tools) == 0:
+                    paths.append(target)
+                    continue
+                changed += 1
+                diff = target.difference(cascaded_union(tools))
+                if type(diff) == LineString:
+                    if not diff.is_empty:
+                        paths.append(diff)
+                else:
+                    paths += [geo for geo in getattr(diff, 'geoms', []) if type(geo) == LineString]
             else:
                 log.warning("Not implemented.")
-        self.solid_geometry=cascaded_union(diffs)
+        log.debug("%d paths changed" % changed)
+        self.solid_geometry = paths
 
     def bounds(self):
         """
@@ -416,6 +472,22 @@ class Geometry(object):
         """
         return self.solid_geometry.buffer(offset)
 
+    def isolation_passes(self, offsets, processes=1):
+        """
+        Creates contours around geometry at each of the given
+        offset distances, like isolation_geometry() would.
+        See buffer_passes().
+
+        :param offsets: Offset distances.
+        :type offsets: list
+        :param processes: Number of worker processes. None for as
+            many as CPUs. With 1 no processes are started.
+        :type processes: int
+        :return: The buffered geometry for each offset.
+        :rtype: list
+        """
+        return buffer_passes(self.solid_geometry, offsets, processes=processes)
+
     def import_svg(self, filename, flip=True):
         """
         Imports shapes from an SVG file into the object's geometry.
@@ -464,19 +536,25 @@ class Geometry(object):
         bounds = self.bounds()
         return bounds[2] - bounds[0], bounds[3] - bounds[1]
         
-    def get_empty_area(self, boundary=None):
+    def get_empty_area(self, boundary=None, callback=None):
         """
         Returns the complement of self.solid_geometry within
         the given boundary polygon. If not specified, it defaults to
         the rectangular bounding box of self.solid_geometry.
+
+        It is computed in tiles, as set in Geometry.defaults.
+        See tiled_difference().
         """
         if boundary is None:
             boundary = self.solid_geometry.envelope
-        return boundary.difference(self.solid_geometry)
+        return tiled_difference(boundary, self.solid_geometry,
+                                tiles=Geometry.defaults["empty_area_tiles"],
+                                processes=Geometry.defaults["empty_area_processes"] or None,
+                                callback=callback)
         
     @staticmethod
     def clear_polygon(polygon, tooldia, overlap=0.15, connect=True,
-                      contour=True):
+                      contour=True, tolerance=None, stats=None):
         """
         Creates geometry inside a polygon for a tool to cover
         the whole area.
@@ -484,6 +562,12 @@ class Geometry(object):
         This algorithm shrinks the edges of the polygon and takes
         the resulting edges as toolpaths.
 
+        Each offset is simplified to within ``tolerance`` before
+        taking the next one, from it or from the original polygon,
+        whichever has fewer vertices. The first offset is made
+        ``tolerance`` larger, so the simplified paths stay
+        ``tooldia / 2`` from the edges.
+
         :param polygon: Polygon to clear.
         :param tooldia: Diameter of the tool.
         :param overlap: Overlap of toolpasses.
@@ -491,6 +575,13 @@ class Geometry(object):
                         minimize tool lifts.
         :param contour: Paint around the edges. Inconsequential in
                         this painting method.
+        :param tolerance: Max. distance of the simplified paths to
+            the offsets. None for Geometry.defaults["paint_tolerance"]
+            times tooldia. 0 to offset each time from the previous
+            offset, without simplifying.
+        :param stats: If a list, the number of vertices of each
+            offset, before and after simplifying, are appended to it.
+        :type stats: list or None
         :return:
         """
 
@@ -498,6 +589,13 @@ class Geometry(object):
         assert type(polygon) == Polygon or type(polygon) == MultiPolygon, \
             "Expected a Polygon or MultiPolygon, got %s" % type(polygon)
 
+        if tolerance is None:
+            tolerance = Geometry.defaults["paint_tolerance"] * tooldia
+
+        def count_vertices(polys):
+            return sum(len(ring.coords) for poly in polys
+                       for ring in [poly.exterior] + list(poly.interiors))
+
         ## The toolpaths
         # Index first and last points in paths
         def get_pts(o):
@@ -507,45 +605,42 @@ class Geometry(object):
 
         # Can only result in a Polygon or MultiPolygon
         # NOTE: The resulting polygon can be "empty".
-        current = polygon.buffer(-tooldia / 2.0)
+        offset = tooldia / 2.0 + tolerance
+        current = polygon.buffer(-offset)
         if current.area == 0:
             # Otherwise, trying to to insert current.exterior == None
             # into the FlatCAMStorage will fail.
             return None
 
-        # current can be a MultiPolygon
-        try:
-            for p in current:
+        step = tooldia * (1 - overlap)
+        polygon_vertices = count_vertices(autolist_polygons(polygon))
+        ladder = []
+
+        while current.area > 0:
+            vertices = count_vertices(autolist_polygons(current))
+            if tolerance > 0:
+                current = current.simplify(tolerance, preserve_topology=True)
+
+            # current can be a MultiPolygon
+            polys = autolist_polygons(current)
+            for p in polys:
                 geoms.insert(p.exterior)
                 for i in p.interiors:
                     geoms.insert(i)
 
-        # Not a Multipolygon. Must be a Polygon
-        except TypeError:
-            geoms.insert(current.exterior)
-            for i in current.interiors:
-                geoms.insert(i)
-
-        while True:
+            simplified = count_vertices(polys)
+            ladder.append((vertices, simplified))
 
             # Can only result in a Polygon or MultiPolygon
-            current = current.buffer(-tooldia * (1 - overlap))
-            if current.area > 0:
-
-                # current can be a MultiPolygon
-                try:
-                    for p in current:
-                        geoms.insert(p.exterior)
-                        for i in p.interiors:
-                            geoms.insert(i)
-
-                # Not a Multipolygon. Must be a Polygon
-                except TypeError:
-                    geoms.insert(current.exterior)
-                    for i in current.interiors:
-                        geoms.insert(i)
+            offset += step
+            if tolerance > 0 and polygon_vertices < simplified:
+                current = polygon.buffer(-offset)
             else:
-                break
+                current = current.buffer(-step)
+
+        log.debug("Vertices per offset: %s" % ", ".join("%d/%d" % counts for counts in ladder))
+        if stats is not None:
+            stats += ladder
 
         # Optimization: Reduce lifts
         if connect:
@@ -666,7 +761,7 @@ class Geometry(object):
         geoms = FlatCAMRTreeStorage()
         geoms.get_points = get_pts
 
-        lines = []
+        ys = []
 
         # Bounding box
         left, bot, right, top = polygon.bounds
@@ -674,31 +769,31 @@ class Geometry(object):
         # First line
         y = top - tooldia / 2
         while y > bot + tooldia / 2:
-            line = LineString([(left, y), (right, y)])
-            lines.append(line)
+            ys.append(y)
             y -= tooldia * (1 - overlap)
 
         # Last line
         y = bot + tooldia / 2
-        line = LineString([(left, y), (right, y)])
-        lines.append(line)
-
-        # Combine
-        linesgeo = unary_union(lines)
+        ys.append(y)
 
         # Trim to the polygon
         margin_poly = polygon.buffer(-tooldia / 2)
-        lines_trimmed = linesgeo.intersection(margin_poly)
+        margin_polys = autolist_polygons(margin_poly)
+        rows, x0, x1 = scanline_segments(margin_polys, ys)
 
-        # Add lines to storage
-        for line in lines_trimmed:
-            geoms.insert(line)
+        # Add lines to storage, every other row from right
+        # to left so that rows follow each other.
+        for row, xa, xb in zip(rows, x0, x1):
+            if row % 2:
+                xa, xb = xb, xa
+            geoms.insert(LineString([(xa, ys[row]), (xb, ys[row])]))
 
         # Add margin (contour) to storage
         if contour:
-            geoms.insert(margin_poly.exterior)
-            for ints in margin_poly.interiors:
-                geoms.insert(ints)
+            for poly in margin_polys:
+                geoms.insert(poly.exterior)
+                for ints in poly.interiors:
+                    geoms.insert(ints)
 
         # Optimization: Reduce lifts
         if connect:
@@ -729,11 +824,16 @@ class Geometry(object):
         return
 
     @staticmethod
-    def paint_connect(storage, boundary, tooldia, max_walk=None):
+    def paint_connect(storage, boundary, tooldia, max_walk=None, stats=None):
         """
         Connects paths that results in a connection segment that is
         within the paint area. This avoids unnecessary tool lifting.
 
+        A connection is within the paint area when the tool, moving
+        along it, stays within ``boundary``, that is, when the segment
+        is within ``boundary`` offset inwards by half the tool diameter.
+        The offset boundary is computed and prepared only once.
+
         :param storage: Geometry to be optimized.
         :type storage: FlatCAMRTreeStorage
         :param boundary: Polygon defining the limits of the paintable area.
@@ -742,6 +842,10 @@ class Geometry(object):
         :rtype tooldia: float
         :param max_walk: Maximum allowable distance without lifting tool.
         :type max_walk: float or None
+        :param stats: If a dictionary, the number of connections
+            tested ('tests'), of those accepted ('joins') and the
+            time taken in seconds ('time') are added to it.
+        :type stats: dict or None
         :return: Optimized geometry.
         :rtype: FlatCAMRTreeStorage
         """
@@ -750,79 +854,72 @@ class Geometry(object):
         # 10 times the tool diameter
         max_walk = max_walk or 10 * tooldia
 
-        # Assuming geolist is a flat list of flat elements
+        t0 = time.time()
+        tests = 0
+        joins = 0
+
+        # Where the center of the tool can go. Slightly larger, so
+        # that walks along its edge are not lost to rounding errors.
+        walkable = prep(boundary.buffer(-tooldia / 2 * (1 - 1e-6)))
 
         ## Index first and last points in paths
         def get_pts(o):
             return [o.coords[0], o.coords[-1]]
 
-        # storage = FlatCAMRTreeStorage()
-        # storage.get_points = get_pts
-        #
-        # for shape in geolist:
-        #     if shape is not None:  # TODO: This shouldn't have happened.
-        #         # Make LlinearRings into linestrings otherwise
-        #         # When chaining the coordinates path is messed up.
-        #         storage.insert(LineString(shape))
-        #         #storage.insert(shape)
-
         ## Iterate over geometry paths getting the nearest each time.
-        #optimized_paths = []
+        # The path being built is kept as a list of coordinate
+        # arrays, made into a LineString once it ends.
         optimized_paths = FlatCAMRTreeStorage()
         optimized_paths.get_points = get_pts
-        path_count = 0
         current_pt = (0, 0)
-        pt, geo = storage.nearest(current_pt)
+        try:
+            pt, geo = storage.nearest(current_pt)
+        except StopIteration:  # Nothing to connect.
+            return optimized_paths
         storage.remove(geo)
-        geo = LineString(geo)
-        current_pt = geo.coords[-1]
+        path = [np.asarray(geo.coords)]
+        current_pt = tuple(path[-1][-1])
         try:
             while True:
-                path_count += 1
-                #log.debug("Path %d" % path_count)
-
                 pt, candidate = storage.nearest(current_pt)
                 storage.remove(candidate)
-                candidate = LineString(candidate)
+                coords = np.asarray(candidate.coords)
 
                 # If last point in geometry is the nearest
                 # then reverse coordinates.
                 # but prefer the first one if last == first
-                if pt != candidate.coords[0] and pt == candidate.coords[-1]:
-                    candidate.coords = list(candidate.coords)[::-1]
+                if pt != tuple(coords[0]) and pt == tuple(coords[-1]):
+                    coords = coords[::-1]
 
                 # Straight line from current_pt to pt.
                 # Is the toolpath inside the geometry?
-                walk_path = LineString([current_pt, pt])
-                walk_cut = walk_path.buffer(tooldia / 2)
-
-                if walk_cut.within(boundary) and walk_path.length < max_walk:
-                    #log.debug("Walk to path #%d is inside. Joining." % path_count)
-
-                    # Completely inside. Append...
-                    geo.coords = list(geo.coords) + list(candidate.coords)
-                    # try:
-                    #     last = optimized_paths[-1]
-                    #     last.coords = list(last.coords) + list(geo.coords)
-                    # except IndexError:
-                    #     optimized_paths.append(geo)
-
+                if pt == current_pt:
+                    # Already connected.
+                    joins += 1
+                    path.append(coords[1:])
                 else:
+                    walk_path = LineString([current_pt, pt])
+                    tests += 1
+                    if walk_path.length < max_walk and walkable.covers(walk_path):
+                        # Completely inside. Append...
+                        joins += 1
+                        path.append(coords)
+                    else:
+                        # Have to lift tool. End path.
+                        optimized_paths.insert(LineString(np.vstack(path)))
+                        path = [coords]
 
-                    # Have to lift tool. End path.
-                    #log.debug("Path #%d not within boundary. Next." % path_count)
-                    #optimized_paths.append(geo)
-                    optimized_paths.insert(geo)
-                    geo = candidate
-
-                current_pt = geo.coords[-1]
-
-                # Next
-                #pt, geo = storage.nearest(current_pt)
+                current_pt = tuple(path[-1][-1])
 
         except StopIteration:  # Nothing left in storage.
-            #pass
-            optimized_paths.insert(geo)
+            optimized_paths.insert(LineString(np.vstack(path)))
+
+        elapsed = time.time() - t0
+        log.debug("paint_connect(): %d tests, %d joins in %.3f s" % (tests, joins, elapsed))
+        if stats is not None:
+            stats['tests'] = stats.get('tests', 0) + tests
+            stats['joins'] = stats.get('joins', 0) + joins
+            stats['time'] = stats.get('time', 0.0) + elapsed
 
         return optimized_paths
 
@@ -831,9 +928,11 @@ class Geometry(object):
         """
         Simplifies paths in the FlatCAMRTreeStorage storage by
         connecting paths that touch on their enpoints.
+        See join_paths().
 
         :param storage: Storage containing the initial paths.
         :rtype storage: FlatCAMRTreeStorage
+        :param origin: Not used.
         :return: Simplified storage.
         :rtype: FlatCAMRTreeStorage
         """
@@ -843,98 +942,14 @@ class Geometry(object):
         ## Index first and last points in paths
         def get_pts(o):
             return [o.coords[0], o.coords[-1]]
-        #
-        # storage = FlatCAMRTreeStorage()
-        # storage.get_points = get_pts
-        #
-        # for shape in pathlist:
-        #     if shape is not None:  # TODO: This shouldn't have happened.
-        #         storage.insert(shape)
 
-        path_count = 0
-        pt, geo = storage.nearest(origin)
-        storage.remove(geo)
-        #optimized_geometry = [geo]
+        paths = list(storage.get_objects())
         optimized_geometry = FlatCAMRTreeStorage()
         optimized_geometry.get_points = get_pts
-        #optimized_geometry.insert(geo)
-        try:
-            while True:
-                path_count += 1
-
-                #print "geo is", geo
-
-                _, left = storage.nearest(geo.coords[0])
-                #print "left is", left
-
-                # If left touches geo, remove left from original
-                # storage and append to geo.
-                if type(left) == LineString:
-                    if left.coords[0] == geo.coords[0]:
-                        storage.remove(left)
-                        geo.coords = list(geo.coords)[::-1] + list(left.coords)
-                        continue
-
-                    if left.coords[-1] == geo.coords[0]:
-                        storage.remove(left)
-                        geo.coords = list(left.coords) + list(geo.coords)
-                        continue
-
-                    if left.coords[0] == geo.coords[-1]:
-                        storage.remove(left)
-                        geo.coords = list(geo.coords) + list(left.coords)
-                        continue
-
-                    if left.coords[-1] == geo.coords[-1]:
-                        storage.remove(left)
-                        geo.coords = list(geo.coords) + list(left.coords)[::-1]
-                        continue
-
-                _, right = storage.nearest(geo.coords[-1])
-                #print "right is", right
-
-                # If right touches geo, remove left from original
-                # storage and append to geo.
-                if type(right) == LineString:
-                    if right.coords[0] == geo.coords[-1]:
-                        storage.remove(right)
-                        geo.coords = list(geo.coords) + list(right.coords)
-                        continue
-
-                    if right.coords[-1] == geo.coords[-1]:
-                        storage.remove(right)
-                        geo.coords = list(geo.coords) + list(right.coords)[::-1]
-                        continue
-
-                    if right.coords[0] == geo.coords[0]:
-                        storage.remove(right)
-                        geo.coords = list(geo.coords)[::-1] + list(right.coords)
-                        continue
-
-                    if right.coords[-1] == geo.coords[0]:
-                        storage.remove(right)
-                        geo.coords = list(left.coords) + list(geo.coords)
-                        continue
-
-                # right is either a LinearRing or it does not connect
-                # to geo (nothing left to connect to geo), so we continue
-                # with right as geo.
-                storage.remove(right)
-
-                if type(right) == LinearRing:
-                    optimized_geometry.insert(right)
-                else:
-                    # Cannot exteng geo any further. Put it away.
-                    optimized_geometry.insert(geo)
-
-                    # Continue with right.
-                    geo = right
-
-        except StopIteration:  # Nothing found in storage.
+        for geo in join_paths(paths):
             optimized_geometry.insert(geo)
 
-        #print path_count
-        log.debug("path_count = %d" % path_count)
+        log.debug("%d paths connected into %d" % (len(paths), len(optimized_geometry.indexes)))
 
         return optimized_geometry
 
@@ -1070,6 +1085,7 @@ class ApertureMacro:
     amcomm_re = re.compile(r'^0(.*)')
     amprim_re = re.compile(r'^[1-9].*')
     amvar_re = re.compile(r'^\$([0-9a-zA-z]+)=(.*)')
+    amtoken_re = re.compile(r'\$(\d+|[a-zA-Z][0-9a-zA-Z]*)|[xX]')
 
     def __init__(self, name=None):
         self.name = name
@@ -1081,6 +1097,13 @@ class ApertureMacro:
         self.locvars = {}
         self.geometry = None
 
+        ## Compiled content. See compile().
+        self.program = None
+
+        ## Geometry for each set of modifiers already used.
+        ## The key is (name, modifiers tuple).
+        self.geometry_cache = {}
+
     def to_dict(self):
         """
         Returns the object in a serializable form. Only the name and
@@ -1106,18 +1129,31 @@ class ApertureMacro:
         for attr in ['name', 'raw']:
             setattr(self, attr, d[attr])
 
-    def parse_content(self):
+        self.program = None
+        self.geometry_cache = {}
+
+    def __getstate__(self):
+        # The compiled program cannot be pickled. See ParseCache.
+        return self.to_dict()
+
+    def __setstate__(self, d):
+        self.__init__()
+        self.from_dict(d)
+
+    def compile(self):
         """
-        Creates numerical lists for all primitives in the aperture
-        macro (in ``self.raw``) by replacing all variables by their
-        values iteratively and evaluating expressions. Results
-        are stored in ``self.primitives``.
+        Splits the aperture macro (in ``self.raw``) into variable
+        definitions and primitives, and compiles their arithmetic
+        expressions so they can be evaluated for any modifiers
+        without parsing the macro again. Results are stored in
+        ``self.program`` as a list of ``('var', name, expression)``
+        and ``('prim', [expression, ...])`` steps.
 
         :return: None
         """
         # Cleanup
         self.raw = self.raw.replace('\n', '').replace('\r', '').strip(" *")
-        self.primitives = []
+        self.program = []
 
         # Separate parts
         parts = self.raw.split('*')
@@ -1133,24 +1169,11 @@ class ApertureMacro:
             # These are variables defined locally inside the macro. They can be
             # numerical constant or defind in terms of previously define
             # variables, which can be defined locally or in an aperture
-            # definition. All replacements ocurr here.
+            # definition.
             match = ApertureMacro.amvar_re.search(part)
             if match:
-                var = match.group(1)
-                val = match.group(2)
-
-                # Replace variables in value
-                for v in self.locvars:
-                    val = re.sub(r'\$'+str(v)+r'(?![0-9a-zA-Z])', str(self.locvars[v]), val)
-
-                # Make all others 0
-                val = re.sub(r'\$[0-9a-zA-Z](?![0-9a-zA-Z])', "0", val)
-
-                # Change x with *
-                val = re.sub(r'[xX]', "*", val)
-
-                # Eval() and store.
-                self.locvars[var] = eval(val)
+                self.program.append(('var', match.group(1),
+                                     ApertureMacro.compile_expression(match.group(2))))
                 continue
 
             ### Primitives
@@ -1160,22 +1183,73 @@ class ApertureMacro:
             # variables are defined in an aperture definition.
             match = ApertureMacro.amprim_re.search(part)
             if match:
-                ## Replace all variables
-                for v in self.locvars:
-                    part = re.sub(r'\$' + str(v) + r'(?![0-9a-zA-Z])', str(self.locvars[v]), part)
+                self.program.append(('prim', [ApertureMacro.compile_expression(x)
+                                              for x in part.split(",")]))
+                continue
 
-                # Make all others 0
-                part = re.sub(r'\$[0-9a-zA-Z](?![0-9a-zA-Z])', "0", part)
+            log.warning("Unknown syntax of aperture macro part: %s" % str(part))
 
-                # Change x with *
-                part = re.sub(r'[xX]', "*", part)
+    @staticmethod
+    def compile_expression(expr):
+        """
+        Compiles an arithmetic expression of an aperture macro.
+        Variables ($n) become names that are looked up when
+        evaluating (see evaluate_expression()) and ``x`` or ``X``
+        is multiplication.
 
-                ## Store
-                elements = part.split(",")
-                self.primitives.append([eval(x) for x in elements])
-                continue
+        :param expr: Expression, i.e. "$1x0.5".
+        :type expr: str
+        :return: Compiled expression
+        :rtype: code
+        """
 
-            log.warning("Unknown syntax of aperture macro part: %s" % str(part))
+        def replace(match):
+            if match.group(1) is not None:
+                return "v_" + match.group(1)
+            return "*"
+
+        return compile(ApertureMacro.amtoken_re.sub(replace, expr), '<aperture macro>', 'eval')
+
+    @staticmethod
+    def evaluate_expression(code, variables):
+        """
+        Evaluates an expression compiled with compile_expression().
+
+        :param code: Compiled expression.
+        :param variables: Values of the variables. The keys are the
+            variable names without the ``$``. Variables not in
+            here evaluate to 0.
+        :type variables: dict
+        :return: Value of the expression.
+        """
+
+        values = {}
+        for name in code.co_names:
+            values[name] = variables.get(name[2:], 0)
+        return eval(code, {}, values)
+
+    def parse_content(self):
+        """
+        Creates numerical lists for all primitives in the aperture
+        macro (in ``self.raw``) by evaluating variables iteratively,
+        starting with the ones in ``self.locvars``, and then the
+        expressions of the primitives. Results are stored in
+        ``self.primitives``.
+
+        :return: None
+        """
+
+        if self.program is None:
+            self.compile()
+
+        self.primitives = []
+
+        for step in self.program:
+            if step[0] == 'var':
+                self.locvars[step[1]] = ApertureMacro.evaluate_expression(step[2], self.locvars)
+            else:
+                self.primitives.append([ApertureMacro.evaluate_expression(x, self.locvars)
+                                        for x in step[1]])
 
     def append(self, data):
         """
@@ -1187,6 +1261,10 @@ class ApertureMacro:
         """
         self.raw += data
 
+        # Needs to be compiled again.
+        self.program = None
+        self.geometry_cache = {}
+
     @staticmethod
     def default2zero(n, mods):
         """
@@ -1392,36 +1470,316 @@ class ApertureMacro:
         }
 
         ## Store modifiers as local variables
-        modifiers = modifiers or []
-        modifiers = [float(m) for m in modifiers]
+        modifiers = tuple([float(m) for m in modifiers or []])
+
+        key = (self.name, modifiers)
+        if key in self.geometry_cache:
+            self.geometry = self.geometry_cache[key]
+            return self.geometry
+
         self.locvars = {}
         for i in range(0, len(modifiers)):
             self.locvars[str(i + 1)] = modifiers[i]
 
         ## Parse
-        self.primitives = []  # Cleanup
         self.geometry = Polygon()
         self.parse_content()
 
         ## Make the geometry
+        # Consecutive primitives with the same polarity are
+        # joined at once before adding them.
+        runs = []
         for primitive in self.primitives:
             # Make the primitive
             prim_geo = makers[str(int(primitive[0]))](primitive[1:])
 
-            # Add it (according to polarity)
-            # if self.geometry is None and prim_geo['pol'] == 1:
-            #     self.geometry = prim_geo['geometry']
-            #     continue
-            if prim_geo['pol'] == 1:
-                self.geometry = self.geometry.union(prim_geo['geometry'])
+            if len(runs) > 0 and runs[-1][0] == prim_geo['pol']:
+                runs[-1][1].append(prim_geo['geometry'])
+            else:
+                runs.append((prim_geo['pol'], [prim_geo['geometry']]))
+
+        # Add them (according to polarity)
+        for pol, geos in runs:
+            if pol == 1:
+                self.geometry = self.geometry.union(cascaded_union(geos))
                 continue
-            if prim_geo['pol'] == 0:
-                self.geometry = self.geometry.difference(prim_geo['geometry'])
+            if pol == 0:
+                self.geometry = self.geometry.difference(cascaded_union(geos))
                 continue
 
+        self.geometry_cache[key] = self.geometry
         return self.geometry
 
 
+class GerberPrimitives(object):
+    """
+    Compact record of what is drawn in a Gerber file, before it is
+    turned into geometry. Created by ``Gerber.parse_lines()``.
+
+    * ``apertures`` (list): Aperture dictionaries (see ``Gerber.apertures``)
+      in order of definition. Primitives refer to them by index, so an
+      aperture that is redefined gets a new entry.
+
+    * ``polarities`` (list): Polarity ('D' or 'C') of each layer.
+
+    * ``vertices`` (array): All path vertices, shape (V, 2).
+
+    * ``contours`` (array): One row per path, shape (C, 6):
+      ``[vstart, vstop, astart, astop, aperture, layer]``. Vertices
+      are ``vertices[vstart:vstop]`` and arcs ``arcs[astart:astop]``.
+      Regions have aperture -1.
+
+    * ``arcs`` (array): One row per arc, shape (A, 7):
+      ``[vertex, cx, cy, radius, start, stop, ccw]``. The arc ends
+      at the given vertex (index in the contour) and starts at
+      the previous one.
+
+    * ``flashes`` (array): Flash locations, shape (F, 2).
+
+    * ``flash_info`` (array): ``[aperture, layer]`` of each flash.
+
+    * ``units`` (str): Units of the coordinates, "IN" or "MM".
+
+    Arrays are filled as lists while parsing and converted in finish().
+    """
+
+    def __init__(self):
+        self.apertures = []
+
+        # Aperture id (str) of each entry in self.apertures
+        self.aperture_ids = []
+
+        # Aperture id (str) -> index in self.apertures
+        self.aperture_index = {}
+
+        self.polarities = ['D']
+
+        self.vertices = []
+        self.contours = []
+        self.arcs = []
+        self.flashes = []
+        self.flash_info = []
+
+        self.units = 'IN'
+
+    def define_aperture(self, apid, aperture):
+        """
+        Adds an aperture definition. Later primitives with this
+        aperture id will refer to it.
+
+        :param apid: Aperture id as in ``Gerber.apertures``.
+        :param aperture: Aperture dictionary.
+        :return: Index of the aperture.
+        """
+        self.aperture_index[apid] = len(self.apertures)
+        self.aperture_ids.append(apid)
+        self.apertures.append(aperture)
+        return self.aperture_index[apid]
+
+    def add_layer(self, polarity):
+        """
+        Starts a new layer with the given polarity.
+
+        :param polarity: 'D' or 'C'
+        :return: Index of the new layer.
+        """
+        self.polarities.append(polarity)
+        return len(self.polarities) - 1
+
+    def add_contour(self, path, path_arcs, aperture, layer):
+        """
+        :param path: List of [x, y].
+        :param path_arcs: List of (vertex, cx, cy, radius, start, stop, ccw).
+        :param aperture: Aperture index or -1 for a region.
+        :param layer: Layer index.
+        """
+        vstart = len(self.vertices)
+        astart = len(self.arcs)
+        self.vertices.extend(path)
+        self.arcs.extend(path_arcs)
+        self.contours.append([vstart, len(self.vertices), astart, len(self.arcs), aperture, layer])
+
+    def add_stroke(self, path, path_arcs, apid, layer):
+        """
+        Adds a path drawn with the given aperture.
+
+        :param apid: Aperture id. Must have been defined.
+        :raises KeyError: If the aperture is not defined or has no size.
+        """
+        aperture = self.aperture_index[apid]
+
+        # Strokes are buffered by the aperture size.
+        self.apertures[aperture]["size"]
+
+        self.add_contour(path, path_arcs, aperture, layer)
+
+    def add_region(self, path, path_arcs, layer):
+        """
+        Adds the boundary of a region (G36/G37).
+        """
+        self.add_contour(path, path_arcs, -1, layer)
+
+    def add_flash(self, x, y, apid, layer):
+        """
+        Adds a flash of the given aperture at (x, y).
+
+        :raises KeyError: If the aperture is not defined.
+        """
+        self.flashes.append((x, y))
+        self.flash_info.append((self.aperture_index[apid], layer))
+
+    def finish(self):
+        """
+        Converts the lists filled while parsing into arrays.
+        """
+        self.vertices = np.array(self.vertices, dtype=float).reshape((-1, 2))
+        self.contours = np.array(self.contours, dtype=int).reshape((-1, 6))
+        self.arcs = np.array(self.arcs, dtype=float).reshape((-1, 7))
+        self.flashes = np.array(self.flashes, dtype=float).reshape((-1, 2))
+        self.flash_info = np.array(self.flash_info, dtype=int).reshape((-1, 2))
+
+    def get_bounds(self):
+        """
+        Bounds of everything drawn with dark polarity, including the
+        extent of the apertures and of arcs. What is cleared is not
+        subtracted and discretized arcs lie within the exact ones, so
+        the bounds of the resulting geometry might be slightly smaller.
+
+        :return: (xmin, ymin, xmax, ymax) or None if nothing is drawn.
+        :rtype: tuple
+        """
+
+        # Half the size of each aperture, and their flash extents.
+        # Regions (aperture -1) get the last, zero, size.
+        half_sizes = np.array([ap.get("size", 0.0) / 2.0 for ap in self.apertures] + [0.0])
+        extents = []
+        for aperture in self.apertures:
+            flash = Gerber.create_flash_geometry(Point(0, 0), aperture)
+            if flash is None or flash.is_empty:
+                extents.append((0.0, 0.0, 0.0, 0.0))
+            else:
+                extents.append(flash.bounds)
+        extents = np.array(extents, dtype=float).reshape((-1, 4))
+
+        dark_layers = np.array([polarity == 'D' for polarity in self.polarities])
+        dark = dark_layers[self.contours[:, 5]]
+        pads = half_sizes[self.contours[:, 4]]
+
+        boxes = []
+
+        # Vertices
+        counts = self.contours[:, 1] - self.contours[:, 0]
+        vertex_dark = np.repeat(dark, counts)
+        vertex_pads = np.repeat(pads, counts)[vertex_dark, None]
+        vertices = self.vertices[vertex_dark]
+        boxes.append(np.hstack((vertices - vertex_pads, vertices + vertex_pads)))
+
+        # Arcs reaching beyond their ends, at 0, 90, 180 and 270 degrees.
+        arc_counts = self.contours[:, 3] - self.contours[:, 2]
+        arcs = self.arcs[np.repeat(dark, arc_counts)]
+        arc_pads = np.repeat(pads[dark], arc_counts[dark])
+        centers = arcs[:, 1:3]
+        radii = arcs[:, 3]
+        starts = arcs[:, 4]
+        ccw = arcs[:, 6] > 0
+        sweeps = np.where(ccw, arc_angle(starts, arcs[:, 5], "ccw"),
+                          arc_angle(starts, arcs[:, 5], "cw"))
+        for angle, direction in [(0, (1, 0)), (pi / 2, (0, 1)), (pi, (-1, 0)), (3 * pi / 2, (0, -1))]:
+            reached = np.where(ccw, (angle - starts) % (2 * pi), (starts - angle) % (2 * pi)) <= sweeps
+            points = centers[reached] + radii[reached, None] * direction
+            pad = arc_pads[reached, None]
+            boxes.append(np.hstack((points - pad, points + pad)))
+
+        # Flashes
+        flash_dark = dark_layers[self.flash_info[:, 1]]
+        flash_extents = extents[self.flash_info[flash_dark, 0]]
+        flashes = self.flashes[flash_dark]
+        boxes.append(np.hstack((flashes, flashes)) + flash_extents)
+
+        boxes = np.vstack(boxes)
+        if len(boxes) == 0:
+            return None
+
+        return tuple(boxes[:, :2].min(axis=0)) + tuple(boxes[:, 2:].max(axis=0))
+
+    def get_stats(self):
+        """
+        Statistics of what is drawn:
+
+        * ``bounds``: See get_bounds().
+        * ``apertures``: For each aperture id, a dictionary with the
+          number of ``strokes``, ``flashes`` and stroke ``vertices``.
+        * ``regions``: Number of regions.
+        * ``region_vertices``: Number of vertices in regions.
+        * ``arcs``: Number of arcs in strokes and regions.
+        * ``layers``: Number of polarity layers.
+
+        Vertices are as in the file, with arcs not discretized.
+
+        :rtype: dict
+        """
+
+        apertures = {}
+
+        def aperture_stats(index):
+            apid = self.aperture_ids[index]
+            if apid not in apertures:
+                apertures[apid] = {'strokes': 0, 'flashes': 0, 'vertices': 0}
+            return apertures[apid]
+
+        counts = self.contours[:, 1] - self.contours[:, 0]
+        regions = self.contours[:, 4] < 0
+        for index in np.unique(self.contours[~regions, 4]):
+            stroke = self.contours[:, 4] == index
+            stats = aperture_stats(index)
+            stats['strokes'] += int(stroke.sum())
+            stats['vertices'] += int(counts[stroke].sum())
+
+        indexes, flashes = np.unique(self.flash_info[:, 0], return_counts=True)
+        for index, count in zip(indexes, flashes):
+            aperture_stats(index)['flashes'] += int(count)
+
+        return {'bounds': self.get_bounds(),
+                'apertures': apertures,
+                'regions': int(regions.sum()),
+                'region_vertices': int(counts[regions].sum()),
+                'arcs': len(self.arcs),
+                'layers': len(self.polarities)}
+
+    def contour_points(self, i, steps_per_circ, tolerance=None):
+        """
+        Points of the given contour with its arcs discretized.
+        See arc_points().
+
+        :param i: Contour index.
+        :param steps_per_circ: Number of segments in a full circle.
+            Used if there is no tolerance.
+        :param tolerance: Max. distance between arcs and their segments.
+        :return: List of (x, y).
+        """
+        vstart, vstop, astart, astop = self.contours[i, :4]
+        points = self.vertices[vstart:vstop].tolist()
+        if astart == astop:
+            return points
+
+        result = []
+        last = 0
+        for vertex, cx, cy, radius, start, stop, ccw in self.arcs[astart:astop]:
+            vertex = int(vertex)
+            result += points[last:vertex]
+            this_arc = arc((cx, cy), radius, start, stop,
+                           "ccw" if ccw else "cw", steps_per_circ, tolerance)
+
+            # The last point in the computed arc can have
+            # numerical errors. The exact final point is the
+            # specified (x, y). Replace.
+            this_arc[-1] = tuple(points[vertex])
+            result += this_arc
+            last = vertex + 1
+        result += points[last:]
+        return result
+
+
 class Gerber (Geometry):
     """
     **ATTRIBUTES**
@@ -1450,6 +1808,11 @@ class Gerber (Geometry):
       *buffering* (or thickening) the ``paths`` with the aperture. These are
       generated from ``paths`` in ``buffer_paths()``.
 
+    * ``primitives`` (GerberPrimitives): What is drawn in the file, as
+      arrays. ``solid_geometry`` is built from it when first used, so it
+      can be built again, i.e. with a different ``steps_per_circ`` or
+      ``follow_paths``, without parsing the file again. See ``build_geometry()``.
+
     **USAGE**::
 
         g = Gerber()
@@ -1461,7 +1824,55 @@ class Gerber (Geometry):
 
     defaults = {
         "steps_per_circle": 40,
-        "use_buffer_for_union": True
+        "use_buffer_for_union": True,
+        "use_tiled_union": False,
+        "union_tiles": 4,
+        "union_processes": 0,
+        "isolation_processes": 1,
+        "use_streaming_union": False,
+        "stream_max_primitives": 2000,
+        "stream_max_vertices": 200000,
+        "use_statement_dispatch": True
+    }
+
+    #### Statement dispatch ####
+    # Every kind of statement handled in parse_lines(). Each one
+    # corresponds to one of the parser patterns below.
+    statement_kinds = frozenset(['am', 'lin', 'circ', 'opcode', 'quad', 'regionon',
+                                 'regionoff', 'ad', 'interp', 'tool', 'lpol',
+                                 'fmt', 'mode', 'units', 'absrel', 'comm', 'eof'])
+
+    # Kinds of statement that can start with the given characters
+    # (see statement_key()). Statements are only tried against these
+    # patterns, in the usual order. Anything not listed here is tried
+    # against all patterns.
+    # NOTE: fmt_re is not anchored at the beginning, so it is kept
+    # as a candidate for all % statements.
+    statement_dispatch = {
+        'X': frozenset(['lin', 'circ']),
+        'Y': frozenset(['lin', 'circ']),
+        'I': frozenset(['circ']),
+        'J': frozenset(['circ']),
+        'D': frozenset(['opcode', 'tool']),
+        'M': frozenset(['eof']),
+        'G01': frozenset(['lin', 'interp']),
+        'G02': frozenset(['circ', 'interp']),
+        'G03': frozenset(['circ', 'interp']),
+        'G04': frozenset(['comm']),
+        'G36': frozenset(['regionon']),
+        'G37': frozenset(['regionoff']),
+        'G54': frozenset(['tool']),
+        'G70': frozenset(['units']),
+        'G71': frozenset(['units']),
+        'G74': frozenset(['quad']),
+        'G75': frozenset(['quad']),
+        'G90': frozenset(['absrel']),
+        'G91': frozenset(['absrel']),
+        '%AM': frozenset(['am', 'fmt']),
+        '%AD': frozenset(['ad', 'fmt']),
+        '%LP': frozenset(['lpol', 'fmt']),
+        '%FS': frozenset(['fmt']),
+        '%MO': frozenset(['mode', 'fmt'])
     }
 
     def __init__(self, steps_per_circle=None):
@@ -1478,6 +1889,14 @@ class Gerber (Geometry):
 
         self.solid_geometry = Polygon()
 
+        # Set by parse_lines(). See build_geometry().
+        self.primitives = None
+        self.follow_paths = False
+
+        # Scaling, offset and mirroring done so far, applied to
+        # the geometry when it is built. As in affinity.affine_transform().
+        self.transform = [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]
+
         # Number format
         self.int_digits = 3
         """Number of integer digits in Gerber numbers. Used during parsing."""
@@ -1500,6 +1919,11 @@ class Gerber (Geometry):
         self.ser_attrs += ['int_digits', 'frac_digits', 'apertures',
                            'aperture_macros', 'solid_geometry']
 
+        # Attributes stored in the parse cache. See ParseCache.
+        self.cache_attrs = ['units', 'int_digits', 'frac_digits', 'apertures',
+                            'aperture_macros', 'primitives', 'follow_paths',
+                            'solid_geometry', 'parse_stats', 'bounds_cache']
+
         #### Parser patterns ####
         # FS - Format Specification
         # The format of X and Y must be the same!
@@ -1578,128 +2002,266 @@ class Gerber (Geometry):
         self.am1_re = re.compile(r'^%AM([^\*]+)\*([^%]+)?(%)?$')
         self.am2_re = re.compile(r'(.*)%$')
 
-        # How to discretize a circle.
+        # Statements in a buffer. See statement_generator().
+        # 1: A whole line ending with %
+        # 0: A statement ending with *, or what remains of the line.
+        self.stmt_re = re.compile(r'^[ \r]*([^\n]*%)[ \r]*$|[^*\n]*\*|[^*\n]*[^*\n \r]',
+                                  re.MULTILINE)
+
+        # How to discretize a circle. The number of steps is only
+        # used if arc_tolerance is 0.
         self.steps_per_circ = steps_per_circle or Gerber.defaults['steps_per_circle']
 
+        # Max. distance between arcs and their segments, in the units
+        # of the file. None for the default. See get_arc_tolerance().
+        self.arc_tolerance = None
+
         self.use_buffer_for_union = self.defaults["use_buffer_for_union"]
 
-    def scale(self, factor):
+        # Join polygons in tiles, in parallel. See tiled_union().
+        self.use_tiled_union = self.defaults["use_tiled_union"]
+        self.union_tiles = self.defaults["union_tiles"]
+        self.union_processes = self.defaults["union_processes"]
+
+        # Buffer the polygons for isolation in parallel.
+        # See buffer_passes().
+        self.isolation_processes = self.defaults["isolation_processes"]
+
+        # Join polygons while parsing to bound memory use. See StreamingUnion.
+        self.use_streaming_union = self.defaults["use_streaming_union"]
+        self.stream_max_primitives = self.defaults["stream_max_primitives"]
+        self.stream_max_vertices = self.defaults["stream_max_vertices"]
+
+        # Filled by parse_lines() (see GerberPrimitives.get_stats()) and
+        # build_geometry().
+        self.parse_stats = {}
+
+        # Bounds of solid_geometry, kept without looking at the geometry
+        # until it is set from outside. None if unknown. See bounds().
+        self.bounds_cache = None
+
+        # Connected pieces of copper in solid_geometry, with an index
+        # over them. None until needed. See get_nets().
+        self.nets = None
+        self.nets_index = None
+        self.nets_ids = {}
+
+        # Only try the patterns that can match a statement. See
+        # statement_dispatch. If False, all are tried in sequence.
+        self.use_statement_dispatch = self.defaults["use_statement_dispatch"]
+
+        # Flash geometry for each aperture, at the origin. See get_flash().
+        # Keys are indexes in primitives.apertures and values are (geometry, exterior, interiors),
+        # the last two being coordinate arrays if the geometry is a Polygon.
+        self.flash_templates = {}
+
+    @property
+    def solid_geometry(self):
+        if self.geometry_stale:
+            self.build_geometry()
+        return self._solid_geometry
+
+    @solid_geometry.setter
+    def solid_geometry(self, geometry):
+        self._solid_geometry = geometry
+        self.geometry_stale = False
+        self.bounds_cache = None
+        self.nets = None
+
+    def bounds(self):
+        """
+        Returns coordinates of rectangular bounds
+        of geometry: (xmin, ymin, xmax, ymax). These are known
+        from parsing, without building the geometry, until
+        ``solid_geometry`` is set from outside.
         """
-        Scales the objects' geometry on the XY plane by a given factor.
-        These are:
 
-        * ``buffered_paths``
-        * ``flash_geometry``
-        * ``solid_geometry``
-        * ``regions``
+        if self.bounds_cache is not None:
+            return self.bounds_cache
+        return Geometry.bounds(self)
 
-        NOTE:
-        Does not modify the data used to create these elements. If these
-        are recreated, the scaling will be lost. This behavior was modified
-        because of the complexity reached in this class.
+    def get_nets(self):
+        """
+        The connected pieces of copper (nets) in ``solid_geometry``,
+        which are the polygons in it once joined. They are found the
+        first time and kept, with an STRtree over them, until the
+        geometry changes. Each can be isolated or painted on its
+        own, as in isolation_passes() or paint_polygons().
 
-        :param factor: Number by which to scale.
-        :type factor: float
-        :rtype : None
+        :return: List of polygons. The index in the list
+            identifies the net.
+        :rtype: list
         """
 
-        ## solid_geometry ???
-        #  It's a cascaded union of objects.
-        self.solid_geometry = affinity.scale(self.solid_geometry, factor,
-                                             factor, origin=(0, 0))
+        if self.nets is None:
+            geometry = self.solid_geometry
+            if type(geometry) is list:
+                # Not joined (follow_paths), no polygons.
+                self.nets = []
+            else:
+                self.nets = autolist_polygons(geometry)
+            self.nets_index = STRtree(self.nets)
+            self.nets_ids = dict((id(net), i) for i, net in enumerate(self.nets))
 
-        # # Now buffered_paths, flash_geometry and solid_geometry
-        # self.create_geometry()
+        return self.nets
 
-    def offset(self, vect):
+    def find_nets(self, geometry):
         """
-        Offsets the objects' geometry on the XY plane by a given vector.
-        These are:
+        Nets touching the given geometry. See get_nets().
 
-        * ``buffered_paths``
-        * ``flash_geometry``
-        * ``solid_geometry``
-        * ``regions``
+        :param geometry: Shapely geometry.
+        :return: Sorted indexes of the nets.
+        :rtype: list
+        """
 
-        NOTE:
-        Does not modify the data used to create these elements. If these
-        are recreated, the scaling will be lost. This behavior was modified
-        because of the complexity reached in this class.
+        self.get_nets()
+        prepared = prep(geometry)
+        return sorted(self.nets_ids[id(net)] for net in self.nets_index.query(geometry)
+                      if prepared.intersects(net))
 
-        :param vect: (x, y) offset vector.
-        :type vect: tuple
-        :return: None
+    def get_net_stats(self):
         """
+        Bounds, area and number of holes of each net.
+        See get_nets().
 
-        dx, dy = vect
+        :return: A dictionary for each net, with keys
+            'bounds', 'area' and 'holes'.
+        :rtype: list
+        """
 
-        ## Solid geometry
-        self.solid_geometry = affinity.translate(self.solid_geometry, xoff=dx, yoff=dy)
+        return [{'bounds': net.bounds, 'area': net.area, 'holes': len(net.interiors)}
+                for net in self.get_nets()]
 
-    # def mirror(self, axis, point):
-    #     """
-    #     Mirrors the object around a specified axis passign through
-    #     the given point. What is affected:
-    #
-    #     * ``buffered_paths``
-    #     * ``flash_geometry``
-    #     * ``solid_geometry``
-    #     * ``regions``
-    #
-    #     NOTE:
-    #     Does not modify the data used to create these elements. If these
-    #     are recreated, the scaling will be lost. This behavior was modified
-    #     because of the complexity reached in this class.
-    #
-    #     :param axis: "X" or "Y" indicates around which axis to mirror.
-    #     :type axis: str
-    #     :param point: [x, y] point belonging to the mirror axis.
-    #     :type point: list
-    #     :return: None
-    #     """
-    #
-    #     px, py = point
-    #     xscale, yscale = {"X": (1.0, -1.0), "Y": (-1.0, 1.0)}[axis]
-    #
-    #     ## solid_geometry ???
-    #     #  It's a cascaded union of objects.
-    #     self.solid_geometry = affinity.scale(self.solid_geometry,
-    #                                          xscale, yscale, origin=(px, py))
+    def isolation_passes(self, offsets, processes=1):
+        """
+        Like Geometry.isolation_passes(), from the nets.
+        See get_nets().
+        """
+        return buffer_passes(self.get_nets(), offsets, processes=processes)
 
-    def aperture_parse(self, apertureId, apertureType, apParameters):
+    def invalidate_geometry(self):
         """
-        Parse gerber aperture definition into dictionary of apertures.
-        The following kinds and their attributes are supported:
+        Marks ``solid_geometry`` to be built again from ``primitives``
+        next time it is used. Call after changing ``steps_per_circ``,
+        ``follow_paths`` or the union options.
 
-        * *Circular (C)*: size (float)
-        * *Rectangle (R)*: width (float), height (float)
-        * *Obround (O)*: width (float), height (float).
-        * *Polygon (P)*: diameter(float), vertices(int), [rotation(float)]
-        * *Aperture Macro (AM)*: macro (ApertureMacro), modifiers (list)
+        :return: None
+        """
 
-        :param apertureId: Id of the aperture being defined.
-        :param apertureType: Type of the aperture.
-        :param apParameters: Parameters of the aperture.
-        :type apertureId: str
-        :type apertureType: str
-        :type apParameters: str
-        :return: Identifier of the aperture.
-        :rtype: str
+        if self.primitives is not None:
+            self.geometry_stale = True
+            self.nets = None
+
+    def transform_geometry(self, matrix):
         """
+        Applies the affine transformation to the geometry, if built,
+        and records it in ``self.transform`` for when it is built again.
 
-        # Found some Gerber with a leading zero in the aperture id and the
-        # referenced it without the zero, so this is a hack to handle that.
-        apid = str(int(apertureId))
+        :param matrix: [a, b, d, e, xoff, yoff] as in
+            ``affinity.affine_transform()``.
+        :type matrix: list
+        :return: None
+        """
 
-        try:  # Could be empty for aperture macros
-            paramList = apParameters.split('X')
-        except:
-            paramList = None
+        a, b, d, e, xoff, yoff = matrix
+        ta, tb, td, te, txoff, tyoff = self.transform
+        self.transform = [a * ta + b * td, a * tb + b * te,
+                          d * ta + e * td, d * tb + e * te,
+                          a * txoff + b * tyoff + xoff, d * txoff + e * tyoff + yoff]
 
-        if apertureType == "C":  # Circle, example: %ADD11C,0.1*%
-            self.apertures[apid] = {"type": "C",
-                                    "size": float(paramList[0])}
-            return apid
+        if self.bounds_cache is not None:
+            self.bounds_cache = transform_bounds(self.bounds_cache, matrix)
+
+        self.nets = None
+
+        if self.geometry_stale:
+            return
+
+        if type(self._solid_geometry) is list:
+            self._solid_geometry = [affinity.affine_transform(geo, matrix)
+                                    for geo in self._solid_geometry]
+        else:
+            self._solid_geometry = affinity.affine_transform(self._solid_geometry, matrix)
+
+    def scale(self, factor):
+        """
+        Scales the objects' geometry on the XY plane by a given factor.
+        Recorded in ``self.transform``, so it is kept if the geometry
+        is built again.
+
+        :param factor: Number by which to scale.
+        :type factor: float
+        :rtype : None
+        """
+
+        self.transform_geometry([factor, 0.0, 0.0, factor, 0.0, 0.0])
+
+    def offset(self, vect):
+        """
+        Offsets the objects' geometry on the XY plane by a given vector.
+        Recorded in ``self.transform``, so it is kept if the geometry
+        is built again.
+
+        :param vect: (x, y) offset vector.
+        :type vect: tuple
+        :return: None
+        """
+
+        dx, dy = vect
+        self.transform_geometry([1.0, 0.0, 0.0, 1.0, dx, dy])
+
+    def mirror(self, axis, point):
+        """
+        Mirrors the object around a specified axis passign through
+        the given point. Recorded in ``self.transform``, so it is kept
+        if the geometry is built again.
+
+        :param axis: "X" or "Y" indicates around which axis to mirror.
+        :type axis: str
+        :param point: [x, y] point belonging to the mirror axis.
+        :type point: list
+        :return: None
+        """
+
+        px, py = point
+        xscale, yscale = {"X": (1.0, -1.0), "Y": (-1.0, 1.0)}[axis]
+        self.transform_geometry([xscale, 0.0, 0.0, yscale,
+                                 px - xscale * px, py - yscale * py])
+
+    def aperture_parse(self, apertureId, apertureType, apParameters):
+        """
+        Parse gerber aperture definition into dictionary of apertures.
+        The following kinds and their attributes are supported:
+
+        * *Circular (C)*: size (float)
+        * *Rectangle (R)*: width (float), height (float)
+        * *Obround (O)*: width (float), height (float).
+        * *Polygon (P)*: diameter(float), vertices(int), [rotation(float)]
+        * *Aperture Macro (AM)*: macro (ApertureMacro), modifiers (list)
+
+        :param apertureId: Id of the aperture being defined.
+        :param apertureType: Type of the aperture.
+        :param apParameters: Parameters of the aperture.
+        :type apertureId: str
+        :type apertureType: str
+        :type apParameters: str
+        :return: Identifier of the aperture.
+        :rtype: str
+        """
+
+        # Found some Gerber with a leading zero in the aperture id and the
+        # referenced it without the zero, so this is a hack to handle that.
+        apid = str(int(apertureId))
+
+        try:  # Could be empty for aperture macros
+            paramList = apParameters.split('X')
+        except:
+            paramList = None
+
+        if apertureType == "C":  # Circle, example: %ADD11C,0.1*%
+            self.apertures[apid] = {"type": "C",
+                                    "size": float(paramList[0])}
+            return apid
         
         if apertureType == "R":  # Rectangle, example: %ADD15R,0.05X0.12*%
             self.apertures[apid] = {"type": "R",
@@ -1745,6 +2307,9 @@ class Gerber (Geometry):
 
         First is ``G54D11*`` and seconds is ``G36*``.
 
+        The file is memory-mapped, or read at once if that is not
+        possible, and split with statement_generator().
+
         :param filename: Gerber file to parse.
         :type filename: str
         :param follow: If true, will not create polygons, just lines
@@ -1753,32 +2318,74 @@ class Gerber (Geometry):
         :return: None
         """
 
-        with open(filename, 'r') as gfile:
+        with open(filename, 'rb') as gfile:
+            try:
+                data = mmap.mmap(gfile.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, EnvironmentError):
+                # Empty files cannot be mapped.
+                data = gfile.read()
 
-            def line_generator():
-                for line in gfile:
-                    line = line.strip(' \r\n')
-                    while len(line) > 0:
+            try:
+                self.parse_lines(self.statement_generator(data), follow=follow)
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
 
-                        # If ends with '%' leave as is.
-                        if line[-1] == '%':
-                            yield line
-                            break
+    def cache_params(self):
+        """
+        Settings that change the result of parsing. See ParseCache.
 
-                        # Split after '*' if any.
-                        starpos = line.find('*')
-                        if starpos > -1:
-                            cleanline = line[:starpos + 1]
-                            yield cleanline
-                            line = line[starpos + 1:]
+        :rtype: dict
+        """
 
-                        # Otherwise leave as is.
-                        else:
-                            # yield cleanline
-                            yield line
-                            break
+        return {'parser': 'Gerber',
+                'steps_per_circle': self.steps_per_circ,
+                'arc_tolerance': self.arc_tolerance,
+                'default_arc_tolerance': Geometry.defaults['arc_tolerance'],
+                'units': self.units}
 
-            self.parse_lines(line_generator(), follow=follow)
+    def statement_generator(self, data):
+        """
+        Generator of Gerber statements in the given buffer. A line
+        ending with ``%`` is a single statement. Any other line is split
+        after every ``*``, and whatever follows the last ``*`` is a
+        statement too. The buffer is scanned once, so this is linear
+        even if the whole file is in a single line.
+
+        :param data: Gerber source.
+        :type data: str or mmap.mmap
+        :return: Generator of statements (str).
+        """
+
+        for match in self.stmt_re.finditer(data):
+            yield match.group(1) or match.group(0)
+
+    def statement_candidates(self, gline):
+        """
+        Kinds of statement that the given line could be, so only
+        the corresponding patterns need to be tried in parse_lines().
+        Lookup is done on the first character, or the first 3
+        characters for G-codes and % statements.
+
+        :param gline: Clean line of Gerber code.
+        :type gline: str
+        :return: Set of statement kinds. See ``Gerber.statement_kinds``.
+        :rtype: frozenset
+        """
+
+        if not self.use_statement_dispatch:
+            return self.statement_kinds
+
+        # fmt_re is not anchored and could match anywhere.
+        if gline[-1:] == '%' and gline[:1] != '%':
+            return self.statement_kinds
+
+        if gline[:1] in ('G', '%'):
+            key = gline[:3]
+        else:
+            key = gline[:1]
+
+        return self.statement_dispatch.get(key, self.statement_kinds)
 
     #@profile
     def parse_lines(self, glines, follow=False):
@@ -1794,16 +2401,23 @@ class Gerber (Geometry):
         :type follow: bool
         :return: None
         :rtype: None
+
+        Primitives are stored in ``self.primitives`` and the geometry
+        is built from them when ``self.solid_geometry`` is first used.
         """
 
         # Coordinates of the current path, each is [x, y]
         path = []
 
-        # Polygons are stored here until there is a change in polarity.
-        # Only then they are combined via cascaded_union and added or
-        # subtracted from solid_geometry. This is ~100 times faster than
-        # applyng a union for every new polygon.
-        poly_buffer = []
+        # Arcs in the current path. See GerberPrimitives.add_contour().
+        path_arcs = []
+
+        # Everything drawn is recorded here. Geometry is
+        # created from it later in build_geometry().
+        drawing = GerberPrimitives()
+
+        # Index of the current polarity layer in drawing.polarities
+        layer = 0
 
         last_path_aperture = None
         current_aperture = None
@@ -1848,12 +2462,15 @@ class Gerber (Geometry):
 
                 #log.debug("%3s %s" % (line_num, gline))
 
+                # Kinds of statement this line can be.
+                kinds = self.statement_candidates(gline)
+
                 ### Aperture Macros
                 # Having this at the beggining will slow things down
                 # but macros can have complicated statements than could
                 # be caught by other patterns.
                 if current_macro is None:  # No macro started yet
-                    match = self.am1_re.search(gline)
+                    match = 'am' in kinds and self.am1_re.search(gline)
                     # Start macro if match, else not an AM, carry on.
                     if match:
                         log.debug("Starting macro. Line %d: %s" % (line_num, gline))
@@ -1881,7 +2498,7 @@ class Gerber (Geometry):
                 ### G01 - Linear interpolation plus flashes
                 # Operation code (D0x) missing is deprecated... oh well I will support it.
                 # REGEX: r'^(?:G0?(1))?(?:X(-?\d+))?(?:Y(-?\d+))?(?:D0([123]))?\*$'
-                match = self.lin_re.search(gline)
+                match = 'lin' in kinds and self.lin_re.search(gline)
                 if match:
                     # Dxx alone?
                     # if match.group(1) is None and match.group(2) is None and match.group(3) is None:
@@ -1911,26 +2528,16 @@ class Gerber (Geometry):
                     elif current_operation_code == 2:
                         if len(path) > 1:
 
-                            ## --- BUFFERED ---
+                            ## --- Recorded ---
                             if making_region:
-                                if follow:
-                                    geo = Polygon()
-                                else:
-                                    geo = Polygon(path)
+                                drawing.add_region(path, path_arcs, layer)
                             else:
                                 if last_path_aperture is None:
                                     log.warning("No aperture defined for curent path. (%d)" % line_num)
-                                width = self.apertures[last_path_aperture]["size"]  # TODO: WARNING this should fail!
-                                #log.debug("Line %d: Setting aperture to %s before buffering." % (line_num, last_path_aperture))
-                                if follow:
-                                    geo = LineString(path)
-                                else:
-                                    geo = LineString(path).buffer(width / 2)
-
-                            if not geo.is_empty:
-                                poly_buffer.append(geo)
+                                drawing.add_stroke(path, path_arcs, last_path_aperture, layer)
 
                         path = [[current_x, current_y]]  # Start new path
+                        path_arcs = []
 
                     # Flash
                     # Not allowed in region mode.
@@ -1938,34 +2545,22 @@ class Gerber (Geometry):
 
                         # Create path draw so far.
                         if len(path) > 1:
-                            # --- Buffered ----
-                            width = self.apertures[last_path_aperture]["size"]
-
-                            if follow:
-                                geo = LineString(path)
-                            else:
-                                geo = LineString(path).buffer(width / 2)
-
-                            if not geo.is_empty:
-                                poly_buffer.append(geo)
+                            # --- Recorded ----
+                            drawing.add_stroke(path, path_arcs, last_path_aperture, layer)
 
                         # Reset path starting point
                         path = [[current_x, current_y]]
+                        path_arcs = []
 
-                        # --- BUFFERED ---
+                        # --- Recorded ---
                         # Draw the flash
-                        if follow:
-                            continue
-                        flash = Gerber.create_flash_geometry(Point([current_x, current_y]),
-                                                             self.apertures[current_aperture])
-                        if not flash.is_empty:
-                            poly_buffer.append(flash)
+                        drawing.add_flash(current_x, current_y, current_aperture, layer)
 
                     continue
 
                 ### G02/3 - Circular interpolation
                 # 2-clockwise, 3-counterclockwise
-                match = self.circ_re.search(gline)
+                match = 'circ' in kinds and self.circ_re.search(gline)
                 if match:
                     arcdir = [None, None, "cw", "ccw"]
 
@@ -2010,19 +2605,13 @@ class Gerber (Geometry):
                             if last_path_aperture is None:
                                 log.warning("No aperture defined for curent path. (%d)" % line_num)
 
-                            # --- BUFFERED ---
-                            width = self.apertures[last_path_aperture]["size"]
-
-                            if follow:
-                                buffered = LineString(path)
-                            else:
-                                buffered = LineString(path).buffer(width / 2)
-                            if not buffered.is_empty:
-                                poly_buffer.append(buffered)
+                            # --- Recorded ---
+                            drawing.add_stroke(path, path_arcs, last_path_aperture, layer)
 
                         current_x = x
                         current_y = y
                         path = [[current_x, current_y]]  # Start new path
+                        path_arcs = []
                         continue
 
                     # Flash should not happen here
@@ -2042,78 +2631,46 @@ class Gerber (Geometry):
                         else:
                             stop = arctan2(-center[1] + y, -center[0] + x)  # Stop angle
 
-                        this_arc = arc(center, radius, start, stop,
-                                       arcdir[current_interpolation_mode],
-                                       self.steps_per_circ)
-
-                        # The last point in the computed arc can have
-                        # numerical errors. The exact final point is the
-                        # specified (x, y). Replace.
-                        this_arc[-1] = (x, y)
+                        # Discretized when building the geometry. The exact
+                        # final point is the specified (x, y).
+                        path.append([x, y])
+                        path_arcs.append((len(path) - 1, center[0], center[1], radius,
+                                          start, stop, arcdir[current_interpolation_mode] == "ccw"))
 
                         # Last point in path is current point
-                        # current_x = this_arc[-1][0]
-                        # current_y = this_arc[-1][1]
                         current_x, current_y = x, y
 
-                        # Append
-                        path += this_arc
-
                         last_path_aperture = current_aperture
 
                         continue
 
                     if quadrant_mode == 'SINGLE':
 
-                        center_candidates = [
-                            [i + current_x, j + current_y],
-                            [-i + current_x, j + current_y],
-                            [i + current_x, -j + current_y],
-                            [-i + current_x, -j + current_y]
-                        ]
+                        # All four possible centers at once. The first
+                        # one giving an arc of at most 90 degrees is valid.
+                        centers = array([[i, j], [-i, j], [i, -j], [-i, -j]]) + [current_x, current_y]
+                        radius = sqrt(i ** 2 + j ** 2)
 
-                        valid = False
-                        log.debug("I: %f  J: %f" % (i, j))
-                        for center in center_candidates:
-                            radius = sqrt(i ** 2 + j ** 2)
+                        # Make sure radius to start is the same as radius to end.
+                        radii = sqrt((centers[:, 0] - x) ** 2 + (centers[:, 1] - y) ** 2)
 
-                            # Make sure radius to start is the same as radius to end.
-                            radius2 = sqrt((center[0] - x) ** 2 + (center[1] - y) ** 2)
-                            if radius2 < radius * 0.95 or radius2 > radius * 1.05:
-                                continue  # Not a valid center.
+                        offsets = centers - [current_x, current_y]
+                        starts = arctan2(-offsets[:, 1], -offsets[:, 0])  # Start angles
+                        stops = arctan2(-centers[:, 1] + y, -centers[:, 0] + x)  # Stop angles
+                        angles = arc_angle(starts, stops, arcdir[current_interpolation_mode])
 
-                            # Correct i and j and continue as with multi-quadrant.
-                            i = center[0] - current_x
-                            j = center[1] - current_y
+                        valid = np.flatnonzero((radii >= radius * 0.95) & (radii <= radius * 1.05) &
+                                               (angles <= (pi + 1e-6) / 2))
+                        log.debug("I: %f  J: %f  Valid centers: %s" % (i, j, valid))
 
-                            start = arctan2(-j, -i)  # Start angle
-                            stop = arctan2(-center[1] + y, -center[0] + x)  # Stop angle
-                            angle = abs(arc_angle(start, stop, arcdir[current_interpolation_mode]))
-                            log.debug("ARC START: %f, %f  CENTER: %f, %f  STOP: %f, %f" %
-                                      (current_x, current_y, center[0], center[1], x, y))
-                            log.debug("START Ang: %f, STOP Ang: %f, DIR: %s, ABS: %.12f <= %.12f: %s" %
-                                      (start * 180 / pi, stop * 180 / pi, arcdir[current_interpolation_mode],
-                                       angle * 180 / pi, pi / 2 * 180 / pi, angle <= (pi + 1e-6) / 2))
-
-                            if angle <= (pi + 1e-6) / 2:
-                                log.debug("########## ACCEPTING ARC ############")
-                                this_arc = arc(center, radius, start, stop,
-                                               arcdir[current_interpolation_mode],
-                                               self.steps_per_circ)
-
-                                # Replace with exact values
-                                this_arc[-1] = (x, y)
-
-                                # current_x = this_arc[-1][0]
-                                # current_y = this_arc[-1][1]
-                                current_x, current_y = x, y
-
-                                path += this_arc
-                                last_path_aperture = current_aperture
-                                valid = True
-                                break
-
-                        if valid:
+                        if len(valid) > 0:
+                            k = valid[0]
+                            path.append([x, y])
+                            path_arcs.append((len(path) - 1, centers[k, 0], centers[k, 1], radius,
+                                              starts[k], stops[k], arcdir[current_interpolation_mode] == "ccw"))
+
+                            current_x, current_y = x, y
+                            last_path_aperture = current_aperture
                             continue
                         else:
                             log.warning("Invalid arc in line %d." % line_num)
@@ -2121,29 +2678,22 @@ class Gerber (Geometry):
                 ### Operation code alone
                 # Operation code alone, usually just D03 (Flash)
                 # self.opcode_re = re.compile(r'^D0?([123])\*$')
-                match = self.opcode_re.search(gline)
+                match = 'opcode' in kinds and self.opcode_re.search(gline)
                 if match:
                     current_operation_code = int(match.group(1))
                     if current_operation_code == 3:
 
-                        ## --- Buffered ---
+                        ## --- Recorded ---
                         try:
                             log.debug("Bare op-code %d." % current_operation_code)
-                            # flash = Gerber.create_flash_geometry(Point(path[-1]),
-                            #                                      self.apertures[current_aperture])
-                            if follow:
-                                continue
-                            flash = Gerber.create_flash_geometry(Point(current_x, current_y),
-                                                                 self.apertures[current_aperture])
-                            if not flash.is_empty:
-                                poly_buffer.append(flash)
+                            drawing.add_flash(current_x, current_y, current_aperture, layer)
                         except IndexError:
                             log.warning("Line %d: %s -> Nothing there to flash!" % (line_num, gline))
 
                     continue
 
                 ### G74/75* - Single or multiple quadrant arcs
-                match = self.quad_re.search(gline)
+                match = 'quad' in kinds and self.quad_re.search(gline)
                 if match:
                     if match.group(1) == '4':
                         quadrant_mode = 'SINGLE'
@@ -2152,33 +2702,27 @@ class Gerber (Geometry):
                     continue
 
                 ### G36* - Begin region
-                if self.regionon_re.search(gline):
+                if 'regionon' in kinds and self.regionon_re.search(gline):
                     if len(path) > 1:
                         # Take care of what is left in the path
 
-                        ## --- Buffered ---
-                        width = self.apertures[last_path_aperture]["size"]
-
-                        if follow:
-                            geo = LineString(path)
-                        else:
-                            geo = LineString(path).buffer(width/2)
-                        if not geo.is_empty:
-                            poly_buffer.append(geo)
+                        ## --- Recorded ---
+                        drawing.add_stroke(path, path_arcs, last_path_aperture, layer)
 
                         path = [path[-1]]
+                        path_arcs = []
 
                     making_region = True
                     continue
 
                 ### G37* - End region
-                if self.regionoff_re.search(gline):
+                if 'regionoff' in kinds and self.regionoff_re.search(gline):
                     making_region = False
 
                     # Only one path defines region?
                     # This can happen if D02 happened before G37 and
-                    # is not and error.
-                    if len(path) < 3:
+                    # is not and error. An arc makes at least 3 points.
+                    if len(path) < 3 and not path_arcs:
                         # print "ERROR: Path contains less than 3 points:"
                         # print path
                         # print "Line (%d): " % line_num, gline
@@ -2190,39 +2734,34 @@ class Gerber (Geometry):
                     # self.regions.append({"polygon": Polygon(path),
                     #                      "aperture": last_path_aperture})
 
-                    # --- Buffered ---
-                    if follow:
-                        region = Polygon()
-                    else:
-                        region = Polygon(path)
-                    if not region.is_valid:
-                        if not follow:
-                            region = region.buffer(0)
-                    if not region.is_empty:
-                        poly_buffer.append(region)
+                    # --- Recorded ---
+                    drawing.add_region(path, path_arcs, layer)
 
                     path = [[current_x, current_y]]  # Start new path
+                    path_arcs = []
                     continue
 
                 ### Aperture definitions %ADD...
-                match = self.ad_re.search(gline)
+                match = 'ad' in kinds and self.ad_re.search(gline)
                 if match:
                     log.info("Found aperture definition. Line %d: %s" % (line_num, gline))
-                    self.aperture_parse(match.group(1), match.group(2), match.group(3))
+                    apid = self.aperture_parse(match.group(1), match.group(2), match.group(3))
+                    if apid is not None:
+                        drawing.define_aperture(apid, self.apertures[apid])
                     continue
 
                 ### G01/2/3* - Interpolation mode change
                 # Can occur along with coordinates and operation code but
                 # sometimes by itself (handled here).
                 # Example: G01*
-                match = self.interp_re.search(gline)
+                match = 'interp' in kinds and self.interp_re.search(gline)
                 if match:
                     current_interpolation_mode = int(match.group(1))
                     continue
 
                 ### Tool/aperture change
                 # Example: D12*
-                match = self.tool_re.search(gline)
+                match = 'tool' in kinds and self.tool_re.search(gline)
                 if match:
                     current_aperture = match.group(1)
                     log.debug("Line %d: Aperture change to (%s)" % (line_num, match.group(1)))
@@ -2230,49 +2769,30 @@ class Gerber (Geometry):
 
                     # Take care of the current path with the previous tool
                     if len(path) > 1:
-                        # --- Buffered ----
-                        width = self.apertures[last_path_aperture]["size"]
-
-                        if follow:
-                            geo = LineString(path)
-                        else:
-                            geo = LineString(path).buffer(width / 2)
-                        if not geo.is_empty:
-                            poly_buffer.append(geo)
+                        # --- Recorded ----
+                        drawing.add_stroke(path, path_arcs, last_path_aperture, layer)
 
                         path = [path[-1]]
+                        path_arcs = []
 
                     continue
 
                 ### Polarity change
                 # Example: %LPD*% or %LPC*%
-                # If polarity changes, creates geometry from current
-                # buffer, then adds or subtracts accordingly.
-                match = self.lpol_re.search(gline)
+                # If polarity changes, starts a new layer. Layers are
+                # added or subtracted when building the geometry.
+                match = 'lpol' in kinds and self.lpol_re.search(gline)
                 if match:
-                    if len(path) > 1 and current_polarity != match.group(1):
-
-                        # --- Buffered ----
-                        width = self.apertures[last_path_aperture]["size"]
+                    if current_polarity != match.group(1):
+                        if len(path) > 1:
 
-                        if follow:
-                            geo = LineString(path)
-                        else:
-                            geo = LineString(path).buffer(width / 2)
-                        if not geo.is_empty:
-                            poly_buffer.append(geo)
+                            # --- Recorded ----
+                            drawing.add_stroke(path, path_arcs, last_path_aperture, layer)
 
-                        path = [path[-1]]
+                            path = [path[-1]]
+                            path_arcs = []
 
-                    # --- Apply buffer ---
-                    # If added for testing of bug #83
-                    # TODO: Remove when bug fixed
-                    if len(poly_buffer) > 0:
-                        if current_polarity == 'D':
-                            self.solid_geometry = self.solid_geometry.union(cascaded_union(poly_buffer))
-                        else:
-                            self.solid_geometry = self.solid_geometry.difference(cascaded_union(poly_buffer))
-                        poly_buffer = []
+                        layer = drawing.add_layer(match.group(1))
 
                     current_polarity = match.group(1)
                     continue
@@ -2280,7 +2800,7 @@ class Gerber (Geometry):
                 ### Number format
                 # Example: %FSLAX24Y24*%
                 # TODO: This is ignoring most of the format. Implement the rest.
-                match = self.fmt_re.search(gline)
+                match = 'fmt' in kinds and self.fmt_re.search(gline)
                 if match:
                     absolute = {'A': True, 'I': False}
                     self.int_digits = int(match.group(3))
@@ -2289,7 +2809,7 @@ class Gerber (Geometry):
 
                 ### Mode (IN/MM)
                 # Example: %MOIN*%
-                match = self.mode_re.search(gline)
+                match = 'mode' in kinds and self.mode_re.search(gline)
                 if match:
                     #self.units = match.group(1)
 
@@ -2298,7 +2818,7 @@ class Gerber (Geometry):
                     continue
 
                 ### Units (G70/1) OBSOLETE
-                match = self.units_re.search(gline)
+                match = 'units' in kinds and self.units_re.search(gline)
                 if match:
                     #self.units = {'0': 'IN', '1': 'MM'}[match.group(1)]
 
@@ -2307,19 +2827,19 @@ class Gerber (Geometry):
                     continue
 
                 ### Absolute/relative coordinates G90/1 OBSOLETE
-                match = self.absrel_re.search(gline)
+                match = 'absrel' in kinds and self.absrel_re.search(gline)
                 if match:
                     absolute = {'0': True, '1': False}[match.group(1)]
                     continue
 
                 #### Ignored lines
                 ## Comments
-                match = self.comm_re.search(gline)
+                match = 'comm' in kinds and self.comm_re.search(gline)
                 if match:
                     continue
 
                 ## EOF
-                match = self.eof_re.search(gline)
+                match = 'eof' in kinds and self.eof_re.search(gline)
                 if match:
                     continue
 
@@ -2327,24 +2847,110 @@ class Gerber (Geometry):
                 log.warning("Line ignored (%d): %s" % (line_num, gline))
 
             if len(path) > 1:
-                # EOF, create shapely LineString if something still in path
+                # EOF, record what is still in path
+
+                ## --- Recorded ---
+                drawing.add_stroke(path, path_arcs, last_path_aperture, layer)
+
+            drawing.units = self.units
+            drawing.finish()
+            self.primitives = drawing
+            self.follow_paths = follow
+            self.transform = [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]
+            self.flash_templates = {}
+            self.geometry_stale = True
+            self.nets = None
+
+            self.parse_stats = drawing.get_stats()
+            self.bounds_cache = None if follow else self.parse_stats['bounds']
+
+        except Exception, err:
+            ex_type, ex, tb = sys.exc_info()
+            traceback.print_tb(tb)
+            #print traceback.format_exc()
+
+            log.error("PARSING FAILED. Line %d: %s" % (line_num, gline))
+            raise ParseError("Line %d: %s" % (line_num, gline), repr(err))
+
+    def build_geometry(self):
+        """
+        Creates ``solid_geometry`` from ``self.primitives``. Strokes
+        are buffered by the size of their aperture, regions become
+        polygons and flashes take the shape of their aperture. The
+        polygons of each layer are joined and then the layers are
+        combined by polarity. See ``resolve_polarity_layers()``.
+
+        If ``self.follow_paths`` is set, the result is the list of lines
+        followed by the strokes instead. See ``get_follow_geometry()``.
+
+        Fills ``self.parse_stats``:
+
+        * ``peak_primitives``: Max. number of polygons held before joining.
+        * ``max_rss``: Max. resident memory of the process in kB, if known.
+
+        :return: None
+        """
+
+        if self.follow_paths:
+            self.solid_geometry = self.get_follow_geometry()
+            return
 
-                ## --- Buffered ---
-                width = self.apertures[last_path_aperture]["size"]
-                if follow:
-                    geo = LineString(path)
+        drawing = self.primitives
+        tolerance = self.get_arc_tolerance()
+        contour_layers = drawing.contours[:, 5]
+        flash_layers = drawing.flash_info[:, 1]
+
+        layers = []
+        peak_primitives = 0
+        for layer, polarity in enumerate(drawing.polarities):
+
+            # Polygons are stored here until the layer is done.
+            # Only then they are combined via cascaded_union and added or
+            # subtracted from solid_geometry. This is ~100 times faster than
+            # applyng a union for every new polygon.
+            # When streaming, they are also joined every so many polygons.
+            if self.use_streaming_union:
+                poly_buffer = StreamingUnion(max_primitives=self.stream_max_primitives,
+                                             max_vertices=self.stream_max_vertices,
+                                             use_buffer=self.use_buffer_for_union)
+            else:
+                poly_buffer = []
+
+            for i in np.flatnonzero(contour_layers == layer):
+                aperture = drawing.contours[i, 4]
+                points = drawing.contour_points(i, self.steps_per_circ, tolerance)
+                if aperture < 0:
+                    geo = Polygon(points)
+                    if not geo.is_valid:
+                        geo = geo.buffer(0)
                 else:
-                    geo = LineString(path).buffer(width / 2)
+                    width = drawing.apertures[aperture]["size"]
+                    geo = LineString(points).buffer(width / 2)
                 if not geo.is_empty:
                     poly_buffer.append(geo)
 
-            # --- Apply buffer ---
-            if follow:
-                self.solid_geometry = poly_buffer
-                return
+            for i in np.flatnonzero(flash_layers == layer):
+                x, y = drawing.flashes[i]
+                flash = self.get_flash(drawing.flash_info[i, 0], x, y)
+                if flash is not None and not flash.is_empty:
+                    poly_buffer.append(flash)
+
+            if len(poly_buffer) == 0:
+                continue
 
             log.warn("Joining %d polygons." % len(poly_buffer))
-            if self.use_buffer_for_union:
+            if isinstance(poly_buffer, StreamingUnion):
+                log.debug("Union by streaming...")
+                new_poly = poly_buffer.union()
+                peak_primitives = max(peak_primitives, poly_buffer.peak)
+                log.warn("Union(streaming) done.")
+            elif self.use_tiled_union:
+                log.debug("Union by tiles...")
+                new_poly = tiled_union(poly_buffer, tiles=self.union_tiles,
+                                       processes=self.union_processes or None,
+                                       use_buffer=self.use_buffer_for_union)
+                log.warn("Union(tiled) done.")
+            elif self.use_buffer_for_union:
                 log.debug("Union by buffer...")
                 new_poly = MultiPolygon(poly_buffer)
                 new_poly = new_poly.buffer(0.00000001)
@@ -2355,24 +2961,95 @@ class Gerber (Geometry):
                 new_poly = cascaded_union(poly_buffer)
                 new_poly = new_poly.buffer(0)
                 log.warn("Union done.")
-            if current_polarity == 'D':
-                self.solid_geometry = self.solid_geometry.union(new_poly)
-            else:
-                self.solid_geometry = self.solid_geometry.difference(new_poly)
+            peak_primitives = max(peak_primitives, len(poly_buffer))
+            layers.append((polarity, new_poly))
 
-        except Exception, err:
-            ex_type, ex, tb = sys.exc_info()
-            traceback.print_tb(tb)
-            #print traceback.format_exc()
+        log.debug("Resolving %d polarity layers..." % len(layers))
+        geometry = resolve_polarity_layers(layers)
+        if self.transform != [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]:
+            geometry = affinity.affine_transform(geometry, self.transform)
+        self.solid_geometry = geometry
 
-            log.error("PARSING FAILED. Line %d: %s" % (line_num, gline))
-            raise ParseError("Line %d: %s" % (line_num, gline), repr(err))
+        if self.parse_stats.get('bounds') is not None:
+            self.bounds_cache = transform_bounds(self.parse_stats['bounds'], self.transform)
+
+        self.parse_stats['peak_primitives'] = peak_primitives
+        self.parse_stats['max_rss'] = get_max_rss()
+        log.warn("Peak primitives in memory: %d, Max. RSS: %s kB" %
+                 (peak_primitives, self.parse_stats['max_rss']))
+
+    def get_arc_tolerance(self):
+        """
+        Max. distance between arcs and their segments, in the units
+        of the primitives. See ``self.arc_tolerance``.
+
+        :rtype: float
+        """
+
+        if self.arc_tolerance is not None:
+            return self.arc_tolerance
+        return get_arc_tolerance(self.primitives.units)
+
+    def get_follow_geometry(self):
+        """
+        Lines followed by the strokes (not regions nor flashes)
+        in the file, of all polarities.
+
+        :return: List of LineString. If there are no primitives,
+            i.e. the object was loaded from a project, ``solid_geometry``.
+        :rtype: list
+        """
+
+        if self.primitives is None:
+            return self.solid_geometry
+
+        drawing = self.primitives
+        tolerance = self.get_arc_tolerance()
+        lines = []
+        for i in np.flatnonzero(drawing.contours[:, 4] >= 0):
+            line = LineString(drawing.contour_points(i, self.steps_per_circ, tolerance))
+            if self.transform != [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]:
+                line = affinity.affine_transform(line, self.transform)
+            lines.append(line)
+        return lines
+
+    def get_flash(self, aperture, x, y):
+        """
+        Geometry of a flash of the given aperture at (x, y). The shape
+        is created once per aperture at the origin with
+        create_flash_geometry() and then translated.
+
+        :param aperture: Index in ``self.primitives.apertures``.
+        :type aperture: int
+        :param x: X coordinate of the flash.
+        :param y: Y coordinate of the flash.
+        :return: Flash geometry or None if the aperture type is unknown.
+        """
+
+        try:
+            template, exterior, interiors = self.flash_templates[aperture]
+        except KeyError:
+            template = Gerber.create_flash_geometry(Point(0, 0),
+                                                    self.primitives.apertures[aperture])
+            exterior = None
+            interiors = None
+            if type(template) == Polygon and not template.is_empty:
+                exterior = np.array(template.exterior.coords)
+                interiors = [np.array(ring.coords) for ring in template.interiors]
+            self.flash_templates[aperture] = (template, exterior, interiors)
+
+        if template is None:
+            return None
+
+        if exterior is not None:
+            offset = (x, y)
+            return Polygon(exterior + offset, [ring + offset for ring in interiors])
+
+        return affinity.translate(template, xoff=x, yoff=y)
 
     @staticmethod
     def create_flash_geometry(location, aperture):
 
-        log.debug('Flashing @%s, Aperture: %s' % (location, aperture))
-
         if type(location) == list:
             location = Point(location)
 
@@ -2471,6 +3148,154 @@ class Gerber (Geometry):
         return bbox
 
 
+class ExcellonDrills(object):
+    """
+    Drill hits of an Excellon object, kept in arrays:
+
+    * ``xy`` (numpy.ndarray): (N, 2) Where to drill.
+    * ``tool_index`` (numpy.ndarray): (N,) Index of the tool of
+      each hit in ``tool_names``.
+    * ``tool_names`` (list): Tools used, keys in ``Excellon.tools``.
+
+    It still behaves as the list of dictionaries
+    ``{'point': Point, 'tool': name}`` it replaces, but
+    the Points are only created when asked for.
+    """
+
+    def __init__(self, xy=None, tool_index=None, tool_names=None):
+        if xy is None:
+            xy = []
+        if tool_index is None:
+            tool_index = []
+        self.xy = np.array(xy, dtype=float).reshape((-1, 2))
+        self.tool_index = np.array(tool_index, dtype=int).reshape(-1)
+        self.tool_names = list(tool_names or [])
+
+    @staticmethod
+    def from_tools(xy, tools):
+        """
+        Creates the drills from their coordinates and tool names.
+
+        :param xy: Coordinates of the hits, [(x, y), ...]
+        :param tools: Tool name of each hit.
+        :rtype: ExcellonDrills
+        """
+
+        tool_names = []
+        index = {}
+        tool_index = []
+        for name in tools:
+            try:
+                tool_index.append(index[name])
+            except KeyError:
+                index[name] = len(tool_names)
+                tool_names.append(name)
+                tool_index.append(index[name])
+
+        return ExcellonDrills(xy, tool_index, tool_names)
+
+    @staticmethod
+    def from_list(drills):
+        """
+        Creates the drills from a list of dictionaries
+        ``{'point': Point, 'tool': name}``. ExcellonDrills
+        are returned as they are.
+
+        :rtype: ExcellonDrills
+        """
+
+        if isinstance(drills, ExcellonDrills):
+            return drills
+
+        return ExcellonDrills.from_tools([drill['point'].coords[0][:2] for drill in drills],
+                                         [drill['tool'] for drill in drills])
+
+    @staticmethod
+    def concatenate(drills_list):
+        """
+        Joins drills, matching their tools by name.
+
+        :param drills_list: ExcellonDrills or lists of dictionaries.
+        :rtype: ExcellonDrills
+        """
+
+        index = {}
+        xy = []
+        tool_index = []
+        for drills in drills_list:
+            drills = ExcellonDrills.from_list(drills)
+            remap = np.array([index.setdefault(name, len(index)) for name in drills.tool_names], dtype=int)
+            xy.append(drills.xy)
+            tool_index.append(remap[drills.tool_index])
+
+        tool_names = sorted(index, key=lambda name: index[name])
+        if len(xy) == 0:
+            return ExcellonDrills()
+        return ExcellonDrills(np.vstack(xy), np.concatenate(tool_index), tool_names)
+
+    def __len__(self):
+        return len(self.xy)
+
+    def __iter__(self):
+        for (x, y), tool in zip(self.xy.tolist(), self.tool_index.tolist()):
+            yield {'point': Point(x, y), 'tool': self.tool_names[tool]}
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return ExcellonDrills(self.xy[item], self.tool_index[item], self.tool_names)
+
+        x, y = self.xy[item]
+        return {'point': Point(x, y), 'tool': self.tool_names[self.tool_index[item]]}
+
+    def append(self, drill):
+        """
+        Adds one ``{'point': Point, 'tool': name}``. This copies
+        the arrays, use concatenate() to add many.
+        """
+
+        joined = ExcellonDrills.concatenate([self, [drill]])
+        self.xy = joined.xy
+        self.tool_index = joined.tool_index
+        self.tool_names = joined.tool_names
+
+    def tool_mask(self, tools):
+        """
+        Which hits are made with any of the given tools.
+
+        :param tools: Tool names.
+        :return: Boolean array, one per hit.
+        :rtype: numpy.ndarray
+        """
+
+        selected = [i for i, name in enumerate(self.tool_names) if name in tools]
+        return np.in1d(self.tool_index, selected)
+
+    def counts(self):
+        """
+        Number of hits of each tool.
+
+        :return: {tool name: count}
+        :rtype: dict
+        """
+
+        counts = np.bincount(self.tool_index, minlength=len(self.tool_names))
+        return dict(zip(self.tool_names, counts.tolist()))
+
+    def transform(self, matrix):
+        """
+        Applies an affine transformation to every hit.
+
+        :param matrix: [a, b, d, e, xoff, yoff] as in
+            ``affinity.affine_transform()``.
+        :return: None
+        """
+
+        a, b, d, e, xoff, yoff = matrix
+        x = self.xy[:, 0]
+        y = self.xy[:, 1]
+        self.xy = np.column_stack((a * x + b * y + xoff, d * x + e * y + yoff))
+
+
 class Excellon(Geometry):
     """
     *ATTRIBUTES*
@@ -2485,7 +3310,8 @@ class Excellon(Geometry):
     Others            Not supported (Ignored).
     ================  ====================================
 
-    * ``drills`` (list): Each is a dictionary:
+    * ``drills`` (ExcellonDrills): Behaves as a list where each
+      is a dictionary:
 
     ================  ====================================
     Key               Value
@@ -2493,6 +3319,8 @@ class Excellon(Geometry):
     point             (Shapely.Point) Where to drill
     tool              (str) A key in ``tools``
     ================  ====================================
+
+    A list of such dictionaries can be assigned to ``drills``.
     """
 
     defaults = {
@@ -2526,6 +3354,16 @@ class Excellon(Geometry):
         # from Geometry.
         self.ser_attrs += ['tools', 'drills', 'zeros']
 
+        # Attributes stored in the parse cache. See ParseCache.
+        self.cache_attrs = ['units', 'tools', 'drills', 'zeros', 'solid_geometry',
+                            'parse_stats', 'bounds_cache']
+
+        # Filled by parse_lines(). See get_stats().
+        self.parse_stats = {}
+
+        # Bounds of the drills, updated with the geometry. See bounds().
+        self.bounds_cache = None
+
         #### Patterns ####
         # Regex basics:
         # ^ - beginning
@@ -2595,6 +3433,14 @@ class Excellon(Geometry):
         # Parse coordinates
         self.leadingzeros_re = re.compile(r'^[-\+]?(0*)(\d*)')
         
+    @property
+    def drills(self):
+        return self._drills
+
+    @drills.setter
+    def drills(self, drills):
+        self._drills = ExcellonDrills.from_list(drills)
+
     def parse_file(self, filename):
         """
         Reads the specified file as array of lines as
@@ -2609,6 +3455,17 @@ class Excellon(Geometry):
         efile.close()
         self.parse_lines(estr)
 
+    def cache_params(self):
+        """
+        Settings that change the result of parsing. See ParseCache.
+
+        :rtype: dict
+        """
+
+        return {'parser': 'Excellon',
+                'zeros': self.zeros,
+                'units': self.units}
+
     def parse_lines(self, elines):
         """
         Main Excellon parser.
@@ -2624,6 +3481,18 @@ class Excellon(Geometry):
         current_x = None
         current_y = None
 
+        # Hits, made into ExcellonDrills at the end, or before
+        # a change of units, which scales self.drills.
+        hits = []
+        hit_tools = []
+
+        def add_hits():
+            if hits:
+                self.drills = ExcellonDrills.concatenate([self.drills,
+                                                          ExcellonDrills.from_tools(hits, hit_tools)])
+                del hits[:]
+                del hit_tools[:]
+
         #### Parsing starts here ####
         line_num = 0  # Line number
         eline = ""
@@ -2655,6 +3524,7 @@ class Excellon(Geometry):
                     #self.units = {"1": "MM", "2": "IN"}[match.group(1)]
 
                     # Modified for issue #80
+                    add_hits()
                     self.convert_units({"1": "MM", "2": "IN"}[match.group(1)])
                     log.debug("  Units: %s" % self.units)
                     continue
@@ -2690,8 +3560,8 @@ class Excellon(Geometry):
                             log.error("Missing coordinates")
                             continue
 
-                        self.drills.append({'point': Point((x, y)), 'tool': current_tool})
-                        log.debug("{:15} {:8} {:8}".format(eline, x, y))
+                        hits.append((x, y))
+                        hit_tools.append(current_tool)
                         continue
 
                     ## Coordinates with period: Use literally. ##
@@ -2713,8 +3583,8 @@ class Excellon(Geometry):
                             log.error("Missing coordinates")
                             continue
 
-                        self.drills.append({'point': Point((x, y)), 'tool': current_tool})
-                        log.debug("{:15} {:8} {:8}".format(eline, x, y))
+                        hits.append((x, y))
+                        hit_tools.append(current_tool)
                         continue
 
                 #### Header ####
@@ -2745,6 +3615,7 @@ class Excellon(Geometry):
                         #self.units = {"INCH": "IN", "METRIC": "MM"}[match.group(1)]
 
                         # Modified for issue #80
+                        add_hits()
                         self.convert_units({"INCH": "IN", "METRIC": "MM"}[match.group(1)])
                         log.debug("  Units/Format: %s %s" % (self.units, self.zeros))
                         continue
@@ -2753,6 +3624,12 @@ class Excellon(Geometry):
 
             log.info("Zeros: %s, Units %s." % (self.zeros, self.units))
 
+            add_hits()
+            log.info("%d drills." % len(self.drills))
+
+            self.parse_stats = self.get_stats()
+            self.bounds_cache = self.parse_stats['bounds']
+
         except Exception as e:
             log.error("PARSING FAILED. Line %d: %s" % (line_num, eline))
             raise
@@ -2798,32 +3675,81 @@ class Excellon(Geometry):
 
         :return: None
         """
-        self.solid_geometry = []
+        self.solid_geometry = make_circles(self.drills.xy, self.get_drill_radii())
 
-        for drill in self.drills:
-            # poly = drill['point'].buffer(self.tools[drill['tool']]["C"]/2.0)
-            tooldia = self.tools[drill['tool']]['C']
-            poly = drill['point'].buffer(tooldia / 2.0)
-            self.solid_geometry.append(poly)
+        self.bounds_cache = self.get_drill_bounds()
 
-    def scale(self, factor):
+    def get_drill_radii(self):
         """
-        Scales geometry on the XY plane in the object by a given factor.
-        Tool sizes, feedrates an Z-plane dimensions are untouched.
+        Radius of the tool of each drill.
 
-        :param factor: Number by which to scale the object.
-        :type factor: float
-        :return: None
-        :rtype: NOne
+        :rtype: numpy.ndarray
         """
 
-        # Drills
-        for drill in self.drills:
-            drill['point'] = affinity.scale(drill['point'], factor, factor, origin=(0, 0))
-
-        self.create_geometry()
+        diameters = np.array([self.tools[name]['C'] for name in self.drills.tool_names], dtype=float)
+        return diameters[self.drills.tool_index] / 2.0
 
-    def offset(self, vect):
+    def get_drill_bounds(self):
+        """
+        Bounds of the holes, including the tool diameters.
+
+        :return: (xmin, ymin, xmax, ymax) or None if there are no drills.
+        :rtype: tuple
+        """
+
+        if len(self.drills) == 0:
+            return None
+
+        coords = self.drills.xy
+        radii = self.get_drill_radii()[:, None]
+        return tuple((coords - radii).min(axis=0)) + tuple((coords + radii).max(axis=0))
+
+    def get_stats(self):
+        """
+        Statistics of the drills:
+
+        * ``bounds``: See get_drill_bounds().
+        * ``tools``: For each tool, a dictionary with its diameter ``C``
+          and number of ``drills``.
+
+        :rtype: dict
+        """
+
+        tools = dict((name, {'C': self.tools[name]['C'], 'drills': 0}) for name in self.tools)
+        for name, count in self.drills.counts().iteritems():
+            tools[name]['drills'] += count
+
+        return {'bounds': self.get_drill_bounds(),
+                'tools': tools}
+
+    def bounds(self):
+        """
+        Returns coordinates of rectangular bounds
+        of geometry: (xmin, ymin, xmax, ymax). Kept
+        from the drills without looking at the geometry.
+        """
+
+        if self.bounds_cache is not None:
+            return self.bounds_cache
+        return Geometry.bounds(self)
+
+    def scale(self, factor):
+        """
+        Scales geometry on the XY plane in the object by a given factor.
+        Tool sizes, feedrates an Z-plane dimensions are untouched.
+
+        :param factor: Number by which to scale the object.
+        :type factor: float
+        :return: None
+        :rtype: NOne
+        """
+
+        # Drills
+        self.drills.transform([factor, 0.0, 0.0, factor, 0.0, 0.0])
+
+        self.create_geometry()
+
+    def offset(self, vect):
         """
         Offsets geometry on the XY plane in the object by a given vector.
 
@@ -2835,8 +3761,7 @@ class Excellon(Geometry):
         dx, dy = vect
 
         # Drills
-        for drill in self.drills:
-            drill['point'] = affinity.translate(drill['point'], xoff=dx, yoff=dy)
+        self.drills.transform([1.0, 0.0, 0.0, 1.0, dx, dy])
 
         # Recreate geometry
         self.create_geometry()
@@ -2855,8 +3780,8 @@ class Excellon(Geometry):
         xscale, yscale = {"X": (1.0, -1.0), "Y": (-1.0, 1.0)}[axis]
 
         # Modify data
-        for drill in self.drills:
-            drill['point'] = affinity.scale(drill['point'], xscale, yscale, origin=(px, py))
+        self.drills.transform([xscale, 0.0, 0.0, yscale,
+                               px - xscale * px, py - yscale * py])
 
         # Recreate geometry
         self.create_geometry()
@@ -2892,7 +3817,14 @@ class CNCjob(Geometry):
 
     defaults = {
         "zdownrate": None,
-        "coordinate_format": "X%.4fY%.4f"
+        "coordinate_format": "X%.4fY%.4f",
+        "drill_order": True,         # Reorder the holes to shorten travel.
+        "drill_order_time": None,    # Seconds. None for no limit, 0 for nearest neighbour only.
+        "drill_order_moves": 20000,  # Max. improving moves per tool.
+        "drill_order_tools": True,   # Start each tool near where the last one ended.
+        "path_order": False,         # Improve the greedy order of paths.
+        "path_order_moves": 20000,   # Max. improving moves.
+        "path_order_seed": 0
     }
 
     def __init__(self,
@@ -2950,11 +3882,17 @@ class CNCjob(Geometry):
         return factor
 
     def generate_from_excellon_by_tool(self, exobj, tools="all",
-                                       toolchange=False, toolchangez=0.1):
+                                       toolchange=False, toolchangez=0.1,
+                                       order=None, order_time=None, order_tools=None,
+                                       order_moves=None):
         """
         Creates gcode for this object from an Excellon object
         for the specified tools.
 
+        The holes of each tool are drilled in the order given by
+        ``order_drills()``. The travel before and after ordering
+        is reported in a comment at the start of the G-code.
+
         :param exobj: Excellon object to process
         :type exobj: Excellon
         :param tools: Comma separated tool names
@@ -2963,10 +3901,30 @@ class CNCjob(Geometry):
         :type toolchange: bool
         :param toolchangez: Height at which to perform the tool change.
         :type toolchangez: float
+        :param order: Reorder the holes. If False, they are drilled
+            by diameter in the order found in the file.
+            Defaults to ``defaults["drill_order"]``.
+        :param order_time: Seconds to spend ordering the holes,
+            0 for nearest neighbour only.
+            Defaults to ``defaults["drill_order_time"]``.
+        :param order_tools: Drill the tools in the order that
+            starts each near where the last one ended, instead of
+            by diameter. Defaults to ``defaults["drill_order_tools"]``.
+        :param order_moves: Max. number of improving moves for the
+            holes of each tool. Defaults to ``defaults["drill_order_moves"]``.
         :return: None
         :rtype: None
         """
 
+        if order is None:
+            order = CNCjob.defaults["drill_order"]
+        if order_time is None:
+            order_time = CNCjob.defaults["drill_order_time"]
+        if order_tools is None:
+            order_tools = CNCjob.defaults["drill_order_tools"]
+        if order_moves is None:
+            order_moves = CNCjob.defaults["drill_order_moves"]
+
         log.debug("Creating CNC Job from Excellon...")
 
         # Tools
@@ -2987,12 +3945,19 @@ class CNCjob(Geometry):
 
         # Points (Group by tool)
         points = {}
-        for drill in exobj.drills:
-            if drill['tool'] in tools:
-                try:
-                    points[drill['tool']].append(drill['point'])
-                except KeyError:
-                    points[drill['tool']] = [drill['point']]
+        drills = exobj.drills
+        for tool in tools:
+            coords = drills.xy[drills.tool_mask([tool])]
+            if len(coords) > 0:
+                points[tool] = coords
+
+        ## Drilling order
+        tools = [tool for tool in tools if tool in points]
+        travel = drill_travel(tools, points)
+        if order:
+            tools, points = order_drills(tools, points, time_budget=order_time, max_moves=order_moves,
+                                         order_tools=order_tools)
+        log.debug("Travel: %.4f in file order, %.4f ordered." % (travel, drill_travel(tools, points)))
 
         #log.debug("Found %d drills." % len(points))
         self.gcode = []
@@ -3003,8 +3968,12 @@ class CNCjob(Geometry):
         up = "G00 Z%.4f\n" % self.z_move
         up_to_zero = "G01 Z0\n"
 
+        # Travel in the XY plane
+        gcode = "(Drill travel: %.4f %s in file order, %.4f ordered)\n" % \
+            (travel, self.units.upper(), drill_travel(tools, points))
+
         # Initialization
-        gcode = self.unitcode[self.units.upper()] + "\n"
+        gcode += self.unitcode[self.units.upper()] + "\n"
         gcode += self.absolutecode + "\n"
         gcode += self.feedminutecode + "\n"
         gcode += "F%.2f\n" % self.feedrate
@@ -3037,10 +4006,8 @@ class CNCjob(Geometry):
                         gcode += "M03\n"  # Spindle start
 
                 # Drillling!
-                for point in points[tool]:
-                    x, y = point.coords.xy
-                    gcode += t % (x[0], y[0])
-                    gcode += down + up_to_zero + up
+                drill = down + up_to_zero + up
+                gcode += "".join([t % (x, y) + drill for x, y in points[tool].tolist()])
 
         gcode += t % (0, 0)
         gcode += "M05\n"  # Spindle stop
@@ -3053,13 +4020,21 @@ class CNCjob(Geometry):
                                  tooldia=None,
                                  tolerance=0,
                                  multidepth=False,
-                                 depthpercut=None):
+                                 depthpercut=None,
+                                 optimize=None,
+                                 optimize_moves=None,
+                                 optimize_seed=None):
         """
         Second algorithm to generate from Geometry.
 
         ALgorithm description:
         ----------------------
         Uses RTree to find the nearest path to follow.
+        The resulting order is then improved with
+        ``improve_path_order()``, if enabled. The travel before and
+        after is reported in a comment at the start of the G-code.
+        Closed paths are always cut in the direction
+        they are given.
 
         :param geometry:
         :param append:
@@ -3068,6 +4043,12 @@ class CNCjob(Geometry):
         :param multidepth: If True, use multiple passes to reach
            the desired depth.
         :param depthpercut: Maximum depth in each pass.
+        :param optimize: Improve the order of the paths.
+            Defaults to ``defaults["path_order"]``.
+        :param optimize_moves: Max. number of improving moves.
+            Defaults to ``defaults["path_order_moves"]``.
+        :param optimize_seed: Seed of the order in which paths are
+            tried. Defaults to ``defaults["path_order_seed"]``.
         :return: None
         """
         assert isinstance(geometry, Geometry), \
@@ -3075,11 +4056,22 @@ class CNCjob(Geometry):
 
         log.debug("generate_from_geometry_2()")
 
+        if optimize is None:
+            optimize = CNCjob.defaults["path_order"]
+        if optimize_moves is None:
+            optimize_moves = CNCjob.defaults["path_order_moves"]
+        if optimize_seed is None:
+            optimize_seed = CNCjob.defaults["path_order_seed"]
+
         ## Flatten the geometry
         # Only linear elements (no polygons) remain.
         flat_geometry = geometry.flatten(pathonly=True)
         log.debug("%d paths" % len(flat_geometry))
 
+        # Paths that touch are cut without lifting the tool.
+        flat_geometry = join_paths([geo for geo in flat_geometry if geo is not None])
+        log.debug("%d paths after joining" % len(flat_geometry))
+
         ## Index first and last points in paths
         # What points to index.
         def get_pts(o):
@@ -3103,8 +4095,52 @@ class CNCjob(Geometry):
         if not append:
             self.gcode = ""
 
+        ## Iterate over geometry paths getting the nearest each time.
+        # Each path is (geometry, reversed).
+        log.debug("Ordering paths...")
+        paths = []
+        current_pt = (0, 0)
+        try:
+            pt, geo = storage.nearest(current_pt)
+            while True:
+                # Remove before modifying, otherwise
+                # deletion will fail.
+                storage.remove(geo)
+
+                # If last point in geometry is the nearest
+                # but prefer the first one if last point == first point
+                # then reverse coordinates.
+                flip = pt != geo.coords[0] and pt == geo.coords[-1]
+                paths.append((geo, flip))
+
+                current_pt = geo.coords[0] if flip else geo.coords[-1]
+
+                # Next
+                pt, geo = storage.nearest(current_pt)
+
+        except StopIteration:  # Nothing found in storage.
+            pass
+
+        ## Shorten travel between paths
+        starts = np.array([geo.coords[0][:2] for geo, flip in paths]).reshape((-1, 2))
+        ends = np.array([geo.coords[-1][:2] for geo, flip in paths]).reshape((-1, 2))
+        order = np.arange(len(paths))
+        flipped = np.array([flip for geo, flip in paths], dtype=bool)
+        travel = path_travel(starts, ends, order, flipped)
+        if optimize and len(paths) > 2:
+            order, flipped = improve_path_order(starts, ends, order, flipped,
+                                                max_moves=optimize_moves,
+                                                seed=optimize_seed)
+
+        log.debug("Travel: %.4f greedy, %.4f optimized." %
+                  (travel, path_travel(starts, ends, order, flipped)))
+
+        # Travel in the XY plane
+        self.gcode = "(Travel: %.4f %s greedy, %.4f optimized)\n" % \
+            (travel, self.units.upper(), path_travel(starts, ends, order, flipped))
+
         # Initial G-Code
-        self.gcode = self.unitcode[self.units.upper()] + "\n"
+        self.gcode += self.unitcode[self.units.upper()] + "\n"
         self.gcode += self.absolutecode + "\n"
         self.gcode += self.feedminutecode + "\n"
         self.gcode += "F%.2f\n" % self.feedrate
@@ -3115,104 +4151,80 @@ class CNCjob(Geometry):
             self.gcode += "M03\n"  # Spindle start
         #self.gcode += self.pausecode + "\n"
 
-        ## Iterate over geometry paths getting the nearest each time.
         log.debug("Starting G-Code...")
         path_count = 0
-        current_pt = (0, 0)
-        pt, geo = storage.nearest(current_pt)
-        try:
-            while True:
-                path_count += 1
-                #print "Current: ", "(%.3f, %.3f)" % current_pt
-
-                # Remove before modifying, otherwise
-                # deletion will fail.
-                storage.remove(geo)
+        for index, flip in zip(order.tolist(), flipped.tolist()):
+            path_count += 1
+            geo = paths[index][0]
+            # Closed paths keep their direction (climb or conventional).
+            if flip and geo.coords[0] != geo.coords[-1]:
+                geo = type(geo)(list(geo.coords)[::-1])
+
+            #---------- Single depth/pass --------
+            if not multidepth:
+                # G-code
+                # Note: self.linear2gcode() and self.point2gcode() will
+                # lower and raise the tool every time.
+                if type(geo) == LineString or type(geo) == LinearRing:
+                    self.gcode += self.linear2gcode(geo, tolerance=tolerance)
+                elif type(geo) == Point:
+                    self.gcode += self.point2gcode(geo)
+                else:
+                    log.warning("G-code generation not implemented for %s" % (str(type(geo))))
 
-                # If last point in geometry is the nearest
-                # but prefer the first one if last point == first point
-                # then reverse coordinates.
-                if pt != geo.coords[0] and pt == geo.coords[-1]:
-                    geo.coords = list(geo.coords)[::-1]
-
-                #---------- Single depth/pass --------
-                if not multidepth:
-                    # G-code
-                    # Note: self.linear2gcode() and self.point2gcode() will
-                    # lower and raise the tool every time.
+            #--------- Multi-pass ---------
+            else:
+                if isinstance(self.z_cut, Decimal):
+                    z_cut = self.z_cut
+                else:
+                    z_cut = Decimal(self.z_cut).quantize(Decimal('0.000000001'))
+
+                if depthpercut is None:
+                    depthpercut = z_cut
+                elif not isinstance(depthpercut, Decimal):
+                    depthpercut = Decimal(depthpercut).quantize(Decimal('0.000000001'))
+
+                depth = 0
+                reverse = False
+                while depth > z_cut:
+
+                    # Increase depth. Limit to z_cut.
+                    depth -= depthpercut
+                    if depth < z_cut:
+                        depth = z_cut
+
+                    # Cut at specific depth and do not lift the tool.
+                    # Note: linear2gcode() will use G00 to move to the
+                    # first point in the path, but it should be already
+                    # at the first point if the tool is down (in the material).
+                    # So, an extra G00 should show up but is inconsequential.
                     if type(geo) == LineString or type(geo) == LinearRing:
-                        self.gcode += self.linear2gcode(geo, tolerance=tolerance)
+                        self.gcode += self.linear2gcode(geo, tolerance=tolerance,
+                                                        zcut=depth,
+                                                        up=False)
+
+                    # Ignore multi-pass for points.
                     elif type(geo) == Point:
                         self.gcode += self.point2gcode(geo)
-                    else:
-                        log.warning("G-code generation not implemented for %s" % (str(type(geo))))
+                        break  # Ignoring ...
 
-                #--------- Multi-pass ---------
-                else:
-                    if isinstance(self.z_cut, Decimal):
-                        z_cut = self.z_cut
                     else:
-                        z_cut = Decimal(self.z_cut).quantize(Decimal('0.000000001'))
-
-                    if depthpercut is None:
-                        depthpercut = z_cut
-                    elif not isinstance(depthpercut, Decimal):
-                        depthpercut = Decimal(depthpercut).quantize(Decimal('0.000000001'))
-
-                    depth = 0
-                    reverse = False
-                    while depth > z_cut:
-
-                        # Increase depth. Limit to z_cut.
-                        depth -= depthpercut
-                        if depth < z_cut:
-                            depth = z_cut
-
-                        # Cut at specific depth and do not lift the tool.
-                        # Note: linear2gcode() will use G00 to move to the
-                        # first point in the path, but it should be already
-                        # at the first point if the tool is down (in the material).
-                        # So, an extra G00 should show up but is inconsequential.
-                        if type(geo) == LineString or type(geo) == LinearRing:
-                            self.gcode += self.linear2gcode(geo, tolerance=tolerance,
-                                                            zcut=depth,
-                                                            up=False)
-
-                        # Ignore multi-pass for points.
-                        elif type(geo) == Point:
-                            self.gcode += self.point2gcode(geo)
-                            break  # Ignoring ...
-
-                        else:
-                            log.warning("G-code generation not implemented for %s" % (str(type(geo))))
-
-                        # Reverse coordinates if not a loop so we can continue
-                        # cutting without returning to the beginhing.
-                        if type(geo) == LineString:
-                            geo.coords = list(geo.coords)[::-1]
-                            reverse = True
-
-                    # If geometry is reversed, revert.
-                    if reverse:
-                        if type(geo) == LineString:
-                            geo.coords = list(geo.coords)[::-1]
-
-                    # Lift the tool
-                    self.gcode += "G00 Z%.4f\n" % self.z_move
-                    # self.gcode += "( End of path. )\n"
-
-                # Did deletion at the beginning.
-                # Delete from index, update current location and continue.
-                #rti.delete(hits[0], geo.coords[0])
-                #rti.delete(hits[0], geo.coords[-1])
+                        log.warning("G-code generation not implemented for %s" % (str(type(geo))))
 
-                current_pt = geo.coords[-1]
+                    # Reverse coordinates if not a loop so we can continue
+                    # cutting without returning to the beginhing.
+                    if type(geo) == LineString:
+                        geo.coords = list(geo.coords)[::-1]
+                        reverse = True
 
-                # Next
-                pt, geo = storage.nearest(current_pt)
+                # If geometry is reversed, revert.
+                if reverse:
+                    if type(geo) == LineString:
+                        geo.coords = list(geo.coords)[::-1]
 
-        except StopIteration:  # Nothing found in storage.
-            pass
+                # Lift the tool
+                self.gcode += "G00 Z%.4f\n" % self.z_move
+                # self.gcode += "( End of path. )\n"
 
         log.debug("%s paths traced." % path_count)
 
@@ -3315,7 +4327,7 @@ class CNCjob(Geometry):
                     stop = arctan2(-center[1] + y, -center[0] + x)
                     path += arc(center, radius, start, stop,
                                 arcdir[current['G']],
-                                self.steps_per_circ)
+                                self.steps_per_circ, get_arc_tolerance(self.units))
 
             # Update current instruction
             for code in gobj:
@@ -3611,9 +4623,667 @@ def get_bounds(geometry_list):
     return [xmin, ymin, xmax, ymax]
 
 
-def arc(center, radius, start, stop, direction, steps_per_circ):
+def transform_bounds(bounds, matrix):
     """
-    Creates a list of point along the specified arc.
+    Bounds of a rectangle after an affine transformation.
+
+    :param bounds: (xmin, ymin, xmax, ymax)
+    :param matrix: [a, b, d, e, xoff, yoff] as in
+        ``affinity.affine_transform()``.
+    :return: (xmin, ymin, xmax, ymax)
+    :rtype: tuple
+    """
+
+    a, b, d, e, xoff, yoff = matrix
+    xmin, ymin, xmax, ymax = bounds
+    corners = array([[xmin, ymin], [xmin, ymax], [xmax, ymin], [xmax, ymax]])
+    x = a * corners[:, 0] + b * corners[:, 1] + xoff
+    y = d * corners[:, 0] + e * corners[:, 1] + yoff
+    return x.min(), y.min(), x.max(), y.max()
+
+
+def join_paths(paths, decimals=9):
+    """
+    Joins LineStrings that end where another starts or ends
+    into longer ones. Ends are matched rounded to ``decimals``,
+    through a dictionary of path ends, and each chain of paths
+    is made into a single LineString at once.
+
+    Where more than two paths meet, the chain continues with
+    the first in ``paths`` not joined yet.
+
+    :param paths: List of geometry. Only LineStrings are joined,
+        the rest is returned as is.
+    :param decimals: Precision of the match.
+    :return: Joined LineStrings, followed by the rest of ``paths``.
+    :rtype: list
+    """
+
+    lines = []
+    others = []
+    for path in paths:
+        if type(path) == LineString and not path.is_empty:
+            lines.append(path)
+        else:
+            others.append(path)
+
+    def key(point):
+        return round(point[0], decimals), round(point[1], decimals)
+
+    coords = [np.asarray(line.coords) for line in lines]
+    ends = {}
+    for i, path in enumerate(coords):
+        ends.setdefault(key(path[0]), []).append(i)
+        ends.setdefault(key(path[-1]), []).append(i)
+    used = [False] * len(coords)
+
+    def take(point):
+        for i in ends[key(point)]:
+            if not used[i]:
+                used[i] = True
+                return i
+        return None
+
+    joined = []
+    for first in xrange(len(coords)):
+        if used[first]:
+            continue
+        used[first] = True
+        chain = collections.deque([coords[first]])
+
+        # Forward from the last point, then backwards from the first,
+        # until nothing more touches or the chain closes.
+        while key(chain[-1][-1]) != key(chain[0][0]):
+            i = take(chain[-1][-1])
+            if i is None:
+                break
+            path = coords[i]
+            if key(path[0]) != key(chain[-1][-1]):
+                path = path[::-1]
+            chain.append(path[1:])
+
+        while key(chain[-1][-1]) != key(chain[0][0]):
+            i = take(chain[0][0])
+            if i is None:
+                break
+            path = coords[i]
+            if key(path[-1]) != key(chain[0][0]):
+                path = path[::-1]
+            chain.appendleft(path[:-1])
+
+        if len(chain) == 1:
+            joined.append(lines[first])
+        else:
+            joined.append(LineString(np.vstack(chain)))
+
+    return joined + others
+
+
+def path_length(points):
+    """
+    Length of the polyline through the given points.
+
+    :param points: (N, 2) array.
+    :rtype: float
+    """
+
+    points = np.asarray(points, dtype=float).reshape((-1, 2))
+    if len(points) < 2:
+        return 0.0
+    return float(np.sqrt((np.diff(points, axis=0) ** 2).sum(axis=1)).sum())
+
+
+def nearest_neighbour_order(xy, start=(0, 0)):
+    """
+    Visits the points going each time to the nearest one
+    not visited yet.
+
+    :param xy: (N, 2) array of points.
+    :param start: Where to start from.
+    :return: Indexes of the points in the order to visit them.
+    :rtype: numpy.ndarray
+    """
+
+    if len(xy) == 0:
+        return np.zeros(0, dtype=int)
+
+    # Points in a grid of cells of about 2 points each.
+    xmin, ymin = xy.min(axis=0)
+    xmax, ymax = xy.max(axis=0)
+    size = max(sqrt(2.0 * max((xmax - xmin) * (ymax - ymin), 1e-12) / len(xy)),
+               max(xmax - xmin, ymax - ymin) / len(xy), 1e-9)
+    cells = {}
+    keys = np.floor((xy - (xmin, ymin)) / size).astype(int).tolist()
+    for i, key in enumerate(keys):
+        cells.setdefault(tuple(key), []).append(i)
+
+    coords = xy.tolist()
+    order = []
+
+    # The start might be outside the grid.
+    best = int(np.argmin(((xy - start) ** 2).sum(axis=1)))
+    for _ in xrange(len(coords)):
+        cell = cells[tuple(keys[best])]
+        cell.remove(best)
+        if not cell:
+            del cells[tuple(keys[best])]
+        order.append(best)
+        if not cells:
+            break
+
+        x, y = coords[best]
+        cx, cy = keys[best]
+
+        # Rings of cells around the current one, until nothing
+        # closer than the best found can be further out.
+        best = None
+        best_dist = Inf
+        ring = 0
+        while best is None or best_dist > (ring - 1) * size:
+            if ring == 0:
+                ring_cells = [(cx, cy)]
+            else:
+                ring_cells = [(cx + k, cy - ring) for k in xrange(-ring, ring + 1)] + \
+                             [(cx + k, cy + ring) for k in xrange(-ring, ring + 1)] + \
+                             [(cx - ring, cy + k) for k in xrange(-ring + 1, ring)] + \
+                             [(cx + ring, cy + k) for k in xrange(-ring + 1, ring)]
+            for key in ring_cells:
+                for i in cells.get(key, ()):
+                    px, py = coords[i]
+                    d = ((px - x) ** 2 + (py - y) ** 2) ** 0.5
+                    if d < best_dist:
+                        best = i
+                        best_dist = d
+            ring += 1
+
+    return np.array(order, dtype=int)
+
+
+def improve_order(xy, order, start=(0, 0), deadline=None, neighbours=8, max_moves=None):
+    """
+    Shortens an open path through the points with 2-opt moves
+    (reversing a stretch) and Or-opt moves (relocating 1 to 3
+    consecutive points), trying only moves that join a point
+    to one of its nearest neighbours.
+
+    :param xy: (N, 2) array of points.
+    :param order: Initial order, indexes into ``xy``.
+    :param start: Fixed start of the path. The end is free.
+    :param deadline: time.time() at which to stop improving.
+        None to stop only when no move helps.
+    :param neighbours: How many nearest points to try joining.
+    :param max_moves: Stop after this many moves. None for no limit.
+    :return: Indexes of the points in the improved order.
+    :rtype: numpy.ndarray
+    """
+
+    n = len(xy)
+    if n < 3:
+        return np.array(order, dtype=int)
+
+    # Node n is the start.
+    coords = xy.tolist() + [list(start)]
+    path = [n] + list(order)
+    pos = [0] * (n + 1)
+    for i, node in enumerate(path):
+        pos[node] = i
+    last = n
+
+    # Nearest points of each, closest first.
+    neighbours = min(neighbours, n - 1)
+    distances, near = cKDTree(xy).query(np.vstack((xy, [start])), neighbours + 1)
+    near = [[(c, d) for c, d in zip(row_near, row_dist) if c != node][:neighbours]
+            for node, (row_near, row_dist) in enumerate(zip(near.tolist(), distances.tolist()))]
+
+    def dist(a, b):
+        if a is None or b is None:
+            return 0.0
+        xa, ya = coords[a]
+        xb, yb = coords[b]
+        return ((xa - xb) ** 2 + (ya - yb) ** 2) ** 0.5
+
+    def succ(node):
+        i = pos[node]
+        return path[i + 1] if i < last else None
+
+    def reverse(i, j):
+        path[i:j + 1] = path[i:j + 1][::-1]
+        for k in xrange(i, j + 1):
+            pos[path[k]] = k
+
+    def two_opt(a):
+        sa = succ(a)
+        pa = path[pos[a] - 1] if a != n else None
+        d_succ = dist(a, sa)
+        d_pred = dist(pa, a)
+
+        # Only joining a to points closer than its current
+        # neighbours can help.
+        for c, d_ac in near[a]:
+            if d_ac >= d_succ and d_ac >= d_pred:
+                break
+
+            # Joining a to c after both
+            sc = succ(c)
+            if d_ac < d_succ and sa != c and sc != a:
+                gain = d_succ + dist(c, sc) - d_ac - dist(sa, sc)
+                if gain > 1e-12:
+                    i, j = sorted([pos[a], pos[c]])
+                    reverse(i + 1, j)
+                    return [a, c, sa, sc]
+
+            # Joining a to c before both
+            if d_ac < d_pred:
+                pc = path[pos[c] - 1]
+                if pa != c and pc != a:
+                    gain = d_pred + dist(pc, c) - d_ac - dist(pa, pc)
+                    if gain > 1e-12:
+                        i, j = sorted([pos[a], pos[c]])
+                        reverse(i, j - 1)
+                        return [a, c, pa, pc]
+        return None
+
+    def or_opt(a):
+        s = pos[a]
+        if s == 0:
+            return None
+        for length in (1, 2, 3):
+            e = s + length - 1
+            if e > last:
+                break
+            segment = path[s:e + 1]
+            f, l = segment[0], segment[-1]
+            p = path[s - 1]
+            nx = path[e + 1] if e < last else None
+            removed = dist(p, f) + dist(l, nx) - dist(p, nx)
+
+            candidates = set([c for c, d in near[f] if d < removed] +
+                             [c for c, d in near[l] if d < removed])
+            for c in candidates:
+                k = pos[c]
+                if s <= k <= e:
+                    continue
+                # Edges (c, succ c) and (pred c, c) to insert into
+                for before, after in ((c, succ(c)), (path[k - 1] if k > 0 else None, c)):
+                    if before is None or before == p or before == l:
+                        continue
+                    added = dist(before, f) + dist(l, after) - dist(before, after)
+                    flipped = dist(before, l) + dist(f, after) - dist(before, after)
+                    if min(added, flipped) < removed - 1e-12:
+                        if flipped < added:
+                            segment = segment[::-1]
+                        del path[s:e + 1]
+                        at = pos[before] if pos[before] < s else pos[before] - length
+                        path[at + 1:at + 1] = segment
+                        for i in xrange(min(s, at + 1), max(e, at + length) + 1):
+                            pos[path[i]] = i
+                        return [p, nx, f, l, before, after]
+        return None
+
+    queue = collections.deque(path)
+    queued = set(path)
+    moves = 0
+    while queue:
+        if deadline is not None and time.time() > deadline:
+            break
+        if max_moves is not None and moves >= max_moves:
+            break
+        a = queue.popleft()
+        queued.discard(a)
+        changed = two_opt(a) or or_opt(a)
+        if changed:
+            moves += 1
+            for node in changed + [a]:
+                if node is not None and node not in queued:
+                    queue.append(node)
+                    queued.add(node)
+
+    return np.array(path[1:], dtype=int)
+
+
+def order_points(xy, start=(0, 0), time_budget=None, max_moves=None):
+    """
+    Short open path through the points: nearest neighbour
+    followed by 2-opt and Or-opt. See improve_order().
+
+    :param xy: (N, 2) array of points.
+    :param start: Where the path starts.
+    :param time_budget: Seconds to spend improving. None for
+        no limit, 0 for nearest neighbour only.
+    :param max_moves: Max. number of improving moves. None for
+        no limit. Unlike time, the result does not depend on the
+        machine.
+    :return: Indexes of the points in the order to visit them.
+    :rtype: numpy.ndarray
+    """
+
+    deadline = None if time_budget is None else time.time() + time_budget
+    order = nearest_neighbour_order(xy, start)
+    if time_budget == 0:
+        return order
+    return improve_order(xy, order, start, deadline, max_moves=max_moves)
+
+
+def drill_travel(tools, points, start=(0, 0)):
+    """
+    Distance travelled in the XY plane drilling the holes of
+    each tool in order, from and back to ``start``.
+
+    :param tools: Tool names, in order.
+    :param points: {tool name: (N, 2) array of holes in order}
+    :rtype: float
+    """
+
+    return path_length(np.vstack([[start]] + [points[tool] for tool in tools] + [[start]]))
+
+
+def order_drills(tools, points, start=(0, 0), time_budget=None, order_tools=True, max_moves=None):
+    """
+    Orders the holes of each tool with ``order_points()``, starting
+    each tool where the previous one ended.
+
+    :param tools: Tool names, in the order to drill them.
+    :param points: {tool name: (N, 2) array of holes}
+    :param start: Where the first tool starts.
+    :param time_budget: Seconds to spend in total. See order_points().
+    :param order_tools: Instead of following ``tools``, choose each
+        time the tool with a hole nearest to where the last ended.
+    :param max_moves: Max. number of improving moves for each
+        tool. See order_points().
+    :return: (tools, points) in the new order.
+    :rtype: tuple
+    """
+
+    deadline = None if time_budget is None else time.time() + time_budget
+    remaining = list(tools)
+    ordered_tools = []
+    ordered_points = {}
+    position = np.array(start, dtype=float)
+    while remaining:
+        if order_tools:
+            tool = min(remaining, key=lambda t: ((points[t] - position) ** 2).sum(axis=1).min())
+        else:
+            tool = remaining[0]
+
+        # A share of the time left for the holes of this tool
+        budget = None
+        if deadline is not None:
+            holes_left = sum(len(points[t]) for t in remaining)
+            budget = max(deadline - time.time(), 0) * len(points[tool]) / holes_left
+
+        order = order_points(points[tool], position, budget, max_moves=max_moves)
+        ordered_points[tool] = points[tool][order]
+        ordered_tools.append(tool)
+        remaining.remove(tool)
+        position = ordered_points[tool][-1]
+
+    return ordered_tools, ordered_points
+
+
+def path_travel(starts, ends, order, flipped, start=(0, 0), end=(0, 0)):
+    """
+    Distance travelled between paths, from ``start``, along the
+    paths in the given order and direction, to ``end``.
+
+    :param starts: (N, 2) array of the first point of each path.
+    :param ends: (N, 2) array of the last point of each path.
+    :param order: Indexes of the paths in the order to follow them.
+    :param flipped: For each path in ``order``, whether to follow it
+        backwards.
+    :rtype: float
+    """
+
+    flipped = np.asarray(flipped, dtype=bool)[:, None]
+    first = np.where(flipped, ends[order], starts[order])
+    last = np.where(flipped, starts[order], ends[order])
+    jumps = np.vstack([[start], last]) - np.vstack([first, [end]])
+    return float(np.sqrt((jumps ** 2).sum(axis=1)).sum())
+
+
+def improve_path_order(starts, ends, order, flipped, start=(0, 0), end=(0, 0),
+                       max_moves=None, seed=0, neighbours=8):
+    """
+    Shortens the travel between paths (see path_travel()) with
+    2-opt moves: reversing a stretch of the tour, which follows
+    each path in it backwards. Only moves that join an end of a
+    path to one of the nearest ends of other paths are tried.
+
+    Closed paths (first point equal to the last) are moved as a
+    whole but never followed the other way, as their direction
+    sets climb or conventional milling.
+
+    :param starts: (N, 2) array of the first point of each path.
+    :param ends: (N, 2) array of the last point of each path.
+    :param order: Initial order, indexes of the paths.
+    :param flipped: For each path in ``order``, whether it is
+        followed backwards.
+    :param start: Where the tour starts.
+    :param end: Where the tour ends.
+    :param max_moves: Stop after this many moves. None for no limit.
+    :param seed: Seed of the order in which paths are tried. The
+        result is the same for the same seed.
+    :param neighbours: How many nearest ends to try joining.
+    :return: (order, flipped) as the parameters.
+    :rtype: tuple
+    """
+
+    n = len(starts)
+    closed = np.all(starts == ends, axis=1).tolist() + [True, True]
+
+    # Path ends: q < n is the first point of path q, q >= n
+    # the last point of path q - n. Nodes n and n + 1 are the
+    # start and end of the tour.
+    points = np.vstack((starts, ends, [start], [end])).tolist()
+    first = {n: 2 * n, n + 1: 2 * n + 1}
+    tour = [n] + list(order) + [n + 1]
+    backwards = [False] * (n + 2)
+    for path, flip in zip(order, flipped):
+        backwards[path] = bool(flip)
+    pos = [0] * (n + 2)
+    for i, node in enumerate(tour):
+        pos[node] = i
+
+    def head(node):
+        # Point where the tool enters the path
+        if node >= n:
+            return points[first[node]]
+        return points[node + n] if backwards[node] else points[node]
+
+    def tail(node):
+        # Point where the tool leaves the path
+        if node >= n:
+            return points[first[node]]
+        return points[node] if backwards[node] else points[node + n]
+
+    def dist(a, b):
+        return ((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2) ** 0.5
+
+    # Nearest ends of other paths for each end and the start.
+    neighbours = min(neighbours, 2 * n - 2)
+    distances, near = cKDTree(np.vstack((starts, ends))).query(
+        np.vstack((starts, ends, [start])), neighbours + 2)
+    near = [[(q, d) for q, d in zip(row_near, row_dist) if q % n != p % n or p == 2 * n][:neighbours]
+            for p, (row_near, row_dist) in enumerate(zip(near.tolist(), distances.tolist()))]
+
+    def reverse(i, j):
+        tour[i:j + 1] = tour[i:j + 1][::-1]
+        for k in xrange(i, j + 1):
+            node = tour[k]
+            pos[node] = k
+            if not closed[node]:
+                backwards[node] = not backwards[node]
+
+    def gain(i, j):
+        # Of reversing tour[i + 1:j + 1]
+        a, b = tour[i], tour[j]
+        sa, sb = tour[i + 1], tour[j + 1]
+        return dist(tail(a), head(sa)) + dist(tail(b), head(sb)) - \
+            dist(tail(a), tail(b)) - dist(head(sa), head(sb))
+
+    def two_opt(node):
+        i = pos[node]
+
+        # Leaving node towards the leaving end of another path
+        out_end = 2 * n if node == n else (node if backwards[node] else node + n)
+        d_out = dist(tail(node), head(tour[i + 1]))
+        for q, d in near[out_end]:
+            if d >= d_out:
+                break
+            other = q % n
+            if (q >= n) == backwards[other]:
+                continue  # q is where the tool enters other
+            a, b = sorted([i, pos[other]])
+            if gain(a, b) > 1e-12:
+                reverse(a + 1, b)
+                return True
+
+        if node >= n:
+            return False
+
+        # Entering node from the entering end of another path
+        in_end = node + n if backwards[node] else node
+        d_in = dist(tail(tour[i - 1]), head(node))
+        for q, d in near[in_end]:
+            if d >= d_in:
+                break
+            other = q % n
+            if (q >= n) != backwards[other]:
+                continue  # q is where the tool leaves other
+            a, b = sorted([i, pos[other]])
+            if gain(a - 1, b - 1) > 1e-12:
+                reverse(a, b - 1)
+                return True
+
+        return False
+
+    queue = collections.deque([n] + np.random.RandomState(seed).permutation(n).tolist())
+    queued = set(queue)
+    moves = 0
+    while queue:
+        if max_moves is not None and moves >= max_moves:
+            break
+        node = queue.popleft()
+        queued.discard(node)
+        if two_opt(node):
+            moves += 1
+            # Look again around the changed joints
+            for changed in (node, tour[pos[node] - 1] if node != n else n, tour[pos[node] + 1]):
+                if changed <= n and changed not in queued:
+                    queue.append(changed)
+                    queued.add(changed)
+
+    tour = tour[1:-1]
+    return np.array(tour, dtype=int), np.array([backwards[node] for node in tour], dtype=bool)
+
+
+circle_templates = {}
+
+
+def get_circle_template(radius, resolution=16):
+    """
+    Coordinates of the exterior of ``Point(0, 0).buffer(radius, resolution)``,
+    cached by radius and resolution.
+
+    :rtype: numpy.ndarray
+    """
+
+    key = (radius, resolution)
+    try:
+        return circle_templates[key]
+    except KeyError:
+        template = np.array(Point(0, 0).buffer(radius, resolution).exterior.coords)
+        circle_templates[key] = template
+        return template
+
+
+def make_circles(xy, radii, resolution=16, exterior=False):
+    """
+    Circles as if made by ``Point(x, y).buffer(radius, resolution)``,
+    translating a template for each radius instead.
+
+    :param xy: (N, 2) array of centers.
+    :param radii: (N,) array of radii.
+    :param resolution: Segments per quarter circle.
+    :param exterior: Return the exteriors (LinearRing) instead
+        of the Polygons.
+    :return: List of Polygon or LinearRing, in the order of ``xy``.
+    :rtype: list
+    """
+
+    xy = np.asarray(xy, dtype=float).reshape((-1, 2))
+    radii = np.asarray(radii, dtype=float)
+
+    circles = [None] * len(xy)
+    for radius in np.unique(radii):
+        indexes = np.flatnonzero(radii == radius)
+        if radius <= 0:
+            empty = Polygon()
+            for i in indexes:
+                circles[i] = empty.exterior if exterior else empty
+            continue
+
+        template = get_circle_template(float(radius), resolution)
+        shape = LinearRing if exterior else Polygon
+        for i, (x, y) in zip(indexes.tolist(), xy[indexes].tolist()):
+            circles[i] = shape(template + (x, y))
+
+    return circles
+
+
+def get_arc_tolerance(units):
+    """
+    Max. distance between an arc and the straight segments that
+    represent it, ``Geometry.defaults["arc_tolerance"]``, in the
+    given units. The default is in inches.
+
+    :param units: "IN" or "MM"
+    :type units: str
+    :return: Tolerance or None if arcs are to be discretized
+        with a fixed number of steps per circle.
+    :rtype: float
+    """
+
+    tolerance = Geometry.defaults["arc_tolerance"]
+    if tolerance and units.upper() == "MM":
+        return tolerance * 25.4
+    return tolerance
+
+
+def arc_steps(radius, angle, steps_per_circ=None, tolerance=None, min_steps_per_circ=8):
+    """
+    Number of straight segments to represent an arc. If a tolerance
+    is given, it is the least for which no point in the arc is further
+    than the tolerance from the segments (chord error). Otherwise it
+    is proportional to ``steps_per_circ``.
+
+    :param radius: Radius of the arc.
+    :param angle: Angle spanned by the arc in radians.
+    :param steps_per_circ: Number of segments in a whole circle.
+        Used if there is no tolerance.
+    :param tolerance: Max. chord error.
+    :param min_steps_per_circ: Least number of segments in a whole
+        circle, when using a tolerance.
+    :return: Number of segments, at least 2.
+    :rtype: int
+    """
+
+    if tolerance:
+        if tolerance < radius:
+            max_angle = 2 * np.arccos(1.0 - float(tolerance) / radius)
+        else:
+            max_angle = pi
+        steps = max(int(ceil(angle / max_angle)),
+                    int(ceil(angle / (2 * pi) * min_steps_per_circ)))
+    else:
+        steps = int(ceil(angle / (2 * pi) * steps_per_circ))
+
+    return max(steps, 2)
+
+
+def arc_points(center, radius, start, stop, direction, steps_per_circ=None, tolerance=None):
+    """
+    Points along the specified arc. See arc_steps() for
+    how many are created.
 
     :param center: Coordinates of the center [x, y]
     :type center: list
@@ -3623,48 +5293,67 @@ def arc(center, radius, start, stop, direction, steps_per_circ):
     :type start: float
     :param stop: End angle in radians
     :type stop: float
-    :param direction: Orientation of the arc, "CW" or "CCW"
+    :param direction: Orientation of the arc, "cw" or "ccw"
     :type direction: string
     :param steps_per_circ: Number of straight line segments to
-        represent a circle.
+        represent a circle. Used if there is no tolerance.
     :type steps_per_circ: int
-    :return: The desired arc, as list of tuples
-    :rtype: list
+    :param tolerance: Max. distance between the arc and the segments.
+    :type tolerance: float
+    :return: The desired arc, including both ends, shape (N, 2).
+    :rtype: numpy.ndarray
     """
-    # TODO: Resolution should be established by maximum error from the exact arc.
 
     da_sign = {"cw": -1.0, "ccw": 1.0}
-    points = []
     if direction == "ccw" and stop <= start:
         stop += 2 * pi
     if direction == "cw" and stop >= start:
         stop -= 2 * pi
-    
+
     angle = abs(stop - start)
-        
-    #angle = stop-start
-    steps = max([int(ceil(angle / (2 * pi) * steps_per_circ)), 2])
+
+    steps = arc_steps(radius, angle, steps_per_circ, tolerance)
     delta_angle = da_sign[direction] * angle * 1.0 / steps
-    for i in range(steps + 1):
-        theta = start + delta_angle * i
-        points.append((center[0] + radius * cos(theta), center[1] + radius * sin(theta)))
+    theta = start + delta_angle * np.arange(steps + 1)
+
+    points = np.empty((steps + 1, 2))
+    points[:, 0] = center[0] + radius * np.cos(theta)
+    points[:, 1] = center[1] + radius * np.sin(theta)
     return points
 
 
-def arc2(p1, p2, center, direction, steps_per_circ):
+def arc(center, radius, start, stop, direction, steps_per_circ=None, tolerance=None):
+    """
+    Creates a list of point along the specified arc.
+    See arc_points().
+
+    :return: The desired arc, as list of [x, y]
+    :rtype: list
+    """
+
+    return arc_points(center, radius, start, stop, direction,
+                      steps_per_circ, tolerance).tolist()
+
+
+def arc2(p1, p2, center, direction, steps_per_circ=None, tolerance=None):
     r = sqrt((center[0] - p1[0]) ** 2 + (center[1] - p1[1]) ** 2)
     start = arctan2(p1[1] - center[1], p1[0] - center[0])
     stop = arctan2(p2[1] - center[1], p2[0] - center[0])
-    return arc(center, r, start, stop, direction, steps_per_circ)
+    return arc(center, r, start, stop, direction, steps_per_circ, tolerance)
 
 
 def arc_angle(start, stop, direction):
-    if direction == "ccw" and stop <= start:
-        stop += 2 * pi
-    if direction == "cw" and stop >= start:
-        stop -= 2 * pi
+    """
+    Angle spanned by an arc. Works with arrays of
+    start and stop angles too.
+    """
 
-    angle = abs(stop - start)
+    if direction == "ccw":
+        stop = np.where(stop <= start, stop + 2 * pi, stop)
+    if direction == "cw":
+        stop = np.where(stop >= start, stop - 2 * pi, stop)
+
+    angle = np.abs(stop - start)
     return angle
 
 
@@ -3702,12 +5391,15 @@ def to_dict(obj):
 
     * ApertureMacro
     * BaseGeometry
+    * ExcellonDrills, as a list of dictionaries.
 
     :param obj: Shapely geometry.
     :type obj: BaseGeometry
     :return: Dictionary with serializable form if ``obj`` was
         BaseGeometry or ApertureMacro, otherwise returns ``obj``.
     """
+    if isinstance(obj, ExcellonDrills):
+        return list(obj)
     if isinstance(obj, ApertureMacro):
         return {
             "__class__": "ApertureMacro",
@@ -4043,43 +5735,1119 @@ def distance(pt1, pt2):
     return sqrt((pt1[0] - pt2[0]) ** 2 + (pt1[1] - pt2[1]) ** 2)
 
 
-class FlatCAMRTree(object):
+def union_polygons(polygons, use_buffer=True):
     """
-    Indexes geometry (Any object with "cooords" property containing
-    a list of tuples with x, y values). Objects are indexed by
-    all their points by default. To index by arbitrary points,
-    override self.points2obj.
+    Union of a list of polygons, as done at the end of
+    ``Gerber.parse_lines()``.
+
+    :param polygons: List of Shapely polygons.
+    :type polygons: list
+    :param use_buffer: Join by buffering the polygons back and forth
+        instead of cascaded_union().
+    :type use_buffer: bool
+    :return: Union of the polygons.
+    :rtype: Polygon or MultiPolygon
     """
 
-    def __init__(self):
-        # Python RTree Index
-        self.rti = rtindex.Index()
+    if len(polygons) == 0:
+        return Polygon()
 
-        ## Track object-point relationship
-        # Each is list of points in object.
-        self.obj2points = []
+    if use_buffer:
+        return MultiPolygon(polygons).buffer(0.00000001).buffer(-0.00000001)
 
-        # Index is index in rtree, value is index of
-        # object in obj2points.
-        self.points2obj = []
+    return cascaded_union(polygons).buffer(0)
 
-        self.get_points = lambda go: go.coords
 
-    def grow_obj2points(self, idx):
-        """
-        Increases the size of self.obj2points to fit
-        idx + 1 items.
+def _union_polygons_wkb(args):
+    """
+    union_polygons() on WKB data. Runs in the worker
+    processes of tiled_union().
 
-        :param idx: Index to fit into list.
-        :return: None
-        """
-        if len(self.obj2points) > idx:
-            # len == 2, idx == 1, ok.
-            return
-        else:
-            # len == 2, idx == 2, need 1 more.
-            # range(2, 3)
-            for i in range(len(self.obj2points), idx + 1):
+    :param args: (list of WKB strings, use_buffer)
+    :return: WKB of the union.
+    :rtype: str
+    """
+
+    wkbs, use_buffer = args
+    return union_polygons([wkb_loads(w) for w in wkbs], use_buffer=use_buffer).wkb
+
+
+def tiled_union(polygons, tiles=4, processes=None, use_buffer=True):
+    """
+    Union of a list of polygons, split in a grid of tiles x tiles
+    over their bounding box. Polygons fully inside a tile are joined
+    per tile in a pool of processes. Since these results cannot touch
+    each other, only polygons crossing tile borders and the results
+    they touch are joined afterwards.
+
+    :param polygons: List of Shapely polygons.
+    :type polygons: list
+    :param tiles: Number of tiles along each axis.
+    :type tiles: int
+    :param processes: Number of worker processes. None for as many
+        as CPUs. With 1 no processes are started.
+    :type processes: int
+    :param use_buffer: See union_polygons().
+    :type use_buffer: bool
+    :return: Union of the polygons.
+    :rtype: Polygon or MultiPolygon
+    """
+
+    if tiles < 2 or len(polygons) < 2:
+        return union_polygons(polygons, use_buffer=use_buffer)
+
+    bounds = np.array([p.bounds for p in polygons])
+    xmin, ymin = bounds[:, 0].min(), bounds[:, 1].min()
+    xmax, ymax = bounds[:, 2].max(), bounds[:, 3].max()
+    tile_w = max((xmax - xmin) / tiles, 1e-9)
+    tile_h = max((ymax - ymin) / tiles, 1e-9)
+
+    # Tile index of each corner of the bounding boxes. Touching
+    # a border between tiles means crossing.
+    ix = np.minimum(np.floor((bounds[:, [0, 2]] - xmin) / tile_w).astype(int), tiles - 1)
+    iy = np.minimum(np.floor((bounds[:, [1, 3]] - ymin) / tile_h).astype(int), tiles - 1)
+    inside = (ix[:, 0] == ix[:, 1]) & (iy[:, 0] == iy[:, 1])
+
+    buckets = {}
+    crossing = []
+    for i in range(len(polygons)):
+        if inside[i]:
+            buckets.setdefault((ix[i, 0], iy[i, 0]), []).append(polygons[i].wkb)
+        else:
+            crossing.append(polygons[i])
+
+    jobs = [(buckets[key], use_buffer) for key in sorted(buckets)]
+
+    if processes == 1:
+        results = map(_union_polygons_wkb, jobs)
+    else:
+        pool = multiprocessing.Pool(processes=processes)
+        try:
+            results = pool.map(_union_polygons_wkb, jobs)
+        finally:
+            pool.close()
+            pool.join()
+
+    parts = []
+    for result in results:
+        parts += autolist_polygons(wkb_loads(result))
+
+    if len(crossing) == 0:
+        return MultiPolygon(parts)
+
+    ## Stitch
+    joined = union_polygons(crossing, use_buffer=use_buffer)
+
+    idx = rtindex.Index()
+    for i, part in enumerate(parts):
+        idx.insert(i, part.bounds)
+
+    touching = set()
+    for poly in autolist_polygons(joined):
+        prepared = prep(poly)
+        for i in idx.intersection(poly.bounds):
+            if i not in touching and prepared.intersects(parts[i]):
+                touching.add(i)
+
+    # Results from the tiles are valid and do not touch each other
+    # so a single overlay is enough.
+    stitched = joined.union(MultiPolygon([parts[i] for i in touching]))
+
+    return MultiPolygon([parts[i] for i in range(len(parts)) if i not in touching] +
+                        autolist_polygons(stitched))
+
+
+def scanline_segments(polygons, ys):
+    """
+    Segments of the horizontal lines at each of ``ys`` that are
+    inside the polygons, like intersecting the lines with them.
+    The crossings of all the edges with all the lines are found at
+    once, sorted along each line and taken in pairs.
+
+    A line through a vertex crosses only the edge above it. Edges
+    along a line are added to the segments of that line.
+
+    :param polygons: List of Shapely polygons.
+    :type polygons: list
+    :param ys: Y coordinate of each line.
+    :return: (rows, x0, x1), arrays with the index in ``ys`` and
+        the end points of each segment, sorted by row and x0.
+    :rtype: tuple
+    """
+
+    ys = np.asarray(ys, dtype=float)
+    rings = []
+    for poly in polygons:
+        rings.append(np.asarray(poly.exterior.coords))
+        rings += [np.asarray(ring.coords) for ring in poly.interiors]
+    rings = [ring for ring in rings if len(ring) > 1]
+
+    if len(rings) == 0 or len(ys) == 0:
+        return np.zeros(0, dtype=int), np.zeros(0), np.zeros(0)
+
+    start = np.vstack([ring[:-1] for ring in rings])
+    end = np.vstack([ring[1:] for ring in rings])
+
+    # Each edge from its lowest point, without horizontal ones.
+    up = start[:, 1] < end[:, 1]
+    low = np.where(up[:, None], start, end)
+    high = np.where(up[:, None], end, start)
+    keep = low[:, 1] != high[:, 1]
+    flat_start, flat_end = low[~keep], high[~keep]
+    low, high = low[keep], high[keep]
+
+    # Lines crossed by each edge: low y <= y < high y.
+    order = np.argsort(ys)
+    sorted_ys = ys[order]
+    first = np.searchsorted(sorted_ys, low[:, 1], side='left')
+    counts = np.searchsorted(sorted_ys, high[:, 1], side='left') - first
+
+    edge = np.repeat(np.arange(len(low)), counts)
+    offsets = np.cumsum(counts) - counts
+    line = first[edge] + np.arange(len(edge)) - np.repeat(offsets, counts)
+    y = sorted_ys[line]
+    dx = high[edge, 0] - low[edge, 0]
+    dy = high[edge, 1] - low[edge, 1]
+    x = low[edge, 0] + (y - low[edge, 1]) * dx / dy
+
+    # Along each line, in pairs.
+    rows = order[line]
+    by_row = np.lexsort((x, rows))
+    rows, x = rows[by_row], x[by_row]
+    rows, x0, x1 = rows[0::2], x[0::2], x[1::2]
+
+    ## Horizontal edges on a line
+    line = np.minimum(np.searchsorted(sorted_ys, flat_start[:, 1]), len(ys) - 1)
+    on_line = sorted_ys[line] == flat_start[:, 1]
+    if on_line.any():
+        flat_rows = order[line[on_line]]
+        flat_x0 = np.minimum(flat_start[on_line, 0], flat_end[on_line, 0])
+        flat_x1 = np.maximum(flat_start[on_line, 0], flat_end[on_line, 0])
+
+        # Merge with the segments of those lines.
+        merge = np.in1d(rows, flat_rows)
+        intervals = sorted(zip(np.concatenate([rows[merge], flat_rows]),
+                               np.concatenate([x0[merge], flat_x0]),
+                               np.concatenate([x1[merge], flat_x1])))
+        merged = [list(intervals[0])]
+        for row, xa, xb in intervals[1:]:
+            if row == merged[-1][0] and xa <= merged[-1][2]:
+                merged[-1][2] = max(merged[-1][2], xb)
+            else:
+                merged.append([row, xa, xb])
+        merged = np.array(merged)
+
+        rows = np.concatenate([rows[~merge], merged[:, 0].astype(int)])
+        x0 = np.concatenate([x0[~merge], merged[:, 1]])
+        x1 = np.concatenate([x1[~merge], merged[:, 2]])
+        by_row = np.lexsort((x0, rows))
+        rows, x0, x1 = rows[by_row], x0[by_row], x1[by_row]
+
+    nonzero = x1 > x0
+    return rows[nonzero], x0[nonzero], x1[nonzero]
+
+
+def paint_polygon(polygon, tooldia, overlap, method="standard", margin=0.0,
+                  contour=True, connect=True):
+    """
+    Paths to paint a polygon, as done by
+    ``FlatCAMGeometry.paint_poly()``.
+
+    :param polygon: Polygon to paint.
+    :type polygon: Polygon
+    :param tooldia: Tool diameter.
+    :param overlap: Fraction of the tool diameter to overlap passes.
+    :param method: "standard" for Geometry.clear_polygon(),
+        "seed" for Geometry.clear_polygon2() or "lines" for
+        Geometry.clear_polygon3().
+    :param margin: Distance from the edges of the polygon.
+    :param contour: Paint around the edges.
+    :param connect: Connect lines to avoid tool lifts.
+    :return: List of paths.
+    :rtype: list
+    """
+
+    if method == "seed":
+        clear = Geometry.clear_polygon2
+    elif method == "lines":
+        clear = Geometry.clear_polygon3
+    else:
+        clear = Geometry.clear_polygon
+
+    # Type(cp) == FlatCAMRTreeStorage | None
+    cp = clear(polygon.buffer(-margin), tooldia, overlap=overlap,
+               contour=contour, connect=connect)
+
+    if cp is None:
+        return []
+    return list(cp.get_objects())
+
+
+def _paint_polygon_wkb(args):
+    """
+    paint_polygon() on WKB data. Runs in the worker
+    processes of paint_polygons().
+
+    :param args: (index, WKB of the polygon, arguments of paint_polygon())
+    :return: (index, list of WKB of the paths)
+    :rtype: tuple
+    """
+
+    index, wkb = args[:2]
+    paths = paint_polygon(wkb_loads(wkb), *args[2:])
+    return index, [path.wkb for path in paths]
+
+
+def paint_polygons(polygons, tooldia, overlap, method="standard", margin=0.0,
+                   contour=True, connect=True, processes=None, callback=None):
+    """
+    Paths to paint each of a list of polygons. See paint_polygon().
+
+    Polygons are sent as WKB to a pool of processes, largest first.
+    The paths are returned in the order of the polygons, no matter
+    which process finishes first.
+
+    :param polygons: List of Shapely polygons.
+    :type polygons: list
+    :param processes: Number of worker processes. None for as many
+        as CPUs. With 1 no processes are started.
+    :type processes: int
+    :param callback: Called as ``callback(done, total)`` each time
+        a polygon has been painted.
+    :return: List of paths.
+    :rtype: list
+    """
+
+    args = (tooldia, overlap, method, margin, contour, connect)
+    results = [None] * len(polygons)
+
+    if processes == 1 or len(polygons) < 2:
+        for i, polygon in enumerate(polygons):
+            results[i] = paint_polygon(polygon, *args)
+            if callback is not None:
+                callback(i + 1, len(polygons))
+        return [path for paths in results for path in paths]
+
+    jobs = [(i, polygons[i].wkb) + args
+            for i in sorted(range(len(polygons)), key=lambda i: -polygons[i].area)]
+
+    pool = multiprocessing.Pool(processes=processes)
+    try:
+        for done, (i, wkbs) in enumerate(pool.imap_unordered(_paint_polygon_wkb, jobs)):
+            results[i] = wkbs
+            if callback is not None:
+                callback(done + 1, len(polygons))
+    finally:
+        pool.close()
+        pool.join()
+
+    return [wkb_loads(wkb) for wkbs in results for wkb in wkbs]
+
+
+def _buffer_passes_wkb(args):
+    """
+    Buffers of a group of polygons given as WKB, each one from
+    the previous one when possible. Runs in the worker processes
+    of buffer_passes().
+
+    :param args: (list of WKB of polygons, offsets)
+    :return: List with the WKB of the buffer for each offset.
+    :rtype: list
+    """
+
+    wkbs, offsets = args
+    original = MultiPolygon([wkb_loads(wkb) for wkb in wkbs])
+    geo = original
+    previous = 0.0
+    buffers = []
+    for offset in offsets:
+        # Offsets add up if they go the same way. The corners of the
+        # previous buffer are all arcs, in segments of pi / 32 (16 per
+        # quarter circle), so mitre joins keep them as arcs without
+        # adding vertices. They are off by less than the segments.
+        if offset * previous > 0 and abs(offset) >= abs(previous):
+            geo = geo.buffer(offset - previous, join_style=2)
+        else:
+            geo = original.buffer(offset)
+        previous = offset
+        buffers.append(geo.wkb)
+    return buffers
+
+
+def _map_jobs(fcn, jobs, processes):
+    """
+    ``map(fcn, jobs)`` in a pool of processes.
+
+    :param processes: Number of worker processes. None for as many
+        as CPUs. With 1 no processes are started.
+    """
+
+    if processes == 1 or len(jobs) < 2:
+        return map(fcn, jobs)
+
+    # Some jobs at a time, so that a process has enough to do.
+    chunksize = max(1, len(jobs) // (4 * (processes or multiprocessing.cpu_count())))
+    pool = multiprocessing.Pool(processes=processes)
+    try:
+        return pool.map(fcn, jobs, chunksize=chunksize)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def buffer_passes(geometry, offsets, processes=None):
+    """
+    Buffers of the geometry at each of the given offsets, as
+    ``[geometry.buffer(offset) for offset in offsets]``.
+
+    Each polygon in the geometry is buffered on its own, in a pool
+    of processes. Polygons whose buffers overlap are then buffered
+    again together, so their buffers never have to be joined.
+    While a polygon or group is the same from one offset to the
+    next, each buffer is taken from the previous one.
+
+    :param geometry: Polygon, MultiPolygon or list of polygons that
+        do not overlap, as from Gerber.get_nets().
+    :param offsets: Offset distances.
+    :type offsets: list
+    :param processes: Number of worker processes. None for as many
+        as CPUs. With 1 no processes are started.
+    :type processes: int
+    :return: The buffered geometry for each offset.
+    :rtype: list
+    """
+
+    if type(geometry) is list:
+        polygons = geometry
+    else:
+        polygons = autolist_polygons(geometry)
+    if len(polygons) == 0:
+        return [MultiPolygon() for offset in offsets]
+
+    ## Each polygon
+    jobs = [([poly.wkb], offsets) for poly in polygons]
+    single = [[wkb_loads(wkb) for wkb in result]
+              for result in _map_jobs(_buffer_passes_wkb, jobs, processes)]
+
+    ## Groups of overlapping buffers for each offset
+    # {members: [offset index, ...]}, members being a tuple of
+    # polygon indexes, in order.
+    groups = collections.OrderedDict()
+    for n in range(len(offsets)):
+        buffers = [result[n] for result in single]
+        idx = rtindex.Index()
+        for i, buf in enumerate(buffers):
+            if not buf.is_empty:
+                idx.insert(i, buf.bounds)
+
+        group = range(len(polygons))
+
+        def find(i):
+            while group[i] != i:
+                group[i] = group[group[i]]
+                i = group[i]
+            return i
+
+        for i, buf in enumerate(buffers):
+            if buf.is_empty:
+                continue
+            prepared = prep(buf)
+            for j in idx.intersection(buf.bounds):
+                if j > i and find(i) != find(j) and prepared.intersects(buffers[j]):
+                    group[find(j)] = find(i)
+
+        members = collections.OrderedDict()
+        for i in range(len(polygons)):
+            members.setdefault(find(i), []).append(i)
+        for key in members.values():
+            if len(key) > 1:
+                groups.setdefault(tuple(key), []).append(n)
+
+    jobs = [([polygons[i].wkb for i in key], [offsets[n] for n in groups[key]])
+            for key in groups]
+    joined = _map_jobs(_buffer_passes_wkb, jobs, processes)
+
+    ## Put together
+    parts = [[] for offset in offsets]
+    grouped = [set() for offset in offsets]
+    for key, result in zip(groups, joined):
+        for n, wkb in zip(groups[key], result):
+            parts[n] += autolist_polygons(wkb_loads(wkb))
+            grouped[n].update(key)
+    for i, result in enumerate(single):
+        for n in range(len(offsets)):
+            if i not in grouped[n]:
+                parts[n] += autolist_polygons(result[n])
+
+    return [part[0] if len(part) == 1 else MultiPolygon(part) for part in parts]
+
+
+def clip_to_rect(geometry, xmin, ymin, xmax, ymax):
+    """
+    Parts of the polygons in the geometry inside the rectangle.
+    Uses ``shapely.ops.clip_by_rect()`` (Shapely 1.7) if available.
+    Parts are clipped one by one, so they may overlap.
+
+    :return: Polygon, MultiPolygon or GeometryCollection.
+    """
+
+    try:
+        from shapely.ops import clip_by_rect
+    except ImportError:
+        rect = shply_box(xmin, ymin, xmax, ymax)
+        return MultiPolygon([part for poly in autolist_polygons(geometry)
+                             for part in autolist_polygons(poly.intersection(rect))])
+    return clip_by_rect(geometry, xmin, ymin, xmax, ymax)
+
+
+def _difference_tile(region, other, disjoint):
+    """
+    Difference of a tile of tiled_difference().
+
+    :param region: Polygon or MultiPolygon.
+    :param other: Polygons to subtract.
+    :param disjoint: Whether the polygons are known not to overlap.
+    :type disjoint: bool
+    :return: The difference.
+    """
+
+    if other.is_empty:
+        return region
+    if disjoint:
+        try:
+            return region.difference(other)
+        except TopologicalError:
+            # Clipping can leave parts touching along the tile border.
+            pass
+    return region.difference(unary_union(autolist_polygons(other)))
+
+
+def _difference_tile_wkb(args):
+    """
+    _difference_tile() on WKB data. Runs in the worker
+    processes of tiled_difference().
+
+    :param args: (WKB of the region, WKB of the polygons, disjoint)
+    :return: WKB of the difference.
+    :rtype: str
+    """
+
+    wkb, other_wkb, disjoint = args
+    return _difference_tile(wkb_loads(wkb), wkb_loads(other_wkb), disjoint).wkb
+
+
+def tiled_difference(boundary, geometry, tiles=4, processes=None, callback=None):
+    """
+    ``boundary.difference(geometry)``, split in a grid of
+    tiles x tiles over the bounding box of the boundary. The
+    difference is found for each tile, in a pool of processes,
+    from the geometry clipped to the tile. Pieces of the result
+    on the borders between tiles are then joined.
+
+    :param boundary: Polygon or MultiPolygon.
+    :param geometry: Shapely geometry or list of geometries,
+        which may overlap.
+    :param tiles: Number of tiles along each axis.
+    :type tiles: int
+    :param processes: Number of worker processes. None for as many
+        as CPUs. With 1 no processes are started.
+    :type processes: int
+    :param callback: Called as ``callback(done, total)`` each time
+        a tile is done. It can raise an exception to stop.
+    :return: The difference.
+    :rtype: Polygon or MultiPolygon
+    """
+
+    if type(geometry) is list:
+        geometry = MultiPolygon([poly for geo in geometry for poly in autolist_polygons(geo)])
+        disjoint = False
+    else:
+        # Parts of a Shapely geometry are taken not to overlap.
+        if not isinstance(geometry, (Polygon, MultiPolygon)):
+            geometry = MultiPolygon(autolist_polygons(geometry))
+        disjoint = True
+
+    if tiles < 2 or boundary.is_empty:
+        if disjoint:
+            return boundary.difference(geometry)
+        return boundary.difference(unary_union(autolist_polygons(geometry)))
+
+    xmin, ymin, xmax, ymax = boundary.bounds
+    xs = np.linspace(xmin, xmax, tiles + 1)
+    ys = np.linspace(ymin, ymax, tiles + 1)
+
+    # Clipping runs over all of the geometry for each tile, but
+    # it is fast enough not to be worth indexing.
+    jobs = []
+    for i in range(tiles):
+        for j in range(tiles):
+            rect = (xs[i], ys[j], xs[i + 1], ys[j + 1])
+            region = clip_to_rect(boundary, *rect)
+            if region.is_empty:
+                continue
+            jobs.append((region, clip_to_rect(geometry, *rect)))
+
+    results = [None] * len(jobs)
+    if processes == 1:
+        for n, (region, other) in enumerate(jobs):
+            results[n] = _difference_tile(region, other, disjoint)
+            if callback is not None:
+                callback(n + 1, len(jobs))
+    else:
+        jobs = [(region.wkb, other.wkb, disjoint) for region, other in jobs]
+        pool = multiprocessing.Pool(processes=processes)
+        try:
+            for n, result in enumerate(pool.imap(_difference_tile_wkb, jobs)):
+                results[n] = wkb_loads(result)
+                if callback is not None:
+                    callback(n + 1, len(jobs))
+        finally:
+            pool.close()
+            pool.join()
+
+    ## Stitch
+    # Pieces off the inner grid lines are complete.
+    inner_xs, inner_ys = xs[1:-1], ys[1:-1]
+    parts = []
+    border = []
+    for result in results:
+        for poly in autolist_polygons(result):
+            pxmin, pymin, pxmax, pymax = poly.bounds
+            if np.any((inner_xs == pxmin) | (inner_xs == pxmax)) or \
+                    np.any((inner_ys == pymin) | (inner_ys == pymax)):
+                border.append(poly)
+            else:
+                parts.append(poly)
+
+    # Holes of a piece are inside its tile, so only exteriors need
+    # joining. Pieces from different tiles only share edges, so they
+    # can be joined by buffering, much faster than with unary_union().
+    if len(border) > 0:
+        shells = [Polygon(poly.exterior) for poly in border]
+        joined = MultiPolygon(shells).buffer(0)
+        if abs(joined.area - sum(shell.area for shell in shells)) > 1e-9 * joined.area:
+            joined = unary_union(shells)
+        joined = autolist_polygons(joined)
+
+        # Put the holes back.
+        holes = [list(poly.interiors) for poly in joined]
+        prepared = [prep(poly) for poly in joined]
+        for poly in border:
+            if len(poly.interiors) == 0:
+                continue
+            point = poly.representative_point()
+            for n in range(len(joined)):
+                if prepared[n].contains(point):
+                    holes[n] += list(poly.interiors)
+                    break
+        parts += [Polygon(poly.exterior, holes[n]) for n, poly in enumerate(joined)]
+
+    if len(parts) == 1:
+        return parts[0]
+    return MultiPolygon(parts)
+
+
+def union_by_pairs(geos):
+    """
+    Union of a list of valid geometries, joining them by pairs
+    with single overlays. Much faster than a buffer-based union
+    when each of them is already valid.
+
+    :param geos: List of valid Shapely geometries.
+    :type geos: list
+    :return: Union of the geometries.
+    """
+
+    if len(geos) == 0:
+        return Polygon()
+
+    while len(geos) > 1:
+        joined = [geos[i].union(geos[i + 1]) for i in range(0, len(geos) - 1, 2)]
+        if len(geos) % 2 == 1:
+            joined.append(geos[-1])
+        geos = joined
+
+    return geos[0]
+
+
+def resolve_polarity_layers(layers):
+    """
+    Combines dark and clear polarity layers into the resulting
+    geometry. Layers are applied in order: the polygons of a clear
+    layer are only subtracted from the dark polygons, in the previous
+    layers, whose bounding boxes intersect them. These are found
+    through a spatial index.
+
+    :param layers: List of (polarity, geometry), polarity being
+        'D' (dark) or 'C' (clear). The geometry of each layer
+        must be valid.
+    :type layers: list
+    :return: Resulting geometry.
+    :rtype: Polygon or MultiPolygon
+    """
+
+    # Dark polygons as {id: (layer number, polygon)}
+    dark = {}
+    next_id = 0
+    idx = rtindex.Index()
+
+    for layer_num, (polarity, geo) in enumerate(layers):
+        if polarity == 'D':
+            for poly in autolist_polygons(geo):
+                dark[next_id] = (layer_num, poly)
+                idx.insert(next_id, poly.bounds)
+                next_id += 1
+            continue
+
+        for clear in autolist_polygons(geo):
+            prepared = prep(clear)
+            for i in list(idx.intersection(clear.bounds)):
+                poly_layer, poly = dark[i]
+                if not prepared.intersects(poly):
+                    continue
+
+                idx.delete(i, poly.bounds)
+                del dark[i]
+                for piece in autolist_polygons(poly.difference(clear)):
+                    dark[next_id] = (poly_layer, piece)
+                    idx.insert(next_id, piece.bounds)
+                    next_id += 1
+
+    # Polygons from the same layer do not overlap.
+    by_layer = {}
+    for poly_layer, poly in dark.itervalues():
+        by_layer.setdefault(poly_layer, []).append(poly)
+
+    result = union_by_pairs([MultiPolygon(by_layer[n]) for n in sorted(by_layer)])
+    if type(result) == MultiPolygon and len(result.geoms) == 1:
+        return result.geoms[0]
+    return result
+
+
+def autolist_polygons(geo):
+    """
+    List of the polygons in a Polygon, MultiPolygon or
+    GeometryCollection. Anything else is left out.
+
+    :param geo: Shapely geometry.
+    :return: List of polygons.
+    :rtype: list
+    """
+
+    if geo.is_empty:
+        return []
+
+    if type(geo) == Polygon:
+        return [geo]
+
+    try:
+        return [g for g in geo if type(g) == Polygon and not g.is_empty]
+    except TypeError:
+        return []
+
+
+class StreamingUnion(object):
+    """
+    Joins polygons as they are added, so only a bounded number of
+    them is held in memory. Polygons are queued until there are
+    ``max_primitives`` of them or they have ``max_vertices`` in total.
+    The queue is then joined into partial results kept in a spatial
+    grid, each polygon with the partial result of the cell containing
+    its center, so every merge stays local.
+
+    Use it like a list of polygons and call union() at the end.
+    """
+
+    def __init__(self, max_primitives=2000, max_vertices=200000, use_buffer=True):
+        self.max_primitives = max_primitives
+        self.max_vertices = max_vertices
+        self.use_buffer = use_buffer
+
+        # Not joined yet
+        self.pending = []
+        self.pending_vertices = 0
+
+        # Partial results. Keys are (i, j) grid cells and values
+        # are lists of polygons.
+        self.cells = {}
+        self.cell_size = None
+
+        # Max. number of polygons held at any time.
+        self.peak = 0
+
+    def __len__(self):
+        return len(self.pending) + sum([len(parts) for parts in self.cells.itervalues()])
+
+    def append(self, geo):
+        """
+        Adds a polygon (or multi-polygon). Joins the queue
+        if it is full.
+
+        :param geo: Shapely geometry.
+        :return: None
+        """
+
+        self.pending.append(geo)
+        try:
+            self.pending_vertices += len(geo.exterior.coords)
+        except AttributeError:
+            self.pending_vertices += sum([len(g.exterior.coords) for g in autolist_polygons(geo)])
+
+        if len(self.pending) >= self.max_primitives or \
+                self.pending_vertices >= self.max_vertices:
+            self.flush()
+
+    def flush(self):
+        """
+        Joins the queued polygons into the partial results.
+
+        :return: None
+        """
+
+        if len(self.pending) == 0:
+            return
+
+        self.peak = max(self.peak, len(self))
+
+        bounds = np.array([g.bounds for g in self.pending])
+        if self.cell_size is None:
+            # Fixed from the first batch on.
+            self.cell_size = max(bounds[:, 2].max() - bounds[:, 0].min(),
+                                 bounds[:, 3].max() - bounds[:, 1].min(), 1e-6) / 4
+
+        cx = np.floor((bounds[:, 0] + bounds[:, 2]) / 2 / self.cell_size).astype(int)
+        cy = np.floor((bounds[:, 1] + bounds[:, 3]) / 2 / self.cell_size).astype(int)
+
+        batches = {}
+        for i in range(len(self.pending)):
+            batches.setdefault((cx[i], cy[i]), []).extend(autolist_polygons(self.pending[i]))
+
+        for cell in batches:
+            joined = union_polygons(batches[cell], use_buffer=self.use_buffer)
+            if cell in self.cells:
+                # Valid and not touching, so a single overlay will do.
+                joined = MultiPolygon(self.cells[cell]).union(joined)
+            self.cells[cell] = autolist_polygons(joined)
+
+        self.pending = []
+        self.pending_vertices = 0
+        self.peak = max(self.peak, len(self))
+
+    def union(self):
+        """
+        Union of all the polygons added.
+
+        :return: Union of the polygons.
+        :rtype: Polygon or MultiPolygon
+        """
+
+        self.flush()
+
+        return union_by_pairs([MultiPolygon(self.cells[cell]) for cell in sorted(self.cells)])
+
+
+def get_max_rss():
+    """
+    Maximum resident set size of this process so far.
+
+    :return: Size in kB or None if not available in this platform.
+    :rtype: int
+    """
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        # Bytes on OS X
+        rss /= 1024
+    return rss
+
+
+class ParseCache(object):
+    """
+    Cache of parsed Gerber and Excellon objects on disk. Entries are
+    addressed by a hash of the file contents and of the settings that
+    change the result of parsing (see ``cache_params()`` in the parser
+    classes), so a changed file or setting simply misses.
+
+    Each entry is a pickle of the attributes listed in ``cache_attrs``
+    of the object. Shapely geometry is pickled as WKB.
+
+    The least recently used entries are removed when the total size
+    exceeds ``max_size``.
+
+    **USAGE**::
+
+        cache = ParseCache(path, version=8.5)
+        if not cache.load(gerber, filename):
+            gerber.parse_file(filename)
+            cache.store(gerber, filename)
+    """
+
+    # File name extension of the entries.
+    suffix = ".fcache"
+
+    # Version of the contents of the entries. Increase when the
+    # attributes of the parsed objects change meaning.
+    format = 2
+
+    def __init__(self, path, max_size=200 * 1024 * 1024, version=None):
+        """
+        :param path: Folder for the cache entries. Created when needed.
+        :type path: str
+        :param max_size: Max. size of all entries in bytes. If 0,
+            nothing is loaded nor stored.
+        :type max_size: int
+        :param version: Program version. Entries made by other
+            versions are not used.
+        """
+
+        self.path = path
+        self.max_size = max_size
+        self.version = version
+
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, obj, filename, **params):
+        """
+        Hash of the contents of the file and the settings of the object.
+
+        :param obj: Gerber or Excellon object.
+        :param filename: File to be parsed.
+        :param params: Arguments to the parser, i.e. ``follow``.
+        :return: Hexadecimal digest.
+        :rtype: str
+        """
+
+        digest = hashlib.sha1()
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), ''):
+                digest.update(chunk)
+
+        settings = obj.cache_params()
+        settings.update(params)
+        settings['version'] = self.version
+        settings['format'] = self.format
+        settings['attrs'] = sorted(obj.cache_attrs)
+        digest.update(repr(sorted(settings.items())))
+
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.path, key + self.suffix)
+
+    def load(self, obj, filename, **params):
+        """
+        Sets the attributes of the object from the cache, if
+        the file has been parsed before with the same settings.
+
+        :param obj: Gerber or Excellon object.
+        :param filename: File to be parsed.
+        :param params: Arguments to the parser, i.e. ``follow``.
+        :return: Whether it was found.
+        :rtype: bool
+        """
+
+        if self.max_size <= 0:
+            return False
+
+        path = self.entry_path(self.key(obj, filename, **params))
+        try:
+            with open(path, 'rb') as f:
+                state = cPickle.load(f)
+            values = [state[attr] for attr in obj.cache_attrs]
+        except IOError:
+            self.misses += 1
+            return False
+        except Exception, e:
+            log.warning("ParseCache: Removing unreadable entry %s: %s" % (path, repr(e)))
+            self.remove(path)
+            self.misses += 1
+            return False
+
+        for attr, value in zip(obj.cache_attrs, values):
+            setattr(obj, attr, value)
+
+        # Most recently used.
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        self.hits += 1
+        log.debug("ParseCache: Loaded %s from %s" % (filename, path))
+        return True
+
+    def store(self, obj, filename, **params):
+        """
+        Saves the attributes of the parsed object to the cache
+        and removes old entries if the cache is too big.
+
+        :param obj: Gerber or Excellon object, already parsed.
+        :param filename: File that was parsed.
+        :param params: Arguments to the parser, i.e. ``follow``.
+        :return: None
+        """
+
+        if self.max_size <= 0:
+            return
+
+        path = self.entry_path(self.key(obj, filename, **params))
+        state = dict((attr, getattr(obj, attr)) for attr in obj.cache_attrs)
+
+        try:
+            if not os.path.exists(self.path):
+                os.makedirs(self.path)
+
+            # Write and rename, so no partial entry is ever read.
+            temp_path = "%s.%d.tmp" % (path, os.getpid())
+            with open(temp_path, 'wb') as f:
+                cPickle.dump(state, f, cPickle.HIGHEST_PROTOCOL)
+            if os.path.exists(path):
+                os.remove(path)
+            os.rename(temp_path, path)
+        except (IOError, OSError), e:
+            log.warning("ParseCache: Could not store %s: %s" % (filename, str(e)))
+            return
+
+        self.evict()
+
+    def entries(self):
+        """
+        Entries in the cache, least recently used first.
+
+        :return: List of (key, size in bytes, last used time).
+        :rtype: list
+        """
+
+        if not os.path.isdir(self.path):
+            return []
+
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith(self.suffix):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.path, name))
+            except OSError:
+                continue
+            entries.append((name[:-len(self.suffix)], stat.st_size, stat.st_mtime))
+
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def size(self):
+        """
+        :return: Total size of the entries in bytes.
+        :rtype: int
+        """
+
+        return sum(entry[1] for entry in self.entries())
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the total
+        size is not above ``max_size``.
+
+        :return: Number of entries removed.
+        :rtype: int
+        """
+
+        entries = self.entries()
+        total = sum(entry[1] for entry in entries)
+        removed = 0
+        for key, size, _ in entries:
+            if total <= self.max_size:
+                break
+            self.remove(self.entry_path(key))
+            total -= size
+            removed += 1
+
+        return removed
+
+    def clear(self):
+        """
+        Removes all entries.
+
+        :return: Number of entries removed.
+        :rtype: int
+        """
+
+        entries = self.entries()
+        for key, _, _ in entries:
+            self.remove(self.entry_path(key))
+
+        return len(entries)
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+IndexItem = collections.namedtuple('IndexItem', ['id', 'object', 'bbox'])
+
+
+class FlatCAMRTree(object):
+    """
+    Indexes geometry (Any object with "cooords" property containing
+    a list of tuples with x, y values). Objects are indexed by
+    all their points by default. To index by arbitrary points,
+    override self.get_points.
+
+    The points are searched with a KD-tree built in bulk when
+    first needed. Points inserted later are searched one by one
+    until there are enough to rebuild it. Removed points are only
+    marked as such until they are too many.
+    """
+
+    def __init__(self):
+        ## Track object-point relationship
+        # Each is list of points in object.
+        self.obj2points = []
+
+        # Index is point id, value is index of
+        # object in obj2points.
+        self.points2obj = []
+
+        # Coordinates of every point and whether it was not removed.
+        self.point_coords = []
+        self.alive = []
+        self.live_points = 0
+
+        # KD-tree of the points in self.tree_ids, which was
+        # built with self.tree_coords.
+        self.tree = None
+        self.tree_ids = np.zeros(0, dtype=int)
+        self.tree_coords = np.zeros((0, 2))
+        self.in_tree = []
+        self.dead_in_tree = 0
+
+        # Points inserted after the KD-tree was built.
+        self.pending = []
+
+        self.get_points = lambda go: go.coords
+
+    def grow_obj2points(self, idx):
+        """
+        Increases the size of self.obj2points to fit
+        idx + 1 items.
+
+        :param idx: Index to fit into list.
+        :return: None
+        """
+        if len(self.obj2points) > idx:
+            # len == 2, idx == 1, ok.
+            return
+        else:
+            # len == 2, idx == 2, need 1 more.
+            # range(2, 3)
+            for i in range(len(self.obj2points), idx + 1):
                 self.obj2points.append([])
 
     def insert(self, objid, obj):
@@ -4087,23 +6855,83 @@ class FlatCAMRTree(object):
         self.obj2points[objid] = []
 
         for pt in self.get_points(obj):
-            self.rti.insert(len(self.points2obj), (pt[0], pt[1], pt[0], pt[1]), obj=objid)
-            self.obj2points[objid].append(len(self.points2obj))
+            ptid = len(self.points2obj)
+            self.obj2points[objid].append(ptid)
             self.points2obj.append(objid)
+            self.point_coords.append((pt[0], pt[1]))
+            self.alive.append(True)
+            self.in_tree.append(False)
+            self.pending.append(ptid)
+            self.live_points += 1
 
     def remove_obj(self, objid, obj):
-        # Use all ptids to delete from index
-        for i, pt in enumerate(self.get_points(obj)):
-            self.rti.delete(self.obj2points[objid][i], (pt[0], pt[1], pt[0], pt[1]))
+        for ptid in self.obj2points[objid]:
+            if self.alive[ptid]:
+                self.alive[ptid] = False
+                self.live_points -= 1
+                if self.in_tree[ptid]:
+                    self.dead_in_tree += 1
+
+    def rebuild(self):
+        """
+        Builds the KD-tree with all the points not removed.
+
+        :return: None
+        """
+        self.tree_ids = np.array([ptid for ptid, alive in enumerate(self.alive) if alive], dtype=int)
+        self.tree_coords = np.array(self.point_coords, dtype=float).reshape((-1, 2))[self.tree_ids]
+        self.tree = cKDTree(self.tree_coords) if len(self.tree_ids) > 0 else None
+        for ptid in self.tree_ids.tolist():
+            self.in_tree[ptid] = True
+        self.dead_in_tree = 0
+        self.pending = []
 
     def nearest(self, pt):
         """
         Will raise StopIteration if no items are found.
 
         :param pt:
-        :return:
-        """
-        return self.rti.nearest(pt, objects=True).next()
+        :return: Item with the ``id`` of the point, the
+            ``object`` id it belongs to and its ``bbox``.
+        :rtype: IndexItem
+        """
+        if self.live_points == 0:
+            raise StopIteration
+
+        tree_size = len(self.tree_ids)
+        if self.tree is None and self.pending or \
+                len(self.pending) > max(64, tree_size / 4) or \
+                self.dead_in_tree > tree_size / 2:
+            self.rebuild()
+            tree_size = len(self.tree_ids)
+
+        x, y = pt[0], pt[1]
+        best = None
+        best_dist = Inf
+
+        # Nearest in the tree, looking further while they were removed.
+        k = 1
+        while self.tree is not None:
+            dists, indexes = self.tree.query((x, y), k)
+            found = False
+            for dist, i in zip(np.atleast_1d(dists).tolist(), np.atleast_1d(indexes).tolist()):
+                if i < tree_size and self.alive[self.tree_ids[i]]:
+                    best, best_dist = self.tree_ids[i], dist
+                    found = True
+                    break
+            if found or k >= tree_size:
+                break
+            k *= 4
+
+        for ptid in self.pending:
+            if self.alive[ptid]:
+                px, py = self.point_coords[ptid]
+                dist = ((px - x) ** 2 + (py - y) ** 2) ** 0.5
+                if dist < best_dist:
+                    best, best_dist = ptid, dist
+
+        px, py = self.point_coords[best]
+        return IndexItem(best, self.points2obj[best], (px, py, px, py))
 
 
 class FlatCAMRTreeStorage(FlatCAMRTree):
@@ -60,5 +60,5 @@ setup(
     version="8.5",
     description="FlatCAM: 2D Computer Aided PCB Manufacturing",
     options=dict(build_exe=buildOptions),
-    executables=[Executable("FlatCAM.py", base=base)]
+    executables=[Executable("flatcam", base=base, targetName="FlatCAM.exe")]
 )
\ No newline at end of file
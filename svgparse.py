@@ -53,7 +53,37 @@ def svgparselength(lengthstr):
     raise Exception('Cannot parse SVG length: %s' % lengthstr)
 
 
-def path2shapely(path, res=1.0):
+def svgarc2points(arc, tolerance):
+    """
+    Points along an svg.path.Arc, including both ends. There are as
+    many as needed for no point in the arc to be further than the
+    tolerance from the segments between them. See camlib.arc_steps().
+
+    :param arc: svg.path.Arc instance
+    :param tolerance: Max. distance between the arc and the segments.
+    :return: Array of points, shape (N, 2).
+    :rtype: numpy.ndarray
+    """
+
+    # camlib imports this module.
+    from camlib import arc_steps
+
+    if arc.start == arc.end:
+        return np.array([[arc.start.real, arc.start.imag]])
+
+    rx, ry = arc.radius.real, arc.radius.imag
+    steps = arc_steps(max(abs(rx), abs(ry)), np.radians(abs(arc.delta)), tolerance=tolerance)
+    angle = np.radians(arc.theta + arc.delta * np.linspace(0.0, 1.0, steps + 1))
+    cosr = np.cos(np.radians(arc.rotation))
+    sinr = np.sin(np.radians(arc.rotation))
+
+    points = np.empty((steps + 1, 2))
+    points[:, 0] = cosr * np.cos(angle) * rx - sinr * np.sin(angle) * ry + arc.center.real
+    points[:, 1] = sinr * np.cos(angle) * rx + cosr * np.sin(angle) * ry + arc.center.imag
+    return points
+
+
+def path2shapely(path, res=1.0, tolerance=None):
     """
     Converts an svg.path.Path into a Shapely
     LinearRing or LinearString.
@@ -62,9 +92,14 @@ def path2shapely(path, res=1.0):
     :rtype : LineString
     :param path: svg.path.Path instance
     :param res: Resolution (minimum step along path)
+    :param tolerance: Max. distance between arcs and the segments
+        that represent them. Defaults to res / 10.
     :return: Shapely geometry object
     """
 
+    if tolerance is None:
+        tolerance = res / 10.0
+
     points = []
 
     for component in path:
@@ -79,9 +114,15 @@ def path2shapely(path, res=1.0):
             points.append((end.real, end.imag))
             continue
 
-        # Arc, CubicBezier or QuadraticBezier
-        if isinstance(component, Arc) or \
-           isinstance(component, CubicBezier) or \
+        # Arc
+        if isinstance(component, Arc):
+            for x, y in svgarc2points(component, tolerance).tolist():
+                if len(points) == 0 or points[-1] != (x, y):
+                    points.append((x, y))
+            continue
+
+        # CubicBezier or QuadraticBezier
+        if isinstance(component, CubicBezier) or \
            isinstance(component, QuadraticBezier):
 
             # How many points to use in the dicrete representation.
@@ -0,0 +1,62 @@
+from ObjectCollection import *
+import TclCommand
+
+
+class TclCommandGetNets(TclCommand.TclCommand):
+    """
+    Tcl shell command to list the connected pieces
+    of copper (nets) of a Gerber object.
+
+    example:
+        get_nets top_copper
+    """
+
+    # List of all command aliases, to be able use old names for backward compatibility (add_poly, add_polygon)
+    aliases = ['get_nets']
+
+    # Dictionary of types from Tcl command, needs to be ordered
+    arg_names = collections.OrderedDict([
+        ('name', str)
+    ])
+
+    # Dictionary of types from Tcl command, needs to be ordered , this  is  for options  like -optionname value
+    option_types = collections.OrderedDict([
+
+    ])
+
+    # array of mandatory options for current Tcl command: required = {'name','outname'}
+    required = ['name']
+
+    # structured help for current command, args needs to be ordered
+    help = {
+        'main': 'Shows the bounds and area of each connected piece of copper (net) of a Gerber object.',
+        'args': collections.OrderedDict([
+            ('name', 'Name of the Gerber object.')
+        ]),
+        'examples': ['get_nets top_copper']
+    }
+
+    def execute(self, args, unnamed_args):
+        """
+
+        :param args:
+        :param unnamed_args:
+        :return:
+        """
+
+        name = args['name']
+
+        obj = self.app.collection.get_by_name(str(name))
+        if obj is None:
+            self.raise_tcl_error("Object not found: %s" % name)
+
+        if not isinstance(obj, FlatCAMGerber):
+            self.raise_tcl_error("Expected FlatCAMGerber, got %s %s." % (name, type(obj)))
+
+        lines = ["Net      Xmin      Ymin      Xmax      Ymax        Area  Holes"]
+        for i, net in enumerate(obj.get_net_stats()):
+            lines.append("%3d %9.4f %9.4f %9.4f %9.4f %11.6f %6d" %
+                         ((i,) + tuple(net['bounds']) + (net['area'], net['holes'])))
+        lines.append("Nets: %d" % len(lines[1:]))
+
+        return '\n'.join(lines)
@@ -0,0 +1,77 @@
+from ObjectCollection import *
+import TclCommand
+
+
+class TclCommandGetStats(TclCommand.TclCommand):
+    """
+    Tcl shell command to show what was found when parsing
+    a Gerber or Excellon object.
+
+    example:
+        get_stats top_copper
+    """
+
+    # List of all command aliases, to be able use old names for backward compatibility (add_poly, add_polygon)
+    aliases = ['get_stats']
+
+    # Dictionary of types from Tcl command, needs to be ordered
+    arg_names = collections.OrderedDict([
+        ('name', str)
+    ])
+
+    # Dictionary of types from Tcl command, needs to be ordered , this  is  for options  like -optionname value
+    option_types = collections.OrderedDict([
+
+    ])
+
+    # array of mandatory options for current Tcl command: required = {'name','outname'}
+    required = ['name']
+
+    # structured help for current command, args needs to be ordered
+    help = {
+        'main': 'Shows the bounds and the use of each aperture or tool of a Gerber or Excellon object.',
+        'args': collections.OrderedDict([
+            ('name', 'Name of the Gerber or Excellon object.')
+        ]),
+        'examples': ['get_stats top_copper']
+    }
+
+    def execute(self, args, unnamed_args):
+        """
+
+        :param args:
+        :param unnamed_args:
+        :return:
+        """
+
+        name = args['name']
+
+        obj = self.app.collection.get_by_name(str(name))
+        if obj is None:
+            self.raise_tcl_error("Object not found: %s" % name)
+
+        if not isinstance(obj, FlatCAMGerber) and not isinstance(obj, FlatCAMExcellon):
+            self.raise_tcl_error("Only Gerber and Excellon objects have statistics: %s" % name)
+
+        stats = obj.parse_stats
+        if not stats:
+            self.raise_tcl_error("No statistics for %s. Open the file again." % name)
+
+        lines = ["Bounds: %.4f %.4f %.4f %.4f" % tuple(obj.bounds())]
+
+        if isinstance(obj, FlatCAMGerber):
+            lines.append("Aperture  Strokes  Vertices  Flashes")
+            for apid in sorted(stats['apertures'], key=lambda apid: int(apid) if apid.isdigit() else apid):
+                aperture = stats['apertures'][apid]
+                lines.append("%8s %8d %9d %8d" % (apid, aperture['strokes'], aperture['vertices'],
+                                                   aperture['flashes']))
+            lines.append("Regions: %d (%d vertices)" % (stats['regions'], stats['region_vertices']))
+            lines.append("Arcs: %d" % stats['arcs'])
+            lines.append("Polarity layers: %d" % stats['layers'])
+        else:
+            lines.append("Tool  Diameter  Drills")
+            for name in sorted(stats['tools']):
+                tool = stats['tools'][name]
+                lines.append("%4s %9.4f %7d" % (name, tool['C'], tool['drills']))
+
+        return '\n'.join(lines)
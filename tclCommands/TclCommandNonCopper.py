@@ -0,0 +1,78 @@
+from ObjectCollection import *
+import TclCommand
+
+
+class TclCommandNonCopper(TclCommand.TclCommandSignaled):
+    """
+    Tcl shell command to create geometry of the area without copper
+    within the bounding box of a Gerber.
+
+    example:
+        open_gerber tests/gerber_files/simple1.gbr -outname simple1
+        noncopper simple1 -margin 0.1 -rounded 1
+    """
+
+    # array of all command aliases, to be able use  old names for backward compatibility (add_poly, add_polygon)
+    aliases = ['noncopper']
+
+    # dictionary of types from Tcl command, needs to be ordered
+    arg_names = collections.OrderedDict([
+        ('name', str)
+    ])
+
+    # dictionary of types from Tcl command, needs to be ordered , this  is  for options  like -optionname value
+    option_types = collections.OrderedDict([
+        ('margin', float),
+        ('rounded', int),
+        ('outname', str)
+    ])
+
+    # array of mandatory options for current Tcl command: required = {'name','outname'}
+    required = ['name']
+
+    # structured help for current command, args needs to be ordered
+    help = {
+        'main': "Creates geometry of the area without copper within the bounding box of a Gerber.",
+        'args': collections.OrderedDict([
+            ('name', 'Name of the source Gerber object.'),
+            ('margin', 'Distance of the edges of the box to the nearest polygon.'),
+            ('rounded', 'Whether the corners of the box are rounded, 1 or 0.'),
+            ('outname', 'Name of the resulting Geometry object.')
+        ]),
+        'examples': ['noncopper simple1 -margin 0.1 -rounded 1']
+    }
+
+    def execute(self, args, unnamed_args):
+        """
+        execute current TCL shell command
+
+        :param args: array of known named arguments and options
+        :param unnamed_args: array of other values which were passed into command
+            without -somename and  we do not have them in known arg_names
+        :return: None or exception
+        """
+
+        name = args['name']
+
+        if 'outname' in args:
+            outname = args['outname']
+        else:
+            outname = name + "_noncopper"
+
+        obj = self.app.collection.get_by_name(name)
+        if obj is None:
+            self.raise_tcl_error("Object not found: %s" % name)
+
+        if not isinstance(obj, FlatCAMGerber):
+            self.raise_tcl_error('Expected FlatCAMGerber, got %s %s.' % (name, type(obj)))
+
+        rounded = None
+        if 'rounded' in args:
+            rounded = bool(args['rounded'])
+
+        non_copper = obj.noncopper(margin=args.get('margin'), rounded=rounded)
+
+        def geo_init(geo_obj, app_obj):
+            geo_obj.solid_geometry = non_copper
+
+        self.app.new_object('geometry', outname, geo_init)
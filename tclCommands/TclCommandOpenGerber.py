@@ -54,7 +54,9 @@ class TclCommandOpenGerber(TclCommand.TclCommandSignaled):
             # Opening the file happens here
             self.app.progress.emit(30)
             try:
-                gerber_obj.parse_file(filename, follow=follow)
+                if not self.app.parse_cache.load(gerber_obj, filename, follow=follow):
+                    gerber_obj.parse_file(filename, follow=follow)
+                    self.app.parse_cache.store(gerber_obj, filename, follow=follow)
 
             except IOError:
                 app_obj.inform.emit("[error] Failed to open file: %s " % filename)
@@ -111,7 +111,6 @@ class TclCommandPanelize(TclCommand.TclCommand):
             # drills are offset, so they need to be deep copied
             obj_init.drills = deepcopy(obj.drills) 
             obj_init.offset([float(currentx), float(currenty)])
-            obj_init.create_geometry()
             objs.append(obj_init)
 
         def initialize_geometry(obj_init, app):
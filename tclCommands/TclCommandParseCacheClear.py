@@ -0,0 +1,47 @@
+from ObjectCollection import *
+import TclCommand
+
+
+class TclCommandParseCacheClear(TclCommand.TclCommand):
+    """
+    Tcl shell command to remove all entries in the parse cache.
+
+    example:
+        parse_cache_clear
+    """
+
+    # List of all command aliases, to be able use old names for backward compatibility (add_poly, add_polygon)
+    aliases = ['parse_cache_clear']
+
+    # Dictionary of types from Tcl command, needs to be ordered
+    arg_names = collections.OrderedDict([
+
+    ])
+
+    # Dictionary of types from Tcl command, needs to be ordered , this  is  for options  like -optionname value
+    option_types = collections.OrderedDict([
+
+    ])
+
+    # array of mandatory options for current Tcl command: required = {'name','outname'}
+    required = []
+
+    # structured help for current command, args needs to be ordered
+    help = {
+        'main': 'Removes all entries in the cache of parsed Gerber and Excellon files.',
+        'args': collections.OrderedDict([
+
+        ]),
+        'examples': ['parse_cache_clear']
+    }
+
+    def execute(self, args, unnamed_args):
+        """
+
+        :param args:
+        :param unnamed_args:
+        :return:
+        """
+
+        removed = self.app.parse_cache.clear()
+        return "Removed %d entries." % removed
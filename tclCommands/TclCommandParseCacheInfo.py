@@ -0,0 +1,61 @@
+import time
+from ObjectCollection import *
+import TclCommand
+
+
+class TclCommandParseCacheInfo(TclCommand.TclCommand):
+    """
+    Tcl shell command to show the contents of the parse cache.
+
+    example:
+        parse_cache_info -entries 1
+    """
+
+    # List of all command aliases, to be able use old names for backward compatibility (add_poly, add_polygon)
+    aliases = ['parse_cache_info']
+
+    # Dictionary of types from Tcl command, needs to be ordered
+    arg_names = collections.OrderedDict([
+
+    ])
+
+    # Dictionary of types from Tcl command, needs to be ordered , this  is  for options  like -optionname value
+    option_types = collections.OrderedDict([
+        ('entries', int)
+    ])
+
+    # array of mandatory options for current Tcl command: required = {'name','outname'}
+    required = []
+
+    # structured help for current command, args needs to be ordered
+    help = {
+        'main': 'Shows the size and use of the cache of parsed Gerber and Excellon files.',
+        'args': collections.OrderedDict([
+            ('entries', 'If 1, lists every entry, least recently used first.')
+        ]),
+        'examples': ['parse_cache_info', 'parse_cache_info -entries 1']
+    }
+
+    def execute(self, args, unnamed_args):
+        """
+
+        :param args:
+        :param unnamed_args:
+        :return:
+        """
+
+        cache = self.app.parse_cache
+        entries = cache.entries()
+
+        lines = ["Path: %s" % cache.path,
+                 "Entries: %d" % len(entries),
+                 "Size: %.1f MB of %.1f MB" % (sum(entry[1] for entry in entries) / 1048576.0,
+                                               cache.max_size / 1048576.0),
+                 "Hits: %d, Misses: %d" % (cache.hits, cache.misses)]
+
+        if args.get('entries'):
+            for key, size, mtime in entries:
+                lines.append("%s %10d %s" % (key, size,
+                                             time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(mtime))))
+
+        return '\n'.join(lines)
@@ -35,9 +35,10 @@ class TclCommandSubtractRectangle(TclCommand.TclCommandSignaled):
         'args': collections.OrderedDict([
             ('name', 'Name of the Geometry object from which to subtract.'),
             ('x0 y0', 'Bottom left corner coordinates.'),
-            ('x1 y1', 'Top right corner coordinates.')
+            ('x1 y1', 'Top right corner coordinates.'),
+            ('x0 y0 x1 y1 ...', 'Corners of more rectangles to subtract at once.')
         ]),
-        'examples': []
+        'examples': ['subtract_rectangle geo 0 0 1 1 2 2 3 3']
     }
 
     def execute(self, args, unnamed_args):
@@ -56,6 +57,13 @@ class TclCommandSubtractRectangle(TclCommand.TclCommandSignaled):
         x1 = args['x1']
         y1 = args['y1']
 
+        if len(unnamed_args) % 4 != 0:
+            return "Incomplete rectangle."
+
+        rectangles = [(x0, y0, x1, y1)]
+        rectangles += [[float(value) for value in unnamed_args[4 * i:4 * i + 4]]
+                       for i in range(len(unnamed_args) / 4)]
+
         try:
             obj = self.app.collection.get_by_name(str(obj_name))
         except:
@@ -63,4 +71,5 @@ class TclCommandSubtractRectangle(TclCommand.TclCommandSignaled):
         if obj is None:
             return "Object not found: %s" % obj_name
 
-        obj.subtract_polygon([(x0, y0), (x1, y0), (x1, y1), (x0, y1)])
+        obj.subtract_polygons([Polygon([(x0, y0), (x1, y0), (x1, y1), (x0, y1)])
+                               for x0, y0, x1, y1 in rectangles])
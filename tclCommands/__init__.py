@@ -19,6 +19,8 @@ import tclCommands.TclCommandExteriors
 import tclCommands.TclCommandGeoCutout
 import tclCommands.TclCommandGeoUnion
 import tclCommands.TclCommandGetNames
+import tclCommands.TclCommandGetNets
+import tclCommands.TclCommandGetStats
 import tclCommands.TclCommandGetSys
 import tclCommands.TclCommandImportSvg
 import tclCommands.TclCommandInteriors
@@ -29,6 +31,7 @@ import tclCommands.TclCommandMillHoles
 import tclCommands.TclCommandMirror
 import tclCommands.TclCommandNew
 import tclCommands.TclCommandNewGeometry
+import tclCommands.TclCommandNonCopper
 import tclCommands.TclCommandOffset
 import tclCommands.TclCommandOpenExcellon
 import tclCommands.TclCommandOpenGCode
@@ -37,6 +40,8 @@ import tclCommands.TclCommandOpenProject
 import tclCommands.TclCommandOptions
 import tclCommands.TclCommandPaint
 import tclCommands.TclCommandPanelize
+import tclCommands.TclCommandParseCacheClear
+import tclCommands.TclCommandParseCacheInfo
 import tclCommands.TclCommandPlot
 import tclCommands.TclCommandSaveProject
 import tclCommands.TclCommandScale
@@ -0,0 +1,51 @@
+# This script compares Gerber.parse_lines() throughput with and
+# without statement dispatch (Gerber.use_statement_dispatch).
+# Run python gerber_parsing_dispatch_benchmark.py [file.gbr]
+
+import sys
+import time
+sys.path.append('../../')
+
+from camlib import *
+
+log = logging.getLogger('base2')
+log.setLevel(logging.ERROR)
+
+filename = "gerber1.gbr"
+if len(sys.argv) > 1:
+    filename = sys.argv[1]
+
+# Split into statements the same way Gerber.parse_file() does
+# so only the parser itself is timed.
+statements = []
+with open(filename, 'r') as gfile:
+    for line in gfile:
+        line = line.strip(' \r\n')
+        while len(line) > 0:
+            if line[-1] == '%':
+                statements.append(line)
+                break
+            starpos = line.find('*')
+            if starpos > -1:
+                statements.append(line[:starpos + 1])
+                line = line[starpos + 1:]
+            else:
+                statements.append(line)
+                break
+
+repeat = 5
+
+for follow in [True, False]:
+    for dispatch in [False, True]:
+        best = None
+        for i in range(repeat):
+            g = Gerber()
+            g.use_statement_dispatch = dispatch
+            t0 = time.time()
+            g.parse_lines(statements, follow=follow)
+            dt = time.time() - t0
+            if best is None or dt < best:
+                best = dt
+
+        print "follow=%-5s dispatch=%-5s %7d statements %8.4fs %10.0f statements/s" % \
+              (follow, dispatch, len(statements), best, len(statements) / best)
@@ -0,0 +1,32 @@
+import unittest
+import camlib
+
+
+class ApertureMacroTest(unittest.TestCase):
+
+    def test_variables(self):
+        macro = camlib.ApertureMacro(name="VAR")
+        macro.append("$3=$1X0.5*1,1,$3,0,0*1,0,$2,0,0*")
+
+        geo = macro.make_geometry(['2.0', '0.5'])
+        self.assertEqual(macro.primitives, [[1, 1, 1.0, 0, 0], [1, 0, 0.5, 0, 0]])
+        self.assertAlmostEqual(geo.area, geo.envelope.area * 0.75 * 3.14159 / 4, places=2)
+
+    def test_memoized(self):
+        macro = camlib.ApertureMacro(name="OC8")
+        macro.append("5,1,8,0,0,1.08239X$1,22.5*")
+
+        geo1 = macro.make_geometry(['0.5'])
+        geo2 = macro.make_geometry(['0.5'])
+        geo3 = macro.make_geometry(['0.6'])
+        self.assertIs(geo1, geo2)
+        self.assertIsNot(geo1, geo3)
+        self.assertGreater(geo3.area, geo1.area)
+
+        # Changing the macro invalidates the cache.
+        macro.append("*1,0,0.1,0,0*")
+        geo4 = macro.make_geometry(['0.5'])
+        self.assertLess(geo4.area, geo1.area)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from numpy import pi, sqrt
+import camlib
+
+
+class ArcTest(unittest.TestCase):
+
+    def chord_error(self, points, center, radius):
+        # Max. distance from the arc to the midpoints of the segments.
+        mid = (points[1:] + points[:-1]) / 2.0
+        return (radius - sqrt(((mid - center) ** 2).sum(axis=1))).max()
+
+    def test_tolerance(self):
+        for radius in [0.01, 0.1, 1.0, 10.0]:
+            points = camlib.arc_points((1.0, 2.0), radius, 0, pi, "ccw", tolerance=0.0002)
+            self.assertLessEqual(self.chord_error(points, (1.0, 2.0), radius), 0.0002 + 1e-12)
+            self.assertAlmostEqual(points[0][0], 1.0 + radius)
+            self.assertAlmostEqual(points[-1][0], 1.0 - radius)
+
+        # Fewer points for small arcs
+        small = camlib.arc_points((0, 0), 0.01, 0, pi, "ccw", tolerance=0.0002)
+        large = camlib.arc_points((0, 0), 10.0, 0, pi, "ccw", tolerance=0.0002)
+        self.assertLess(len(small), len(large))
+
+    def test_steps_per_circ(self):
+        points = camlib.arc((0, 0), 1.0, 0, pi / 2, "cw", 40)
+        self.assertEqual(len(points), 31)
+        self.assertAlmostEqual(points[-1][1], 1.0)
+
+        points = camlib.arc((0, 0), 1.0, 0, pi / 2, "ccw", 40)
+        self.assertEqual(len(points), 11)
+
+    def test_full_circle(self):
+        points = camlib.arc_points((0, 0), 1e-4, 0, 0, "cw", tolerance=0.0002)
+        self.assertGreaterEqual(len(points), 9)
+
+    def test_single_quadrant(self):
+        gerber = camlib.Gerber()
+        gerber.parse_lines(["%FSLAX24Y24*%", "%MOIN*%", "%ADD10C,0.01*%", "D10*",
+                            "G74*", "X10000Y0D02*", "G03X0Y10000I10000J0D01*",
+                            "M02*"])
+
+        line = gerber.get_follow_geometry()[0]
+        self.assertAlmostEqual(line.length, pi / 2, places=3)
+        for x, y in line.coords:
+            self.assertAlmostEqual(x ** 2 + y ** 2, 1.0, places=3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+import camlib
+
+
+class DrillOrderTest(unittest.TestCase):
+
+    def test_order_points(self):
+        xy = np.random.RandomState(0).rand(300, 2)
+        nearest = camlib.order_points(xy, time_budget=0)
+        ordered = camlib.order_points(xy, time_budget=5.0)
+
+        self.assertEqual(sorted(ordered.tolist()), range(300))
+
+        def length(order):
+            return camlib.path_length(np.vstack(([0, 0], xy[order])))
+
+        self.assertLess(length(nearest), length(np.arange(300)))
+        self.assertLess(length(ordered), length(nearest))
+
+    def test_grid(self):
+        # A serpentine, of length 99, is optimal on a grid.
+        x, y = np.meshgrid(np.arange(10.0), np.arange(10.0))
+        xy = np.column_stack((x.ravel(), y.ravel()))
+        np.random.RandomState(0).shuffle(xy)
+        order = camlib.order_points(xy, time_budget=5.0)
+        self.assertLess(camlib.path_length(np.vstack(([0, 0], xy[order]))), 99.0 * 1.01)
+
+    def test_max_moves(self):
+        xy = np.random.RandomState(0).rand(300, 2)
+        nearest = camlib.order_points(xy, time_budget=0)
+        few = camlib.order_points(xy, max_moves=10)
+        self.assertEqual(few.tolist(), camlib.order_points(xy, max_moves=10).tolist())
+        self.assertNotEqual(few.tolist(), nearest.tolist())
+        self.assertNotEqual(few.tolist(), camlib.order_points(xy).tolist())
+
+    def test_excellon(self):
+        excellon = camlib.Excellon()
+        excellon.parse_file('tests/excellon_files/case1.drl')
+
+        cnc = camlib.CNCjob()
+        cnc.generate_from_excellon_by_tool(excellon, order=False)
+        file_order = cnc.gcode
+
+        cnc.generate_from_excellon_by_tool(excellon, order=True, order_tools=True)
+        ordered = cnc.gcode
+
+        # The same holes, with less travel
+        self.assertEqual(sorted(file_order.splitlines()[1:]), sorted(ordered.splitlines()[1:]))
+        comment = ordered.splitlines()[0].split()
+        before, after = float(comment[2]), float(comment[7])
+        self.assertLess(after, before)
+
+if __name__ == '__main__':
+    unittest.main()
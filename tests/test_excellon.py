@@ -165,6 +165,32 @@ class ExcellonFormatM71Test(unittest.TestCase):
         self.assertEqual(self.excellon.drills[1]["point"].coords[0], (302.5, 105.0))
 
 
+class ExcellonUnitsChangeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.excellon = camlib.Excellon()
+        code = """
+        M48
+        M71
+        T1C.6
+        M95
+        T1
+        X9000Y11750
+        M72
+        X30250Y10500
+        """
+        code = code.split('\n')
+        self.excellon.parse_lines(code)
+
+    def test_coords(self):
+        # Hits before the change of units are converted.
+        self.assertEqual(self.excellon.units.lower(), "in")
+        x, y = self.excellon.drills[0]["point"].coords[0]
+        self.assertAlmostEqual(x, 900.0 / 25.4)
+        self.assertAlmostEqual(y, 117.5 / 25.4)
+        self.assertEqual(self.excellon.drills[1]["point"].coords[0], (30.25, 10.5))
+
+
 class ExcellonFormatINCHLZTest(unittest.TestCase):
 
     def setUp(self):
@@ -326,5 +352,55 @@ class ExcellonFormatMETRICTZTest(unittest.TestCase):
         self.assertEqual(self.excellon.drills[0]["point"].coords[0], (9.0, 11.75))
         self.assertEqual(self.excellon.drills[1]["point"].coords[0], (30.25, 10.5))
 
+
+class ExcellonDrillsTest(unittest.TestCase):
+
+    def test_list(self):
+        excellon = camlib.Excellon()
+        excellon.tools = {"1": {"C": 0.1}, "2": {"C": 0.2}}
+        excellon.drills = [{"point": camlib.Point(1, 2), "tool": "2"},
+                           {"point": camlib.Point(3, 4), "tool": "1"}]
+        excellon.drills.append({"point": camlib.Point(5, 6), "tool": "2"})
+
+        self.assertEqual(len(excellon.drills), 3)
+        self.assertEqual(excellon.drills.counts(), {"1": 1, "2": 2})
+        self.assertEqual([drill["tool"] for drill in excellon.drills], ["2", "1", "2"])
+        self.assertEqual(excellon.drills[-1]["point"].coords[0], (5.0, 6.0))
+
+        excellon.create_geometry()
+        self.assertEqual(excellon.bounds(), (0.9, 1.9, 5.1, 6.1))
+
+    def test_transform(self):
+        excellon = camlib.Excellon()
+        excellon.tools = {"1": {"C": 0.1}}
+        excellon.drills = [{"point": camlib.Point(1, 2), "tool": "1"}]
+
+        excellon.mirror("X", (0, 1))
+        excellon.offset((1, 1))
+        excellon.scale(2)
+        self.assertEqual(excellon.drills[0]["point"].coords[0], (4.0, 2.0))
+
+    def test_concatenate(self):
+        first = camlib.ExcellonDrills([[0, 0], [1, 1]], [0, 1], ["1", "2"])
+        second = camlib.ExcellonDrills([[2, 2]], [0], ["2"])
+        joined = camlib.ExcellonDrills.concatenate([first, second])
+
+        self.assertEqual(joined.tool_names, ["1", "2"])
+        self.assertEqual(joined.tool_index.tolist(), [0, 1, 1])
+        self.assertEqual(joined.tool_mask(["2"]).tolist(), [False, True, True])
+
+    def test_circles(self):
+        xy = camlib.np.array([[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]])
+        radii = camlib.np.array([0.1, 0.2, 0.1])
+        circles = camlib.make_circles(xy, radii)
+
+        for (x, y), radius, circle in zip(xy, radii, circles):
+            expected = camlib.Point(x, y).buffer(radius)
+            self.assertAlmostEqual(circle.symmetric_difference(expected).area, 0)
+
+        rings = camlib.make_circles(xy, radii, exterior=True)
+        self.assertTrue(rings[1].equals(circles[1].exterior))
+        self.assertTrue(camlib.make_circles(xy[:1], [0.0])[0].is_empty)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
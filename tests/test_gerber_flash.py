@@ -0,0 +1,31 @@
+import unittest
+import camlib
+
+
+class GerberFlash(unittest.TestCase):
+
+    def test_flash_translated(self):
+        gerber = camlib.Gerber()
+        gerber.parse_lines(["%FSLAX24Y24*%", "%MOIN*%",
+                            "%ADD10R,0.1X0.2*%", "D10*",
+                            "X10000Y20000D03*", "X30000Y20000D03*",
+                            "M02*"])
+
+        bounds = gerber.solid_geometry.bounds
+        self.assertEqual(len(gerber.flash_templates), 1)
+        for actual, expected in zip(bounds, (0.95, 1.9, 3.05, 2.1)):
+            self.assertAlmostEqual(actual, expected)
+
+    def test_aperture_redefined(self):
+        gerber = camlib.Gerber()
+        gerber.parse_lines(["%FSLAX24Y24*%", "%MOIN*%",
+                            "%ADD10R,0.1X0.1*%", "D10*",
+                            "X10000Y10000D03*",
+                            "%ADD10R,0.2X0.2*%", "D10*",
+                            "X30000Y10000D03*",
+                            "M02*"])
+
+        self.assertAlmostEqual(gerber.solid_geometry.area, 0.01 + 0.04)
+
+if __name__ == '__main__':
+    unittest.main()
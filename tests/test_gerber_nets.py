@@ -0,0 +1,58 @@
+import unittest
+from shapely.geometry import Point, box
+import camlib
+
+
+class GerberNetsTest(unittest.TestCase):
+
+    def setUp(self):
+        # Two pads joined by a trace and a lone pad.
+        self.gerber = camlib.Gerber()
+        self.gerber.parse_lines(["%FSLAX24Y24*%", "%MOIN*%",
+                                 "%ADD10C,0.1*%", "%ADD11C,0.02*%",
+                                 "D10*", "X0Y0D03*", "X10000Y0D03*", "X30000Y0D03*",
+                                 "D11*", "X0Y0D02*", "X10000Y0D01*",
+                                 "M02*"])
+
+    def test_nets(self):
+        nets = self.gerber.get_nets()
+        self.assertEqual(len(nets), 2)
+        self.assertAlmostEqual(sum(net.area for net in nets), self.gerber.solid_geometry.area)
+
+        stats = self.gerber.get_net_stats()
+        self.assertEqual([net['holes'] for net in stats], [0, 0])
+        for net, net_stats in zip(nets, stats):
+            self.assertEqual(net.bounds, net_stats['bounds'])
+
+    def test_find(self):
+        lone = self.gerber.find_nets(Point(3.0, 0))
+        self.assertEqual(len(lone), 1)
+        self.assertAlmostEqual(self.gerber.get_nets()[lone[0]].bounds[0], 2.95)
+
+        self.assertEqual(self.gerber.find_nets(Point(0.5, 0)), self.gerber.find_nets(Point(1.0, 0)))
+        self.assertEqual(self.gerber.find_nets(box(-1, -1, 4, 1)), [0, 1])
+        self.assertEqual(self.gerber.find_nets(Point(2.0, 0)), [])
+
+    def test_changed(self):
+        nets = self.gerber.get_nets()
+        self.gerber.offset((1.0, 0))
+        self.assertIsNot(self.gerber.get_nets(), nets)
+        self.assertEqual(len(self.gerber.find_nets(Point(4.0, 0))), 1)
+
+    def test_parse_again(self):
+        self.assertEqual(len(self.gerber.get_nets()), 2)
+        self.gerber.parse_lines(["%FSLAX24Y24*%", "%MOIN*%",
+                                 "%ADD10C,0.1*%",
+                                 "D10*", "X0Y0D03*", "X10000Y0D03*", "X20000Y0D03*",
+                                 "M02*"])
+        self.assertEqual(len(self.gerber.get_nets()), 3)
+        self.assertEqual(len(self.gerber.find_nets(Point(2.0, 0))), 1)
+
+    def test_isolation(self):
+        offsets = [0.05, 0.1]
+        for geo, expected in zip(self.gerber.isolation_passes(offsets),
+                                 [self.gerber.isolation_geometry(offset) for offset in offsets]):
+            self.assertAlmostEqual(geo.area, expected.area, places=3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+import camlib
+
+
+class GerberPolarity(unittest.TestCase):
+
+    def test_clear_then_dark(self):
+        gerber = camlib.Gerber()
+        gerber.parse_lines(["%FSLAX24Y24*%", "%MOIN*%",
+                            "%ADD10R,1.0X1.0*%", "%ADD11R,0.5X0.5*%",
+                            # 10x10 plane
+                            "G36*", "X0Y0D02*", "X100000Y0D01*", "X100000Y100000D01*",
+                            "X0Y100000D01*", "X0Y0D01*", "G37*",
+                            # Two 1x1 holes
+                            "%LPC*%", "D10*", "X20000Y20000D03*", "X80000Y80000D03*",
+                            # Pad inside the second hole
+                            "%LPD*%", "D11*", "X80000Y80000D03*",
+                            # Pad outside the plane
+                            "X150000Y50000D03*",
+                            "M02*"])
+
+        self.assertAlmostEqual(gerber.solid_geometry.area, 100 - 2 + 0.25 + 0.25)
+        self.assertEqual(len(gerber.solid_geometry.geoms), 3)
+
+    def test_layers(self):
+        dark = camlib.Polygon([(0, 0), (4, 0), (4, 4), (0, 4)])
+        far = camlib.Polygon([(10, 0), (11, 0), (11, 1), (10, 1)])
+        clear = camlib.Polygon([(1, 1), (3, 1), (3, 3), (1, 3)])
+
+        result = camlib.resolve_polarity_layers([('D', camlib.MultiPolygon([dark, far])),
+                                                 ('C', clear),
+                                                 ('D', clear.buffer(-0.5))])
+        self.assertAlmostEqual(result.area, 16 - 4 + 1 + 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import camlib
+
+
+class GerberPrimitivesTest(unittest.TestCase):
+
+    lines = ["%FSLAX24Y24*%", "%MOIN*%",
+             "%ADD10C,0.1*%", "%ADD11R,0.2X0.2*%",
+             "D10*", "G75*",
+             # A half circle of radius 1 and a straight line
+             "X10000Y0D02*", "G03X-10000Y0I-10000J0D01*",
+             "G01X-10000Y-10000D01*",
+             "D11*", "X30000Y0D03*",
+             "M02*"]
+
+    def test_primitives(self):
+        gerber = camlib.Gerber()
+        gerber.parse_lines(self.lines)
+
+        drawing = gerber.primitives
+        self.assertEqual(drawing.contours.shape, (1, 6))
+        self.assertEqual(drawing.arcs.shape, (1, 7))
+        self.assertEqual(drawing.vertices.shape, (3, 2))
+        self.assertEqual(drawing.flashes.tolist(), [[3.0, 0.0]])
+        self.assertTrue(gerber.geometry_stale)
+
+    def test_rebuild(self):
+        gerber = camlib.Gerber()
+        gerber.parse_lines(self.lines)
+        coarse = len(gerber.get_follow_geometry()[0].coords)
+        area = gerber.solid_geometry.area
+
+        gerber.arc_tolerance = 0.00001
+        gerber.invalidate_geometry()
+
+        self.assertGreater(len(gerber.get_follow_geometry()[0].coords), coarse)
+        self.assertNotEqual(gerber.solid_geometry.area, area)
+        self.assertAlmostEqual(gerber.solid_geometry.area, area, places=2)
+
+        gerber.follow_paths = True
+        gerber.invalidate_geometry()
+        self.assertEqual(len(gerber.solid_geometry), 1)
+
+    def test_transform_kept(self):
+        gerber = camlib.Gerber()
+        gerber.parse_lines(self.lines)
+        gerber.offset((1.0, 2.0))
+        gerber.scale(2.0)
+        bounds = gerber.solid_geometry.bounds
+
+        gerber.invalidate_geometry()
+        for actual, expected in zip(gerber.solid_geometry.bounds, bounds):
+            self.assertAlmostEqual(actual, expected)
+
+        gerber.mirror("X", (0, 0))
+        self.assertAlmostEqual(gerber.solid_geometry.bounds[1], -bounds[3])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import camlib
+
+
+class GerberStatsTest(unittest.TestCase):
+
+    gerber_files = ['tests/gerber_files/detector_copper_top.gbr',
+                    'tests/gerber_files/detector_contour.gbr',
+                    'tests/gerber_files/simple1.gbr']
+
+    def test_bounds(self):
+        for filename in self.gerber_files:
+            gerber = camlib.Gerber()
+            gerber.parse_file(filename)
+
+            # Known without building the geometry
+            bounds = gerber.bounds()
+            self.assertTrue(gerber.geometry_stale)
+
+            for actual, expected in zip(bounds, gerber.solid_geometry.bounds):
+                self.assertAlmostEqual(actual, expected, places=4)
+
+    def test_transformed_bounds(self):
+        gerber = camlib.Gerber()
+        gerber.parse_file(self.gerber_files[0])
+        gerber.scale(2.0)
+        gerber.mirror("Y", (0, 0))
+        gerber.offset((1.0, 1.0))
+
+        bounds = gerber.bounds()
+        self.assertTrue(gerber.geometry_stale)
+        for actual, expected in zip(bounds, gerber.solid_geometry.bounds):
+            self.assertAlmostEqual(actual, expected, places=4)
+
+        # Unknown once the geometry is replaced
+        gerber.solid_geometry = gerber.solid_geometry.buffer(1.0)
+        for actual, expected in zip(gerber.bounds(), bounds):
+            self.assertAlmostEqual(actual, expected + (1.0 if actual > expected else -1.0), places=2)
+
+    def test_stats(self):
+        gerber = camlib.Gerber()
+        gerber.parse_lines(["%FSLAX24Y24*%", "%MOIN*%",
+                            "%ADD10C,0.1*%", "%ADD11R,0.2X0.2*%",
+                            "D10*", "X0Y0D02*", "X10000Y0D01*", "X10000Y10000D01*",
+                            "D11*", "X30000Y0D03*", "X40000Y0D03*",
+                            "%LPC*%", "D10*", "X0Y0D02*", "G75*", "G03X0Y0I10000J0D01*",
+                            "M02*"])
+
+        stats = gerber.parse_stats
+        self.assertEqual(stats['apertures']['10'], {'strokes': 2, 'flashes': 0, 'vertices': 5})
+        self.assertEqual(stats['apertures']['11'], {'strokes': 0, 'flashes': 2, 'vertices': 0})
+        self.assertEqual(stats['arcs'], 1)
+        self.assertEqual(stats['layers'], 2)
+
+        # The cleared circle is not part of the bounds
+        for actual, expected in zip(stats['bounds'], (-0.05, -0.1, 4.1, 1.05)):
+            self.assertAlmostEqual(actual, expected)
+
+    def test_excellon(self):
+        excellon = camlib.Excellon()
+        excellon.parse_file('tests/excellon_files/case1.drl')
+        self.assertEqual(sum(tool['drills'] for tool in excellon.parse_stats['tools'].values()),
+                         len(excellon.drills))
+
+        excellon.create_geometry()
+        excellon.offset((1.0, 0.0))
+        for actual, expected in zip(excellon.bounds(), camlib.Geometry.bounds(excellon)):
+            self.assertAlmostEqual(actual, expected, places=4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from shapely.geometry import Point, LineString, MultiPolygon
+import camlib
+
+
+class IsolationPassesTest(unittest.TestCase):
+
+    def setUp(self):
+        # Pads in a row, some on a trace, and a ring with a pad inside.
+        polygons = [Point(i * 0.5, 0).buffer(0.1) for i in range(8)]
+        polygons.append(LineString([(0, 0), (1.5, 0)]).buffer(0.02))
+        polygons.append(Point(1, 2).buffer(0.6).difference(Point(1, 2).buffer(0.5)))
+        polygons.append(Point(1, 2).buffer(0.1))
+        self.geometry = camlib.union_polygons(polygons)
+        self.offsets = [0.05, 0.13, 0.21, 0.29]
+
+    def check(self, processes):
+        result = camlib.buffer_passes(self.geometry, self.offsets, processes=processes)
+
+        self.assertEqual(len(result), len(self.offsets))
+        for offset, geo in zip(self.offsets, result):
+            expected = self.geometry.buffer(offset)
+            self.assertTrue(geo.is_valid)
+            self.assertEqual(len(camlib.autolist_polygons(geo)),
+                             len(camlib.autolist_polygons(expected)))
+            self.assertLess(geo.symmetric_difference(expected).area, 1e-3 * expected.area)
+
+    def test_serial(self):
+        self.check(1)
+
+    def test_parallel(self):
+        self.check(2)
+
+    def test_merge(self):
+        # Pads 0.3 apart join after 0.15, the pad in the ring after 0.2.
+        passes = camlib.buffer_passes(self.geometry, self.offsets, processes=1)
+        self.assertEqual([len(camlib.autolist_polygons(geo)) for geo in passes], [7, 7, 2, 2])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -207,6 +207,100 @@ class PaintConnectTest3(PaintTestCase):
 
         # self.plot_summary_A(paths, tooldia, result, "WALK Expected")
 
+    def test_stats(self):
+        print "Test: Walk along the edge, touching paths"
+        paths = [
+            LineString([[0.5, 0.5], [0.5, 4.5]]),
+            LineString([[4.5, 4.5], [4.5, 0.5]]),
+            LineString([[4.5, 0.5], [2, 0.5]])
+        ]
+
+        tooldia = 1.0
+        stats = {}
+        result = Geometry.paint_connect(mkstorage(deepcopy(paths)), self.boundary, tooldia, stats=stats)
+
+        result = list(result.get_objects())
+        self.assertEqual(len(result), 1)
+        self.assertEqual(len(result[0].coords), 5)
+        self.assertEqual(stats['tests'], 1)
+        self.assertEqual(stats['joins'], 2)
+
+
+
+class PaintPolygonsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.polygons = [Point(x, y).buffer(0.2 + 0.1 * x)
+                         for x in range(4) for y in range(2)]
+
+    def test_parallel(self):
+        progress = []
+
+        def callback(done, total):
+            progress.append((done, total))
+
+        serial = paint_polygons(self.polygons, 0.05, 0.15, processes=1)
+        parallel = paint_polygons(self.polygons, 0.05, 0.15, processes=2, callback=callback)
+
+        self.assertGreaterEqual(len(serial), len(self.polygons))
+        self.assertEqual([p.wkb for p in parallel], [p.wkb for p in serial])
+        self.assertEqual(progress, [(i + 1, 8) for i in range(8)])
+
+    def test_methods(self):
+        for method in ["standard", "seed", "lines"]:
+            paths = paint_polygons(self.polygons[:2], 0.05, 0.15, method=method, margin=0.01)
+            for path in paths:
+                self.assertTrue(self.polygons[0].union(self.polygons[1]).contains(path))
+
+
+class ScanlineTest(unittest.TestCase):
+
+    def test_intersection(self):
+        # Lines along the top edge, through vertices and a hole
+        poly = Polygon([[0, 0], [4, 0], [4, 3], [2, 4], [0, 3]],
+                       [[[1, 1], [3, 1], [3, 2], [1, 2]]])
+        ys = [3.5, 3, 2.5, 2, 1.5, 1, 0.5, 0]
+
+        rows, x0, x1 = scanline_segments([poly], ys)
+
+        for row, y in enumerate(ys):
+            expected = LineString([[-1, y], [5, y]]).intersection(poly)
+            segments = [LineString([[a, y], [b, y]]) for a, b in zip(x0[rows == row], x1[rows == row])]
+            self.assertAlmostEqual(sum(seg.length for seg in segments), expected.length)
+            for seg in segments:
+                self.assertTrue(poly.covers(seg))
+
+        self.assertEqual(list(rows), sorted(rows))
+
+
+class ClearPolygonTest(unittest.TestCase):
+
+    def test_simplify(self):
+        poly = Point(0, 0).buffer(2.0, 64).difference(Point(0.5, 0).buffer(0.3))
+        tooldia = 0.05
+
+        exact_stats = []
+        exact = Geometry.clear_polygon(poly, tooldia, connect=False, tolerance=0, stats=exact_stats)
+        simple_stats = []
+        simple = Geometry.clear_polygon(poly, tooldia, connect=False, tolerance=0.01 * tooldia,
+                                        stats=simple_stats)
+
+        exact = list(exact.get_objects())
+        simple = list(simple.get_objects())
+        self.assertEqual(len(simple_stats), len(exact_stats))
+        self.assertTrue(all(before == after for before, after in exact_stats))
+        self.assertTrue(all(before >= after for before, after in simple_stats))
+        self.assertEqual(sum(len(p.coords) for p in exact), sum(after for before, after in exact_stats))
+        self.assertLess(sum(len(p.coords) for p in simple), sum(len(p.coords) for p in exact) / 10)
+
+        # Paths are still at least half the tool from the edges.
+        inside = poly.buffer(-tooldia / 2)
+        for path in simple:
+            self.assertTrue(inside.covers(path))
+
+        # Not simplified by default
+        default = list(Geometry.clear_polygon(poly, tooldia, connect=False).get_objects())
+        self.assertEqual([list(p.coords) for p in default], [list(p.coords) for p in exact])
 
 if __name__ == '__main__':
     unittest.main()
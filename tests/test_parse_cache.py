@@ -0,0 +1,98 @@
+import os
+import cPickle
+import shutil
+import tempfile
+import unittest
+import camlib
+
+
+class ParseCacheTest(unittest.TestCase):
+
+    gerber_file = 'tests/gerber_files/detector_copper_top.gbr'
+    excellon_file = 'tests/excellon_files/case1.drl'
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = camlib.ParseCache(self.path, version=8.5)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_gerber(self):
+        gerber = camlib.Gerber()
+        self.assertFalse(self.cache.load(gerber, self.gerber_file))
+        gerber.parse_file(self.gerber_file)
+        self.cache.store(gerber, self.gerber_file)
+        self.assertEqual(len(self.cache.entries()), 1)
+
+        cached = camlib.Gerber()
+        self.assertTrue(self.cache.load(cached, self.gerber_file))
+        self.assertFalse(cached.geometry_stale)
+        self.assertTrue(cached.solid_geometry.equals(gerber.solid_geometry))
+        self.assertEqual(sorted(cached.apertures), sorted(gerber.apertures))
+
+        # Can still be rebuilt from the primitives
+        cached.invalidate_geometry()
+        self.assertAlmostEqual(cached.solid_geometry.area, gerber.solid_geometry.area)
+
+        # Different settings miss
+        self.assertFalse(self.cache.load(camlib.Gerber(steps_per_circle=10), self.gerber_file))
+        self.assertFalse(self.cache.load(camlib.Gerber(), self.gerber_file, follow=True))
+        self.assertFalse(camlib.ParseCache(self.path, version=9).load(camlib.Gerber(), self.gerber_file))
+
+    def test_excellon(self):
+        excellon = camlib.Excellon()
+        excellon.parse_file(self.excellon_file)
+        excellon.create_geometry()
+        self.cache.store(excellon, self.excellon_file)
+
+        cached = camlib.Excellon()
+        self.assertTrue(self.cache.load(cached, self.excellon_file))
+        self.assertEqual(cached.tools, excellon.tools)
+        self.assertEqual(len(cached.drills), len(excellon.drills))
+        self.assertEqual(len(cached.solid_geometry), len(excellon.solid_geometry))
+
+        self.assertFalse(self.cache.load(camlib.Excellon(zeros="T"), self.excellon_file))
+
+    def test_incomplete(self):
+        gerber = camlib.Gerber()
+        gerber.parse_file(self.gerber_file)
+        self.cache.store(gerber, self.gerber_file)
+
+        # An entry missing an attribute is a miss and is removed.
+        path = self.cache.entry_path(self.cache.entries()[0][0])
+        with open(path, 'rb') as f:
+            state = cPickle.load(f)
+        del state[gerber.cache_attrs[-1]]
+        with open(path, 'wb') as f:
+            cPickle.dump(state, f)
+
+        self.assertFalse(self.cache.load(camlib.Gerber(), self.gerber_file))
+        self.assertEqual(self.cache.entries(), [])
+
+        # The format is part of the key.
+        key = self.cache.key(gerber, self.gerber_file)
+        self.cache.format += 1
+        self.assertNotEqual(self.cache.key(gerber, self.gerber_file), key)
+
+    def test_evict(self):
+        gerber = camlib.Gerber()
+        gerber.parse_file(self.gerber_file)
+        self.cache.store(gerber, self.gerber_file)
+        size = self.cache.size()
+
+        # The first entry is the least recently used.
+        first = self.cache.entries()[0][0]
+        os.utime(self.cache.entry_path(first), (0, 0))
+        self.cache.max_size = size + size / 2
+        self.cache.store(gerber, self.gerber_file, follow=True)
+
+        keys = [entry[0] for entry in self.cache.entries()]
+        self.assertEqual(len(keys), 1)
+        self.assertNotIn(first, keys)
+
+        self.assertEqual(self.cache.clear(), 1)
+        self.assertEqual(self.cache.entries(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import numpy as np
+import camlib
+from shapely.geometry import LineString, LinearRing, Point
+
+
+def cut_paths(gcode):
+    """
+    Coordinates of each cut in the G-code, in order.
+    """
+    paths = []
+    for line in gcode.splitlines():
+        if "X" not in line:
+            continue
+        x, y = line.split("X")[1].split("Y")
+        if line.startswith("G00"):
+            paths.append([])
+        paths[-1].append((float(x), float(y)))
+    return [path for path in paths if len(path) > 1]
+
+
+def travel(paths):
+    position = (0, 0)
+    distance = 0
+    for path in paths:
+        distance += Point(position).distance(Point(path[0]))
+        position = path[-1]
+    return distance + Point(position).distance(Point(0, 0))
+
+
+class PathOrderTest(unittest.TestCase):
+
+    def test_improve(self):
+        rs = np.random.RandomState(0)
+        starts = rs.rand(200, 2) * 10
+        ends = starts + rs.randn(200, 2) * 0.1
+        order = rs.permutation(200)
+        flipped = rs.rand(200) > 0.5
+
+        improved, improved_flipped = camlib.improve_path_order(starts, ends, order, flipped, seed=1)
+        self.assertEqual(sorted(improved.tolist()), range(200))
+        self.assertLess(camlib.path_travel(starts, ends, improved, improved_flipped),
+                        camlib.path_travel(starts, ends, order, flipped) / 2)
+
+        # Deterministic
+        again, again_flipped = camlib.improve_path_order(starts, ends, order, flipped, seed=1)
+        self.assertEqual(again.tolist(), improved.tolist())
+        self.assertEqual(again_flipped.tolist(), improved_flipped.tolist())
+
+    def test_reversal(self):
+        # Going out along the row and back is shorter
+        # following every other line backwards.
+        lines = [LineString([(i, 0), (i, 1)]) for i in range(10)]
+        geometry = camlib.Geometry()
+        geometry.solid_geometry = lines
+
+        greedy = camlib.CNCjob()
+        greedy.generate_from_geometry_2(geometry, optimize=False)
+        cnc = camlib.CNCjob()
+        cnc.generate_from_geometry_2(geometry, optimize=True)
+        self.assertLessEqual(travel(cut_paths(cnc.gcode)), travel(cut_paths(greedy.gcode)))
+
+        # Reported in a comment
+        comment = cnc.gcode.splitlines()[0].split()
+        self.assertEqual(comment[0], "(Travel:")
+        self.assertAlmostEqual(float(comment[4]), travel(cut_paths(cnc.gcode)), places=3)
+        self.assertLessEqual(float(comment[4]), float(comment[1]))
+
+        # Every line is cut
+        for line in lines:
+            for x, y in line.coords:
+                self.assertIn("X%.4fY%.4f" % (x, y), cnc.gcode)
+
+    def test_rings(self):
+        # Rings are cut clockwise, as given, in any order.
+        rs = np.random.RandomState(0)
+        rings = [LinearRing(Point(x, y).buffer(0.1, 2).exterior.coords)
+                 for x, y in rs.rand(60, 2) * 10]
+        geometry = camlib.Geometry()
+        geometry.solid_geometry = rings
+
+        cnc = camlib.CNCjob()
+        cnc.generate_from_geometry_2(geometry, optimize=True)
+        paths = cut_paths(cnc.gcode)
+        self.assertEqual(len(paths), 60)
+        for path in paths:
+            self.assertFalse(LinearRing(path).is_ccw)
+
+        # Closed paths are never followed backwards
+        starts = np.array([ring.coords[0] for ring in rings])
+        order, flipped = camlib.improve_path_order(starts, starts, rs.permutation(60),
+                                                   np.zeros(60, dtype=bool))
+        self.assertFalse(flipped.any())
+
+if __name__ == '__main__':
+    unittest.main()
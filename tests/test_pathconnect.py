@@ -84,5 +84,17 @@ class PathConnectTest1(unittest.TestCase):
         matches = [p for p in result if p.equals(LineString([[0, 0], [1, 1], [2, 1]]))]
         self.assertEqual(len(matches), 1)
 
+    def test_chain_connect(self):
+        # Segments of a zig-zag, shuffled and some reversed
+        points = [[i, i % 2] for i in range(200)]
+        paths = [LineString(points[i:i + 2]) for i in range(199)]
+        paths = [p if i % 3 else LineString(p.coords[::-1]) for i, p in enumerate(paths)]
+        paths = paths[100:] + paths[:100]
+
+        result = list(Geometry.path_connect(mkstorage(paths)).get_objects())
+        self.assertEqual(len(result), 1)
+        self.assertTrue(result[0].equals(LineString(points)))
+        self.assertEqual(len(result[0].coords), 200)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,59 @@
+import unittest
+import camlib
+from shapely.geometry import LineString, Point
+
+
+class RTreeStorageTest(unittest.TestCase):
+
+    def get_pts(self, o):
+        return [o.coords[0], o.coords[-1]]
+
+    def test_chain(self):
+        storage = camlib.FlatCAMRTreeStorage()
+        storage.get_points = self.get_pts
+        lines = [LineString([(i, 0), (i + 0.5, 0)]) for i in range(100)]
+        for line in reversed(lines):
+            storage.insert(line)
+
+        current = (0, 0)
+        visited = []
+        try:
+            while True:
+                pt, geo = storage.nearest(current)
+                storage.remove(geo)
+                visited.append(geo)
+                current = geo.coords[-1]
+        except StopIteration:
+            pass
+
+        self.assertEqual(visited, lines)
+        self.assertEqual(list(storage.get_objects()), [])
+
+    def test_insert_after_query(self):
+        storage = camlib.FlatCAMRTreeStorage()
+        storage.get_points = self.get_pts
+        far = LineString([(10, 10), (11, 10)])
+        storage.insert(far)
+        self.assertIs(storage.nearest((0, 0))[1], far)
+
+        near = LineString([(1, 1), (2, 1)])
+        storage.insert(near)
+        pt, geo = storage.nearest((0, 0))
+        self.assertEqual(pt, (1, 1))
+        self.assertIs(geo, near)
+
+        storage.remove(near)
+        storage.remove(far)
+        self.assertRaises(StopIteration, storage.nearest, (0, 0))
+
+    def test_all_points(self):
+        # By default all points are indexed.
+        index = camlib.FlatCAMRTree()
+        index.insert(0, LineString([(0, 0), (5, 5), (10, 0)]))
+        index.insert(1, Point(6, 6))
+        self.assertEqual(index.nearest((5, 4)).object, 0)
+        index.remove_obj(0, None)
+        self.assertEqual(index.nearest((5, 4)).object, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+from shapely.geometry import LineString, Point, box
+import camlib
+
+
+class SubtractPolygonsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.geo = camlib.Geometry()
+        self.lines = [LineString([(0, y), (10, y)]) for y in range(5)]
+        self.geo.solid_geometry = self.lines + [Point(20, 0).buffer(1.0)]
+
+    def test_untouched(self):
+        self.geo.subtract_polygon([(4, 0.5), (6, 0.5), (6, 1.5), (4, 1.5)])
+
+        paths = self.geo.solid_geometry
+        self.assertEqual(len(paths), 7)
+        # Same objects where nothing was subtracted
+        for line in [self.lines[0]] + self.lines[2:]:
+            self.assertTrue(any(path is line for path in paths))
+        self.assertAlmostEqual(sum(path.length for path in paths),
+                               50 - 2 + Point(20, 0).buffer(1.0).exterior.length)
+
+    def test_batch(self):
+        self.geo.subtract_polygons([box(4, -0.5, 6, 0.5), box(4, 2.5, 6, 3.5), box(19.5, -2, 21, 2)])
+
+        # Two lines cut in two, three as they were and the left of the circle.
+        paths = self.geo.solid_geometry
+        self.assertEqual(len(paths), 2 * 2 + 3 + 1)
+        self.assertAlmostEqual(sum(path.length for path in paths if path.bounds[2] <= 10), 46)
+        self.assertLess(paths[-1].bounds[2], 19.5 + 1e-9)
+
+if __name__ == '__main__':
+    unittest.main()
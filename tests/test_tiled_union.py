@@ -0,0 +1,100 @@
+import unittest
+from shapely.geometry import Point, LineString
+from shapely.ops import unary_union
+import camlib
+
+
+def make_polygons(pitch):
+    """
+    Pads on a grid and traces crossing many of them.
+    """
+    polygons = []
+    for i in range(20):
+        for j in range(20):
+            polygons.append(Point(i * pitch, j * pitch).buffer(0.2))
+    for j in range(0, 20, 3):
+        polygons.append(LineString([(0, j * pitch), (19 * pitch, j * pitch)]).buffer(0.05))
+    return polygons
+
+
+class TiledUnionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.polygons = make_polygons(0.5)
+
+    def check(self, **kwargs):
+        for use_buffer in [True, False]:
+            expected = camlib.union_polygons(self.polygons, use_buffer=use_buffer)
+            result = camlib.tiled_union(self.polygons, use_buffer=use_buffer, **kwargs)
+            self.assertTrue(result.is_valid)
+            self.assertEqual(len(camlib.autolist_polygons(result)),
+                             len(camlib.autolist_polygons(expected)))
+            self.assertAlmostEqual(result.symmetric_difference(expected).area, 0.0)
+
+    def test_serial(self):
+        self.check(tiles=4, processes=1)
+
+    def test_parallel(self):
+        self.check(tiles=3, processes=2)
+
+
+class StreamingUnionTest(unittest.TestCase):
+
+    def setUp(self):
+        # Pads overlap in columns.
+        self.polygons = make_polygons(0.3)
+
+    def test_streaming(self):
+        for use_buffer in [True, False]:
+            expected = camlib.union_polygons(self.polygons, use_buffer=use_buffer)
+            stream = camlib.StreamingUnion(max_primitives=50, use_buffer=use_buffer)
+            for polygon in self.polygons:
+                stream.append(polygon)
+                self.assertLess(len(stream.pending), 50)
+            result = stream.union()
+            self.assertTrue(result.is_valid)
+            self.assertLess(stream.peak, len(self.polygons) / 2)
+            self.assertEqual(len(camlib.autolist_polygons(result)),
+                             len(camlib.autolist_polygons(expected)))
+            self.assertAlmostEqual(result.symmetric_difference(expected).area, 0.0)
+
+
+class TiledDifferenceTest(unittest.TestCase):
+
+    def setUp(self):
+        # Rings across tile borders, with pads inside.
+        self.polygons = make_polygons(0.5)
+        for x, y in [(2.4, 2.4), (4.75, 4.75)]:
+            self.polygons.append(Point(x, y).buffer(1.2).difference(Point(x, y).buffer(1.1)))
+            self.polygons.append(Point(x, y).buffer(0.3))
+        self.geometry = unary_union(self.polygons)
+        self.boundary = self.geometry.envelope.buffer(0.5)
+        self.expected = self.boundary.difference(self.geometry)
+
+    def check(self, result):
+        self.assertTrue(result.is_valid)
+        self.assertEqual(len(camlib.autolist_polygons(result)),
+                         len(camlib.autolist_polygons(self.expected)))
+        self.assertEqual(sum(len(poly.interiors) for poly in camlib.autolist_polygons(result)),
+                         sum(len(poly.interiors) for poly in camlib.autolist_polygons(self.expected)))
+        self.assertAlmostEqual(result.symmetric_difference(self.expected).area, 0)
+
+    def test_serial(self):
+        done = []
+        self.check(camlib.tiled_difference(self.boundary, self.geometry, tiles=4, processes=1,
+                                           callback=lambda i, n: done.append((i, n))))
+        self.assertEqual(done[-1], (16, 16))
+
+    def test_parallel(self):
+        self.check(camlib.tiled_difference(self.boundary, self.geometry, tiles=3, processes=2))
+
+    def test_overlapping(self):
+        self.check(camlib.tiled_difference(self.boundary, self.polygons, tiles=4, processes=1))
+
+    def test_empty_area(self):
+        geo = camlib.Geometry()
+        geo.solid_geometry = self.geometry
+        self.check(geo.get_empty_area(self.boundary))
+
+if __name__ == '__main__':
+    unittest.main()
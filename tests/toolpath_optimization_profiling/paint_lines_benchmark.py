@@ -0,0 +1,83 @@
+# This script compares the lines of Geometry.clear_polygon3()
+# from scanline_segments() with intersecting the lines with the
+# polygon, as clear_polygon3() used to, on the polygons painted by
+# tests/test_polygon_paint.py.
+# Run python paint_lines_benchmark.py
+
+import sys
+import time
+sys.path.append('../../')
+
+from camlib import *
+from shapely.geometry import MultiLineString
+
+log = logging.getLogger('base2')
+log.setLevel(logging.ERROR)
+
+
+def line_ys(polygon, tooldia, overlap):
+    # Same lines as in clear_polygon3()
+    left, bot, right, top = polygon.bounds
+    ys = []
+    y = top - tooldia / 2
+    while y > bot + tooldia / 2:
+        ys.append(y)
+        y -= tooldia * (1 - overlap)
+    ys.append(bot + tooldia / 2)
+    return ys
+
+
+def by_intersection(polygon, tooldia, overlap):
+    left, bot, right, top = polygon.bounds
+    lines = [LineString([(left, y), (right, y)]) for y in line_ys(polygon, tooldia, overlap)]
+    return unary_union(lines).intersection(polygon.buffer(-tooldia / 2))
+
+
+def by_scanline(polygon, tooldia, overlap):
+    ys = line_ys(polygon, tooldia, overlap)
+    rows, x0, x1 = scanline_segments(autolist_polygons(polygon.buffer(-tooldia / 2)), ys)
+    return [LineString([(xa, ys[row]), (xb, ys[row])]) for row, xa, xb in zip(rows, x0, x1)]
+
+
+def best_time(fcn, *args):
+    best = None
+    for i in range(3):
+        t0 = time.time()
+        fcn(*args)
+        dt = time.time() - t0
+        if best is None or dt < best:
+            best = dt
+    return best
+
+## Polygons in tests/test_polygon_paint.py
+cases = []
+
+svg = Geometry()
+svg.import_svg('../svg/drawing.svg')
+for poly in autolist_polygons(unary_union([g for g in svg.flatten() if isinstance(g, Polygon)])):
+    cases.append(("drawing.svg", poly, 5, 0.2))
+
+gerber = Gerber()
+gerber.parse_file('../gerber_files/simple1.gbr')
+non_copper = gerber.solid_geometry.envelope.difference(gerber.solid_geometry)
+for poly in autolist_polygons(non_copper):
+    cases.append(("simple1.gbr non-copper", poly, 0.02, 0.2))
+
+# And a larger one
+gerber = Gerber()
+gerber.parse_file('../gerber_parsing_profiling/gerber1.gbr')
+non_copper = gerber.solid_geometry.envelope.difference(gerber.solid_geometry)
+cases.append(("gerber1.gbr non-copper", max(autolist_polygons(non_copper), key=lambda p: p.area), 0.2, 0.2))
+
+for name, poly, tooldia, overlap in cases:
+    reference = by_intersection(poly, tooldia, overlap)
+    lines = MultiLineString(by_scanline(poly, tooldia, overlap))
+
+    # Both sets of lines, within tolerance.
+    error = max(reference.hausdorff_distance(lines) if not reference.is_empty else 0,
+                abs(reference.length - lines.length))
+
+    print "%-24s %6d vertices %5d lines  intersection %8.4fs  scanline %8.4fs  error %.2e" % \
+        (name, sum(len(ring.coords) for ring in [poly.exterior] + list(poly.interiors)),
+         len(lines), best_time(by_intersection, poly, tooldia, overlap),
+         best_time(by_scanline, poly, tooldia, overlap), error)